@@ -1,15 +1,52 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from contextlib import asynccontextmanager
+import json
 import time
 from datetime import datetime
+import os
+from typing import BinaryIO, Dict, List, Optional, Tuple
 
-from app.models import DocumentUpload, DocumentResponse, QueryRequest, QueryResponse, HealthResponse
-from app.core.vector_store import vector_store
+from app.models import DocumentUpload, DocumentResponse, DocumentDeleteResponse, QueryRequest, QueryResponse, HealthResponse, IndexSearchParams, BatchQueryRequest, BatchQueryResponse, BulkIngestRequest, BulkIngestStatus, CollectionCreate, CollectionInfo
+from app.core.vector_store import ReadOnlyStore, VectorStore, vector_store
 from app.core.agent import agent
+from app.core.collection_registry import DEFAULT_COLLECTION, Collection, CollectionExists, CollectionInUse, UnknownCollection, collection_registry
 from app.utils.text_processing import text_processor
+from app.utils.file_extraction import SUPPORTED_EXTENSIONS, FileTooLarge, file_hash, iter_pages
+from app.core.executor import run_in_stage, get_executor_stats, ExecutorSaturated
+from app.core.model_registry import model_registry
+from app.core.reranker import reranker
+from app.core.context_builder import context_builder
+from app.core import bulk_ingest
+from app.core.tracing import Trace, start_trace, trace_exporter
+from app.monitoring.metrics import metrics_db
+from app.monitoring.drift_monitor import drift_monitor
 from app.config import settings
 
 router = APIRouter()
 
+def too_busy(e: ExecutorSaturated) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+def stage_timings(request_trace: Optional[Trace], requested: bool) -> Optional[Dict[str, float]]:
+    return request_trace.timings() if requested and request_trace is not None else None
+
+@asynccontextmanager
+async def use_collection(name: str):
+    """Lease a collection for the request; opening a cold one runs off the event loop."""
+    try:
+        if collection_registry.is_loaded(name):
+            collection = collection_registry.acquire(name)
+        else:
+            collection = await run_in_threadpool(collection_registry.acquire, name)
+    except UnknownCollection as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        yield collection
+    finally:
+        collection_registry.release(collection)
+
 @router.get("/")
 async def root():
     return {
@@ -20,57 +57,455 @@ async def root():
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    stats = vector_store.get_stats()
+    # in-memory counts only: get_stats queries the sqlite side indexes, which is /stats' job
     return HealthResponse(
         status="healthy",
         version=settings.APP_VERSION,
         timestamp=datetime.utcnow(),
-        vector_db_status="operational",
-        documents_count=stats["total_vectors"]
+        vector_db_status="read-only" if vector_store.read_only else "operational",
+        documents_count=vector_store.total_vectors
     )
 
+def _ingest_document(store: VectorStore, content: str, metadata: Dict) -> Tuple[str, int, int]:
+    cleaned_text = text_processor.clean_text(content)
+    chunks = text_processor.chunk_text(cleaned_text, metadata)
+    
+    if not chunks:
+        return None, 0, 0
+    
+    texts = [chunk["text"] for chunk in chunks]
+    metadatas = [chunk["metadata"] for chunk in chunks]
+    num_added = store.add_documents(texts, metadatas)
+    return chunks[0]["metadata"]["document_id"], num_added, len(chunks) - num_added
+
+def _upsert_document(store: VectorStore, document_id: str, content: str, metadata: Dict) -> Tuple[int, int]:
+    cleaned_text = text_processor.clean_text(content)
+    chunks = text_processor.chunk_text(cleaned_text, metadata, document_id=document_id)
+    if not chunks:
+        return None
+    
+    texts = [chunk["text"] for chunk in chunks]
+    metadatas = [chunk["metadata"] for chunk in chunks]
+    return store.upsert_document(document_id, texts, metadatas)
+
+def _ingest_file(store: VectorStore, stream: BinaryIO, filename: str) -> Tuple[str, int, int, int]:
+    """Extract, chunk and index a file page by page; returns (doc_id, added, duplicates, pages)."""
+    digest, _ = file_hash(stream, settings.MAX_UPLOAD_BYTES)
+    doc_id = digest[:12]
+    metadata = {"filename": filename}
+    
+    texts, metadatas = [], []
+    chunk_count = added = pages = 0
+    for page_number, page_text in iter_pages(stream, filename):
+        if page_number is not None:
+            pages = page_number
+        page_metadata = metadata if page_number is None else {**metadata, "page_number": page_number}
+        # earlier pages are indexed before the last one is read, so there is no total_chunks
+        chunks = text_processor.chunk_text(
+            text_processor.clean_text(page_text), page_metadata, document_id=doc_id, start_index=chunk_count,
+            count_chunks=False
+        )
+        chunk_count += len(chunks)
+        texts.extend(chunk["text"] for chunk in chunks)
+        metadatas.extend(chunk["metadata"] for chunk in chunks)
+        if len(texts) >= settings.FILE_UPLOAD_BATCH_CHUNKS:
+            added += store.add_documents(texts, metadatas)
+            texts, metadatas = [], []
+    
+    if texts:
+        added += store.add_documents(texts, metadatas)
+    if chunk_count == 0:
+        return None, 0, 0, pages
+    return doc_id, added, chunk_count - added, pages
+
+@router.post("/documents/file", response_model=DocumentResponse)
+@router.post("/collections/{collection}/documents/file", response_model=DocumentResponse)
+async def upload_file(file: UploadFile = File(...), collection: str = DEFAULT_COLLECTION):
+    filename = os.path.basename(file.filename or "")
+    if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported file type; expected one of {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
+    
+    try:
+        # UploadFile spools to disk past 1MB, so the extractor reads pages from a file, not memory
+        async with use_collection(collection) as target:
+            doc_id, num_added, duplicates, pages = await run_in_stage(
+                "ingest", _ingest_file, target.store, file.file, filename
+            )
+        
+        if doc_id is None:
+            raise HTTPException(status_code=400, detail="No text could be extracted from the file")
+        
+        message = f"Successfully processed {num_added} chunks"
+        if pages:
+            message += f" from {pages} pages"
+        if duplicates:
+            message += f" ({duplicates} duplicate chunks skipped)"
+        
+        return DocumentResponse(
+            document_id=doc_id,
+            chunks_created=num_added,
+            message=message
+        )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except ReadOnlyStore as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except FileTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await file.close()
+
 @router.post("/documents", response_model=DocumentResponse)
-async def upload_document(document: DocumentUpload):
+@router.post("/collections/{collection}/documents", response_model=DocumentResponse)
+async def upload_document(document: DocumentUpload, collection: str = DEFAULT_COLLECTION):
     try:
-        cleaned_text = text_processor.clean_text(document.content)
-        chunks = text_processor.chunk_text(cleaned_text, document.metadata)
+        async with use_collection(collection) as target:
+            doc_id, num_added, duplicates = await run_in_stage(
+                "ingest", _ingest_document, target.store, document.content, document.metadata
+            )
         
-        if not chunks:
+        if doc_id is None:
             raise HTTPException(status_code=400, detail="No valid chunks created")
         
-        texts = [chunk["text"] for chunk in chunks]
-        metadatas = [chunk["metadata"] for chunk in chunks]
-        num_added = vector_store.add_documents(texts, metadatas)
-        doc_id = chunks[0]["metadata"]["document_id"]
+        message = f"Successfully processed {num_added} chunks"
+        if duplicates:
+            message += f" ({duplicates} duplicate chunks skipped)"
         
         return DocumentResponse(
             document_id=doc_id,
             chunks_created=num_added,
-            message=f"Successfully processed {num_added} chunks"
+            message=message
+        )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except ReadOnlyStore as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/documents/{document_id}", response_model=DocumentResponse)
+@router.put("/collections/{collection}/documents/{document_id}", response_model=DocumentResponse)
+async def upsert_document(document_id: str, document: DocumentUpload, collection: str = DEFAULT_COLLECTION):
+    try:
+        async with use_collection(collection) as target:
+            result = await run_in_stage(
+                "ingest", _upsert_document, target.store, document_id, document.content, document.metadata
+            )
+        
+        if result is None:
+            raise HTTPException(status_code=400, detail="No valid chunks created")
+        
+        num_added, num_removed = result
+        return DocumentResponse(
+            document_id=document_id,
+            chunks_created=num_added,
+            message=f"Successfully upserted document: {num_added} chunks added, {num_removed} removed"
         )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except ReadOnlyStore as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.delete("/documents/{document_id}", response_model=DocumentDeleteResponse)
+@router.delete("/collections/{collection}/documents/{document_id}", response_model=DocumentDeleteResponse)
+async def delete_document(document_id: str, collection: str = DEFAULT_COLLECTION):
+    try:
+        async with use_collection(collection) as target:
+            num_deleted = await run_in_stage("ingest", target.store.delete_document, document_id)
+        
+        if num_deleted == 0:
+            raise HTTPException(status_code=404, detail=f"Unknown document: {document_id}")
+        
+        return DocumentDeleteResponse(
+            document_id=document_id,
+            chunks_deleted=num_deleted,
+            message=f"Successfully deleted {num_deleted} chunks"
+        )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except ReadOnlyStore as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/documents")
+@router.delete("/collections/{collection}/documents")
+async def clear_documents(collection: str = DEFAULT_COLLECTION):
+    try:
+        async with use_collection(collection) as target:
+            await run_in_stage("ingest", target.store.clear_index)
+        return {"message": "All documents deleted"}
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except ReadOnlyStore as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _bulk_source_path(source: str) -> str:
+    root = os.path.realpath(settings.DOCUMENTS_PATH)
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root:
+        raise HTTPException(status_code=400, detail="Source must be inside DOCUMENTS_PATH")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Source not found: {source}")
+    return path
+
+@router.post("/ingest/bulk", response_model=BulkIngestStatus, status_code=202)
+@router.post("/collections/{collection}/ingest/bulk", response_model=BulkIngestStatus, status_code=202)
+async def start_bulk_ingest(request: BulkIngestRequest, collection: str = DEFAULT_COLLECTION):
+    path = _bulk_source_path(request.source)
+    if not os.path.isdir(path) and not path.endswith(".jsonl"):
+        raise HTTPException(status_code=400, detail="Source must be a directory or a .jsonl file")
+    try:
+        job = bulk_ingest.start_job(path, job_id=request.job_id, resume=request.resume, collection=collection)
+    except UnknownCollection as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.get_status()
+
+@router.get("/ingest/bulk/{job_id}", response_model=BulkIngestStatus)
+async def get_bulk_ingest(job_id: str):
+    status = bulk_ingest.get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown bulk ingest job: {job_id}")
+    return status
+
+@router.delete("/ingest/bulk/{job_id}", response_model=BulkIngestStatus)
+async def cancel_bulk_ingest(job_id: str):
+    if not bulk_ingest.cancel_job(job_id):
+        raise HTTPException(status_code=404, detail=f"No running bulk ingest job: {job_id}")
+    return bulk_ingest.get_job_status(job_id)
+
 @router.get("/query", response_model=QueryResponse)
-async def query_rag(q: str, top_k: int = 5):
+@router.get("/collections/{collection}/query", response_model=QueryResponse)
+async def query_rag(q: str, top_k: int = 5, collection: str = DEFAULT_COLLECTION, trace: bool = False):
     if not q or len(q.strip()) == 0:
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     
     start_time = time.time()
     try:
-        answer, retrieval_results, confidence, source = agent.decide_and_answer(q, top_k)
+        with start_trace("query", collection=collection) as request_trace:
+            async with use_collection(collection) as target:
+                answer, retrieval_results, confidence, source = await run_in_stage(
+                    "query", agent.decide_and_answer, q, top_k, None, target
+                )
         processing_time = time.time() - start_time
+        drift_monitor.log_prediction(q, answer, confidence)
         
         return QueryResponse(
             answer=answer,
             retrieval_results=retrieval_results,
             confidence=confidence,
             source=source,
-            processing_time=processing_time
+            processing_time=processing_time,
+            timings=stage_timings(request_trace, trace)
         )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/query", response_model=QueryResponse)
+@router.post("/collections/{collection}/query", response_model=QueryResponse)
+async def query_rag_post(request: QueryRequest, collection: str = DEFAULT_COLLECTION):
+    if len(request.query.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    start_time = time.time()
+    try:
+        with start_trace("query", collection=collection) as request_trace:
+            async with use_collection(collection) as target:
+                answer, retrieval_results, confidence, source = await run_in_stage(
+                    "query", agent.decide_and_answer, request.query, request.top_k, request.filters, target
+                )
+        processing_time = time.time() - start_time
+        drift_monitor.log_prediction(request.query, answer, confidence)
+        
+        return QueryResponse(
+            answer=answer,
+            retrieval_results=retrieval_results,
+            confidence=confidence,
+            source=source,
+            processing_time=processing_time,
+            timings=stage_timings(request_trace, request.trace)
+        )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/query/stream")
+@router.get("/collections/{collection}/query/stream")
+async def query_rag_stream(q: str, top_k: int = 5, collection: str = DEFAULT_COLLECTION, trace: bool = False):
+    if not q or len(q.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    start_time = time.time()
+    try:
+        # the trace covers retrieval; generation runs while the response streams
+        with start_trace("query_stream", collection=collection) as request_trace:
+            async with use_collection(collection) as target:
+                retrieval_results, confidence, source, tokens = await run_in_stage(
+                    "query", agent.decide_and_stream, q, top_k, target
+                )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events():
+        yield _sse("retrieval", {
+            "retrieval_results": [result.model_dump() for result in retrieval_results],
+            "confidence": confidence,
+            "source": source,
+            "retrieval_time": time.time() - start_time,
+            "timings": stage_timings(request_trace, trace)
+        })
+        pieces = []
+        try:
+            # the token iterator blocks on generation, so pull it from a worker thread
+            async for piece in iterate_in_threadpool(tokens):
+                pieces.append(piece)
+                yield _sse("token", {"text": piece})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+        drift_monitor.log_prediction(q, "".join(pieces), confidence)
+        yield _sse("done", {"answer": "".join(pieces), "processing_time": time.time() - start_time})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+@router.post("/collections/{collection}/query/batch", response_model=BatchQueryResponse)
+async def query_rag_batch(request: BatchQueryRequest, collection: str = DEFAULT_COLLECTION):
+    queries = [q.strip() for q in request.queries]
+    if any(len(q) == 0 for q in queries):
+        raise HTTPException(status_code=400, detail="Queries cannot be empty")
+    if len(queries) > settings.MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_BATCH_QUERIES} queries per batch")
+    
+    start_time = time.time()
+    try:
+        with start_trace("query_batch", collection=collection, queries=len(queries)) as request_trace:
+            async with use_collection(collection) as target:
+                answers = await run_in_stage("query", agent.decide_and_answer_batch, queries, request.top_k, target)
+        processing_time = time.time() - start_time
+        for query, (answer, _, confidence, _) in zip(queries, answers):
+            drift_monitor.log_prediction(query, answer, confidence)
+        
+        return BatchQueryResponse(
+            results=[
+                QueryResponse(
+                    answer=answer,
+                    retrieval_results=retrieval_results,
+                    confidence=confidence,
+                    source=source,
+                    processing_time=processing_time
+                )
+                for answer, retrieval_results, confidence, source in answers
+            ],
+            processing_time=processing_time,
+            timings=stage_timings(request_trace, request.trace)
+        )
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise too_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats")
-async def get_statistics():
-    return vector_store.get_stats()
\ No newline at end of file
+@router.get("/collections/{collection}/stats")
+async def get_statistics(evaluate: bool = False, collection: str = DEFAULT_COLLECTION):
+    async with use_collection(collection) as target:
+        if evaluate:
+            try:
+                await run_in_stage("query", target.store.evaluate_index)
+            except ExecutorSaturated as e:
+                raise too_busy(e)
+        # the store's stats run COUNT queries on its sqlite indexes; keep them off the event loop
+        return await run_in_threadpool(_collection_stats, target)
+
+def _collection_stats(target: Collection) -> Dict:
+    return {
+        **target.store.get_stats(),
+        "collection": target.name,
+        "answer_cache": target.answer_cache.get_stats(),
+        "collections": collection_registry.get_stats(),
+        "executors": get_executor_stats(),
+        "models": model_registry.get_stats(),
+        "reranker": reranker.get_stats(),
+        "context_builder": context_builder.get_stats(),
+        "metrics_writer": metrics_db.get_stats(),
+        "tracing": trace_exporter.get_stats(),
+        "drift": drift_monitor.get_stats()
+    }
+
+@router.post("/index/params")
+@router.post("/collections/{collection}/index/params")
+async def update_index_params(params: IndexSearchParams, collection: str = DEFAULT_COLLECTION):
+    async with use_collection(collection) as target:
+        target.store.set_search_params(nprobe=params.nprobe, ef_search=params.ef_search)
+        return await run_in_threadpool(target.store.get_stats)
+
+@router.get("/collections", response_model=List[CollectionInfo])
+async def list_collections():
+    return collection_registry.list_collections()
+
+@router.post("/collections", response_model=CollectionInfo, status_code=201)
+async def create_collection(request: CollectionCreate):
+    try:
+        config = collection_registry.create(request.name, index_type=request.index_type, metric=request.metric)
+    except CollectionExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**config, "loaded": False}
+
+@router.delete("/collections/{collection}")
+async def drop_collection(collection: str):
+    try:
+        await run_in_threadpool(collection_registry.drop, collection)
+    except UnknownCollection as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CollectionInUse as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": f"Collection {collection} deleted"}
\ No newline at end of file
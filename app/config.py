@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, List
 import os
 
 class Settings(BaseSettings):
@@ -9,15 +10,150 @@ class Settings(BaseSettings):
     
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
+    # models loaded at startup; everything else loads on first use
+    # (embedding, generator, summarizer, translator)
+    MODEL_WARMUP: List[str] = []
+    # Unix socket of a shared model server (python -m app.core.model_server);
+    # empty keeps the models in this process
+    MODEL_SERVER_ADDRESS: str = ""
+    # shared secret for connecting to it; empty uses a random key the server writes to
+    # <address>.key (mode 0600) on every start
+    MODEL_SERVER_AUTHKEY: str = ""
+    # torch (fp32) | int8 (dynamic quantization) | onnx (ONNX Runtime, exported once into ONNX_CACHE_DIR)
+    MODEL_BACKEND: str = "torch"
+    # per-model overrides, e.g. {"generator": "torch", "embedding": "onnx"}
+    MODEL_BACKENDS: Dict[str, str] = {}
+    ONNX_CACHE_DIR: str = "./onnx_models"
+    MODEL_SERVER_BATCH_SIZE: int = 32
+    MODEL_SERVER_BATCH_WAIT_MS: float = 5.0
     
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 50
+    EMBEDDING_BATCH_SIZE: int = 64
+    
+    MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024
+    FILE_UPLOAD_BATCH_CHUNKS: int = 512
+    
+    # 0 uses every core for chunking
+    BULK_INGEST_PROCESSES: int = 0
+    BULK_INGEST_DOCS_PER_TASK: int = 64
+    BULK_INGEST_BATCH_CHUNKS: int = 4096
+    BULK_INGEST_REPORT_SECONDS: float = 10.0
     TOP_K_RESULTS: int = 5
+    
+    QUERY_BATCHING: bool = True
+    QUERY_BATCH_MAX_SIZE: int = 32
+    QUERY_BATCH_WAIT_MS: float = 5.0
+    MAX_BATCH_QUERIES: int = 64
+    
+    # metadata-filtered search: scan matches exactly up to this many rows, oversample
+    # the unfiltered index when at least this fraction of rows match, otherwise
+    # search the index with an id selector
+    FILTER_EXACT_MAX_ROWS: int = 10000
+    FILTER_OVERSAMPLE_MIN_SELECTIVITY: float = 0.2
+    FILTER_OVERSAMPLE_FACTOR: float = 2.0
+    FILTER_CACHE_SIZE: int = 256
+    
+    # dense + BM25 retrieval fused by rank (rrf) or by normalized score (weighted)
+    HYBRID_SEARCH: bool = True
+    HYBRID_FUSION: str = "rrf"
+    HYBRID_RRF_K: int = 60
+    HYBRID_LEXICAL_WEIGHT: float = 0.5
+    HYBRID_CANDIDATES: int = 20
+    HYBRID_SEARCH_THREADS: int = 4
+    
+    # optional cross-encoder re-ranking of a wider first-stage candidate set
+    RERANK_ENABLED: bool = False
+    RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_BUDGET_MS: float = 150.0
+    RERANK_CONCURRENCY: int = 2
+    RERANK_CACHE_SIZE: int = 10000
+    
+    GENERATOR_MODEL: str = "google/flan-t5-base"
+    # prompts are packed to fit this many generator input tokens instead of being truncated
+    GENERATOR_MAX_INPUT_TOKENS: int = 512
+    CONTEXT_TOKEN_CACHE_SIZE: int = 10000
+    
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 1024
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    SEMANTIC_CACHE_SIZE: int = 1024
+    SEMANTIC_CACHE_SIMILARITY: float = 0.95
+    
+    QUERY_WORKERS: int = 4
+    QUERY_QUEUE_DEPTH: int = 32
+    INGEST_WORKERS: int = 2
+    INGEST_QUEUE_DEPTH: int = 8
+    TOOL_WORKERS: int = 2
+    TOOL_QUEUE_DEPTH: int = 8
+    GENERATION_CONCURRENCY: int = 2
     CONFIDENCE_THRESHOLD: float = 0.5
     
+    # tool metrics are buffered in memory and bulk-inserted by a background writer;
+    # rows logged while the buffer is full are dropped
+    METRICS_BUFFER_SIZE: int = 10000
+    METRICS_FLUSH_BATCH: int = 500
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # raw rows only feed the "recent metrics" table; per-minute and per-hour rollups back the charts
+    METRICS_RAW_RETENTION_DAYS: float = 7.0
+    METRICS_MINUTE_RETENTION_DAYS: float = 7.0
+    METRICS_HOUR_RETENTION_DAYS: float = 365.0
+    METRICS_RETENTION_INTERVAL_SECONDS: float = 3600.0
+    
+    # per-stage spans of each request; timings go to MetricsDB's stage_timings table and, when a
+    # path is set, appended to it as OTLP/JSON lines
+    TRACING_ENABLED: bool = True
+    TRACE_EXPORT_PATH: str = ""
+    TRACE_RECORD_METRICS: bool = True
+    TRACE_EXPORT_QUEUE_SIZE: int = 1000
+    TRACE_EXPORT_INTERVAL_SECONDS: float = 1.0
+    
+    # drift monitoring compares the last DRIFT_WINDOW_SIZE answers with a reference frozen
+    # from the first DRIFT_REFERENCE_SIZE; a feature drifts when its PSI passes the threshold
+    DRIFT_WINDOW_SIZE: int = 5000
+    DRIFT_REFERENCE_SIZE: int = 1000
+    DRIFT_MIN_WINDOW: int = 100
+    DRIFT_CHECK_INTERVAL_SECONDS: float = 300.0
+    DRIFT_PSI_THRESHOLD: float = 0.2
+    DRIFT_REPORT_RETENTION_DAYS: float = 90.0
+    
+    # with several uvicorn workers, set this to a directory shared by them: each worker
+    # snapshots its /metrics state there and a scrape of any worker merges them all
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_SNAPSHOT_INTERVAL_SECONDS: float = 5.0
+    
     VECTOR_DB_PATH: str = "./vector_db"
+    # named collections live under VECTOR_DB_PATH/collections; idle ones beyond this
+    # many are closed in least recently used order
+    MAX_LOADED_COLLECTIONS: int = 8
     DOCUMENTS_PATH: str = "./data/documents"
     
+    WAL_FSYNC: bool = True
+    DEDUPLICATE_CHUNKS: bool = True
+    COMPACTION_INTERVAL_SECONDS: float = 30.0
+    COMPACTION_MIN_ROWS: int = 1000
+    MAX_SEGMENTS: int = 8
+    # deleted rows are purged from segments and the index once there are this many
+    # and they make up this fraction of the index
+    TOMBSTONE_PURGE_MIN_ROWS: int = 1000
+    TOMBSTONE_PURGE_RATIO: float = 0.1
+    
+    # flat | ivf_flat | hnsw | ivf_pq
+    VECTOR_INDEX_TYPE: str = "flat"
+    # l2 | cosine
+    VECTOR_METRIC: str = "l2"
+    INDEX_TRAIN_MIN_VECTORS: int = 10000
+    INDEX_CHECKPOINT_ROWS: int = 50000
+    IVF_NLIST: int = 1024
+    IVF_NPROBE: int = 16
+    PQ_M: int = 48
+    PQ_NBITS: int = 8
+    HNSW_M: int = 32
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,17 +1,48 @@
-from typing import Tuple, List
+from typing import Dict, Tuple, List, Iterator
 from app.config import settings
 from app.core.rag_pipeline import rag_pipeline
+from app.core.calibration import confidence_calibrator
+from app.core.collection_registry import Collection, collection_registry
 from app.models import RetrievalResult
 
 class Agent:
     
-    def __init__(self):
-        self.confidence_threshold = settings.CONFIDENCE_THRESHOLD
+    @property
+    def confidence_threshold(self) -> float:
+        return self._threshold()
     
-    def decide_and_answer(self, query: str, top_k: int = None) -> Tuple[str, List[RetrievalResult], float, str]:
-        answer, retrieval_results, confidence = rag_pipeline.query(query, top_k)
+    def _threshold(self, collection: Collection = None) -> float:
+        # thresholds are calibrated per collection, similarity metric and retrieval mode
+        return confidence_calibrator.threshold((collection or collection_registry.default).store)
+    
+    def decide_and_answer(self, query: str, top_k: int = None, filters: Dict = None,
+                          collection: Collection = None) -> Tuple[str, List[RetrievalResult], float, str]:
+        answer, retrieval_results, confidence = rag_pipeline.query(query, top_k, filters, collection)
+        return self._decide(answer, retrieval_results, confidence, collection)
+    
+    def decide_and_stream(self, query: str, top_k: int = None,
+                          collection: Collection = None) -> Tuple[List[RetrievalResult], float, str, Iterator[str]]:
+        retrieval_results, confidence, tokens = rag_pipeline.stream_query(query, top_k, collection)
         
-        if confidence >= self.confidence_threshold:
+        if confidence < self._threshold(collection):
+            tokens = self._prefixed(f"[Low confidence: {confidence:.2f}] ", tokens)
+        return retrieval_results, confidence, "rag", tokens
+    
+    @staticmethod
+    def _prefixed(prefix: str, tokens: Iterator[str]) -> Iterator[str]:
+        yield prefix
+        yield from tokens
+    
+    def decide_and_answer_batch(self, queries: List[str], top_k: int = None,
+                                collection: Collection = None) -> List[Tuple[str, List[RetrievalResult], float, str]]:
+        return [
+            self._decide(answer, retrieval_results, confidence, collection)
+            for answer, retrieval_results, confidence in rag_pipeline.query_batch(queries, top_k, collection)
+        ]
+    
+    def _decide(self, answer: str, retrieval_results: List[RetrievalResult], confidence: float,
+                collection: Collection = None) -> Tuple[str, List[RetrievalResult], float, str]:
+        if confidence >= self._threshold(collection):
             return answer, retrieval_results, confidence, "rag"
         else:
             answer = f"[Low confidence: {confidence:.2f}] {answer}"
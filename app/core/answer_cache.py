@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+from app.config import settings
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+class AnswerCache:
+    """Two-tier cache of RAG answers.
+
+    The exact tier is an LRU keyed on the normalized query text. The semantic tier
+    keeps the (unit-normalized) query embeddings in a fixed-size matrix and reuses
+    an answer when a new query is within ``similarity`` cosine of a cached one.
+    Both tiers expire entries after ``ttl`` seconds and are dropped wholesale when
+    the corpus version they were computed against changes. Answers are only reused
+    for the same ``top_k`` and metadata filter.
+    """
+
+    def __init__(self, max_entries: int = None, semantic_entries: int = None,
+                 ttl: float = None, similarity: float = None):
+        self.max_entries = max_entries or settings.ANSWER_CACHE_SIZE
+        self.semantic_entries = semantic_entries or settings.SEMANTIC_CACHE_SIZE
+        self.ttl = ttl or settings.ANSWER_CACHE_TTL_SECONDS
+        self.similarity = similarity or settings.SEMANTIC_CACHE_SIMILARITY
+
+        self._lock = threading.Lock()
+        self._exact = OrderedDict()
+        self._semantic = OrderedDict()
+        self._vectors = None
+        self._free_slots = list(range(self.semantic_entries))
+        self._version = None
+
+        self.stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def _check_version(self, version: int) -> bool:
+        """Drop everything when the corpus moved forward; reject lookups from older versions."""
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            if self._exact or self._semantic:
+                self.stats["invalidations"] += 1
+            self._reset()
+            self._version = version
+        return True
+
+    def _reset(self):
+        self._exact.clear()
+        self._semantic.clear()
+        self._free_slots = list(range(self.semantic_entries))
+
+    def get_exact(self, query: str, top_k: int, version: int, filter_key: str = "") -> Optional[Any]:
+        key = (normalize_query(query), top_k, filter_key)
+        with self._lock:
+            if not self._check_version(version):
+                return None
+            entry = self._exact.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._exact[key]
+                self.stats["expirations"] += 1
+                return None
+            self._exact.move_to_end(key)
+            self.stats["exact_hits"] += 1
+            return value
+
+    def get_similar(self, embedding: np.ndarray, top_k: int, version: int, filter_key: str = "") -> Optional[Any]:
+        vector = self._unit(embedding)
+        now = time.time()
+        with self._lock:
+            if not self._check_version(version) or not self._semantic:
+                self.stats["misses"] += 1
+                return None
+
+            slots = np.fromiter(self._semantic.keys(), dtype=np.int64, count=len(self._semantic))
+            similarities = self._vectors[slots] @ vector
+            for position in np.argsort(-similarities):
+                if similarities[position] < self.similarity:
+                    break
+                slot = int(slots[position])
+                expires, cached_scope, value = self._semantic[slot]
+                if expires < now:
+                    del self._semantic[slot]
+                    self._free_slots.append(slot)
+                    self.stats["expirations"] += 1
+                    continue
+                if cached_scope == (top_k, filter_key):
+                    self._semantic.move_to_end(slot)
+                    self.stats["semantic_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query: str, embedding: np.ndarray, top_k: int, value: Any, version: int, filter_key: str = ""):
+        expires = time.time() + self.ttl
+        vector = self._unit(embedding)
+        with self._lock:
+            if version != self._version:
+                # computed against a corpus that has changed since the lookup
+                return
+
+            key = (normalize_query(query), top_k, filter_key)
+            self._exact[key] = (expires, value)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+                self.stats["evictions"] += 1
+
+            if self._vectors is None:
+                self._vectors = np.zeros((self.semantic_entries, len(vector)), dtype='float32')
+            if not self._free_slots:
+                slot, _ = self._semantic.popitem(last=False)
+                self._free_slots.append(slot)
+                self.stats["evictions"] += 1
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._semantic[slot] = (expires, (top_k, filter_key), value)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._version = None
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype='float32').reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+            hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+            return {
+                **self.stats,
+                "exact_entries": len(self._exact),
+                "semantic_entries": len(self._semantic),
+                "hit_rate": hits / lookups if lookups else 0.0
+            }
+
+answer_cache = AnswerCache()
@@ -0,0 +1,271 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+from app.config import settings
+from app.core.collection_registry import DEFAULT_COLLECTION, UnknownCollection, collection_registry
+from app.core.vector_store import VectorStore
+from app.utils.text_processing import chunk_documents
+
+TEXT_EXTENSIONS = (".txt", ".md")
+# where the pool's task function lives; workers import just this module
+WORKER_MODULE = chunk_documents.__module__
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+def iter_documents(source: str) -> Iterator[Dict]:
+    """Stream ``{"content", "metadata"}`` documents from a directory or a JSONL file.
+
+    A JSONL line that is not a JSON object with an object ``metadata`` yields None.
+
+    The order is deterministic (sorted walk, file line order) so a checkpoint can
+    resume by skipping the documents it already committed.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, source)
+                if name.endswith(".jsonl"):
+                    yield from _iter_jsonl(path, relative)
+                elif name.endswith(TEXT_EXTENSIONS):
+                    with open(path, encoding="utf-8", errors="replace") as f:
+                        yield {"content": f.read(), "metadata": {"source": relative}}
+    elif source.endswith(".jsonl"):
+        yield from _iter_jsonl(source, os.path.basename(source))
+    else:
+        raise ValueError(f"Bulk ingestion source must be a directory or a .jsonl file: {source}")
+
+def _iter_jsonl(path: str, label: str) -> Iterator[Dict]:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            # a bad line still takes a position, so checkpoints stay aligned; it is counted as failed
+            if not isinstance(record, dict) or not isinstance(record.get("metadata") or {}, dict):
+                print(f"Skipping bad JSONL line {label}:{line_number}")
+                yield None
+                continue
+            # values keep their JSON types so typed filters (e.g. {"year": 2021}) match them
+            metadata = {key: value for key, value in (record.get("metadata") or {}).items() if value is not None}
+            metadata.setdefault("source", f"{label}:{line_number}")
+            yield {"content": record.get("content") or record.get("text") or "", "metadata": metadata}
+
+def default_job_id(source: str, collection: str = DEFAULT_COLLECTION) -> str:
+    key = os.path.abspath(source)
+    if collection != DEFAULT_COLLECTION:
+        key = f"{collection}:{key}"
+    return hashlib.md5(key.encode()).hexdigest()[:12]
+
+class BulkIngestJob:
+    """Chunks documents in a process pool and adds them to the index in large batches.
+
+    After every batch the number of source documents committed so far is written
+    to a checkpoint, so a crashed or cancelled job resumes where it stopped; a batch
+    that was added but not yet checkpointed is re-added, which chunk deduplication
+    (DEDUPLICATE_CHUNKS) turns into a no-op. Chunks go to ``collection``, which is
+    leased for the whole run so it cannot be dropped or unloaded underneath the job.
+    """
+
+    def __init__(self, source: str, job_id: str = None, resume: bool = True,
+                 processes: int = None, batch_chunks: int = None, collection: str = DEFAULT_COLLECTION):
+        if not collection_registry.exists(collection):
+            raise UnknownCollection(f"Unknown collection: {collection}")
+        self.source = source
+        self.collection = collection
+        self.job_id = job_id or default_job_id(source, collection)
+        if not JOB_ID_PATTERN.fullmatch(self.job_id):
+            raise ValueError(f"Invalid bulk ingest job id: {self.job_id}")
+        self.processes = processes or settings.BULK_INGEST_PROCESSES or os.cpu_count() or 1
+        self.batch_chunks = batch_chunks or settings.BULK_INGEST_BATCH_CHUNKS
+        self.checkpoint_path = os.path.join(settings.VECTOR_DB_PATH, "ingest_jobs", f"{self.job_id}.json")
+        self._cancelled = threading.Event()
+
+        self.state = {
+            "job_id": self.job_id,
+            "source": os.path.abspath(source),
+            "collection": collection,
+            "status": "pending",
+            "position": 0,
+            "documents": 0,
+            "chunks": 0,
+            "chunks_added": 0,
+            "duplicates": 0,
+            "failed_documents": 0,
+            "elapsed_seconds": 0.0,
+            "error": None
+        }
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                saved = json.load(f)
+            # checkpoints written before collections existed belong to the default one
+            if (saved["source"], saved.get("collection", DEFAULT_COLLECTION)) == (self.state["source"], collection):
+                self.state.update(saved)
+        self._run_documents = 0
+        self._run_chunks = 0
+        self._run_started = None
+        self._last_report = 0.0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self) -> Dict:
+        self.state.update(status="running", error=None)
+        self._run_started = time.time()
+        self._last_report = self._run_started
+        elapsed_before = self.state["elapsed_seconds"]
+        documents = itertools.islice(iter_documents(self.source), self.state["position"], None)
+        if self.state["position"]:
+            print(f"Resuming bulk ingest {self.job_id} after {self.state['position']} documents")
+
+        try:
+            with collection_registry.use(self.collection) as target, \
+                    ProcessPoolExecutor(self.processes, mp_context=self._mp_context()) as pool:
+                self._ingest(pool, target.store, documents, elapsed_before)
+                target.store.save_index()
+            self.state["status"] = "cancelled" if self._cancelled.is_set() else "completed"
+        except Exception as e:
+            self.state.update(status="failed", error=str(e))
+            raise
+        finally:
+            self.state["elapsed_seconds"] = elapsed_before + (time.time() - self._run_started)
+            self._write_checkpoint()
+            self._report(final=True)
+        return self.get_status()
+
+    def _ingest(self, pool: ProcessPoolExecutor, store: VectorStore, documents: Iterator[Dict],
+                elapsed_before: float):
+        docs_per_task = settings.BULK_INGEST_DOCS_PER_TASK
+        pending = deque()
+
+        def fill():
+            while len(pending) < self.processes * 2 and not self._cancelled.is_set():
+                batch = list(itertools.islice(documents, docs_per_task))
+                if not batch:
+                    return
+                pending.append((len(batch), pool.submit(chunk_documents, batch)))
+
+        texts, metadatas = [], []
+        buffered_documents = 0
+        buffered_failed = 0
+        fill()
+        while pending:
+            count, future = pending.popleft()
+            fill()
+            for chunks in future.result():
+                if chunks is None:
+                    buffered_failed += 1
+                    continue
+                texts.extend(chunk["text"] for chunk in chunks)
+                metadatas.extend(chunk["metadata"] for chunk in chunks)
+            buffered_documents += count
+
+            if len(texts) >= self.batch_chunks or not pending:
+                added = store.add_documents(texts, metadatas) if texts else 0
+                self.state["position"] += buffered_documents
+                self.state["documents"] += buffered_documents
+                self.state["chunks"] += len(texts)
+                self.state["chunks_added"] += added
+                self.state["duplicates"] += len(texts) - added
+                self.state["failed_documents"] += buffered_failed
+                self.state["elapsed_seconds"] = elapsed_before + (time.time() - self._run_started)
+                self._run_documents += buffered_documents
+                self._run_chunks += len(texts)
+                self._write_checkpoint()
+                self._report()
+                texts, metadatas = [], []
+                buffered_documents = 0
+                buffered_failed = 0
+
+    @staticmethod
+    def _mp_context():
+        # never fork: the API process runs threads (executors, compactor, writers) whose locks a
+        # forked child could inherit mid-use. The fork server starts clean with only the chunking
+        # module imported, which needs the text splitter and settings, not the app or the index.
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([WORKER_MODULE])
+            return context
+        return multiprocessing.get_context("spawn")
+
+    def _write_checkpoint(self):
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _throughput(self) -> Dict:
+        elapsed = time.time() - self._run_started if self._run_started else 0.0
+        return {
+            "docs_per_second": self._run_documents / elapsed if elapsed else 0.0,
+            "chunks_per_second": self._run_chunks / elapsed if elapsed else 0.0
+        }
+
+    def _report(self, final: bool = False):
+        now = time.time()
+        if not final and now - self._last_report < settings.BULK_INGEST_REPORT_SECONDS:
+            return
+        self._last_report = now
+        throughput = self._throughput()
+        print(f"[{self.job_id}] {self.state['documents']} docs, {self.state['chunks']} chunks "
+              f"({self.state['chunks_added']} added, {self.state['duplicates']} duplicates) | "
+              f"{throughput['docs_per_second']:.1f} docs/s, {throughput['chunks_per_second']:.1f} chunks/s")
+
+    def get_status(self) -> Dict:
+        return {**self.state, **self._throughput()}
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def start_job(source: str, job_id: str = None, resume: bool = True,
+              collection: str = DEFAULT_COLLECTION) -> BulkIngestJob:
+    """Run a bulk ingest on a background thread; raises ValueError if that job is already running."""
+    job = BulkIngestJob(source, job_id=job_id, resume=resume, collection=collection)
+    with _jobs_lock:
+        running = _jobs.get(job.job_id)
+        if running is not None and running.state["status"] == "running":
+            raise ValueError(f"Bulk ingest job {job.job_id} is already running")
+        job.state["status"] = "running"
+        _jobs[job.job_id] = job
+
+    def run():
+        try:
+            job.run()
+        except Exception as e:
+            print(f"Bulk ingest {job.job_id} failed: {e}")
+
+    threading.Thread(target=run, name=f"bulk-ingest-{job.job_id}", daemon=True).start()
+    return job
+
+def get_job_status(job_id: str) -> Dict:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job.get_status()
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+    path = os.path.join(settings.VECTOR_DB_PATH, "ingest_jobs", f"{job_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def cancel_job(job_id: str) -> bool:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None or job.state["status"] != "running":
+        return False
+    job.cancel()
+    return True
@@ -0,0 +1,162 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+
+def retrieval_mode() -> str:
+    """The retrieval configuration confidence scores depend on, e.g. ``hybrid-rrf+rerank``."""
+    mode = f"hybrid-{settings.HYBRID_FUSION}" if settings.HYBRID_SEARCH else "dense"
+    return f"{mode}+rerank" if settings.RERANK_ENABLED else mode
+
+class ConfidenceCalibrator:
+    """Maps raw retrieval confidence to a probability that the query is answerable.
+
+    The mapping (Platt scaling) and the decision threshold are fitted offline from a
+    labelled query set, on the same scores the RAG pipeline's retrieval produces, and
+    stored in the collection's directory, one fit per retrieval mode. A fit is only
+    trusted for the similarity metric and retrieval mode it was made with.
+    """
+
+    FILENAME = "calibration.json"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # index path -> (file mtime, fits by retrieval mode)
+        self._loaded = {}
+
+    def path(self, store) -> str:
+        return os.path.join(store.index_path, self.FILENAME)
+
+    def _fits(self, store) -> Dict[str, Dict]:
+        """The collection's fits, re-read when the file changes (e.g. after a calibration run)."""
+        path = self.path(store)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        with self._lock:
+            loaded = self._loaded.get(store.index_path)
+            if loaded is not None and loaded[0] == mtime:
+                return loaded[1]
+        with open(path) as f:
+            fits = json.load(f)
+        if "modes" in fits:
+            fits = fits["modes"]
+        else:
+            # files from before per-mode fits were fitted on dense search
+            fits = {"dense": fits}
+        with self._lock:
+            self._loaded[store.index_path] = (mtime, fits)
+        return fits
+
+    def params(self, store) -> Optional[Dict]:
+        """The fit for the store's metric and the current retrieval mode, if there is one."""
+        params = self._fits(store).get(retrieval_mode())
+        if params is None or params["metric"] != store.metric:
+            return None
+        return params
+
+    def is_active(self, store) -> bool:
+        return self.params(store) is not None
+
+    def calibrate(self, score: float, store) -> float:
+        params = self.params(store)
+        if params is None:
+            return score
+        return 1 / (1 + math.exp(-(params["a"] * score + params["b"])))
+
+    def threshold(self, store) -> float:
+        params = self.params(store)
+        if params is None:
+            return settings.CONFIDENCE_THRESHOLD
+        return params["threshold"]
+
+    def fit(self, examples: List[Dict], store, retrieve: Callable[[str, int], Tuple[List[Dict], List[float]]],
+            top_k: int = None) -> Dict:
+        """Fit from examples of ``{"query", "relevant_document_ids"}`` or ``{"query", "answerable"}``.
+
+        ``retrieve(query, top_k)`` returns the uncalibrated ``(rows, scores)`` of the
+        pipeline's retrieval over ``store``; the fit is saved for the current retrieval mode.
+        """
+        top_k = top_k or settings.TOP_K_RESULTS
+        scores = []
+        labels = []
+        for example in examples:
+            results, result_scores = retrieve(example["query"], top_k)
+            scores.append(sum(result_scores) / len(result_scores) if result_scores else 0.0)
+            if "answerable" in example:
+                labels.append(bool(example["answerable"]))
+            else:
+                relevant = set(example.get("relevant_document_ids", []))
+                labels.append(any(r["metadata"].get("document_id") in relevant for r in results))
+
+        scores = np.array(scores, dtype='float64')
+        labels = np.array(labels, dtype='float64')
+        if labels.min() == labels.max():
+            raise ValueError("Calibration needs both answerable and unanswerable queries")
+
+        a, b = self._fit_platt(scores, labels)
+        probabilities = 1 / (1 + np.exp(-(a * scores + b)))
+        threshold, f1, precision, recall = self._best_threshold(probabilities, labels)
+
+        params = {
+            "a": a,
+            "b": b,
+            "threshold": threshold,
+            "metric": store.metric,
+            "mode": retrieval_mode(),
+            "top_k": top_k,
+            "examples": len(examples),
+            "f1": f1,
+            "precision": precision,
+            "recall": recall,
+            "fitted_at": time.time()
+        }
+        fits = {**self._fits(store), params["mode"]: params}
+        path = self.path(store)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"modes": fits}, f, indent=2)
+        os.replace(tmp_file, path)
+        return params
+
+    @staticmethod
+    def _fit_platt(scores: np.ndarray, labels: np.ndarray, iterations: int = 100):
+        # Platt's smoothed targets keep the fit finite on separable data
+        positives = labels.sum()
+        negatives = len(labels) - positives
+        targets = np.where(labels > 0, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+        a, b = 1.0, 0.0
+        for _ in range(iterations):
+            p = 1 / (1 + np.exp(-(a * scores + b)))
+            w = np.maximum(p * (1 - p), 1e-12)
+            grad = np.array([np.sum((p - targets) * scores), np.sum(p - targets)])
+            hessian = np.array([
+                [np.sum(w * scores * scores), np.sum(w * scores)],
+                [np.sum(w * scores), np.sum(w)]
+            ]) + 1e-9 * np.eye(2)
+            step = np.linalg.solve(hessian, grad)
+            a, b = a - step[0], b - step[1]
+            if np.abs(step).max() < 1e-8:
+                break
+        return float(a), float(b)
+
+    @staticmethod
+    def _best_threshold(probabilities: np.ndarray, labels: np.ndarray):
+        best = (0.5, -1.0, 0.0, 0.0)
+        for threshold in np.unique(probabilities):
+            predicted = probabilities >= threshold
+            tp = float(np.sum(predicted & (labels > 0)))
+            precision = tp / max(float(predicted.sum()), 1.0)
+            recall = tp / max(float(labels.sum()), 1.0)
+            f1 = 2 * precision * recall / (precision + recall) if tp else 0.0
+            if f1 > best[1]:
+                best = (float(threshold), f1, precision, recall)
+        return best
+
+confidence_calibrator = ConfidenceCalibrator()
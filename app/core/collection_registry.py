@@ -0,0 +1,247 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+from app.config import settings
+from app.core import index_factory
+from app.core.answer_cache import AnswerCache, answer_cache
+from app.core.vector_store import VectorStore, vector_store
+from app.monitoring.prometheus import cache_lookups, metrics_registry
+
+DEFAULT_COLLECTION = "default"
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+index_vectors = metrics_registry.gauge(
+    "rag_index_vectors", "Live vectors in each loaded collection's index", ["collection"], aggregate="max"
+)
+
+class UnknownCollection(LookupError):
+    pass
+
+class CollectionExists(ValueError):
+    pass
+
+class CollectionInUse(RuntimeError):
+    pass
+
+class Collection:
+    """A named vector store with its own answer cache."""
+
+    def __init__(self, name: str, store: VectorStore, cache: AnswerCache):
+        self.name = name
+        self.store = store
+        self.answer_cache = cache
+        self.leases = 0
+        self.last_used = time.time()
+
+class CollectionRegistry:
+    """Named, isolated vector stores under ``VECTOR_DB_PATH/collections``.
+
+    Each collection has its own index type, metric, segments, log and answer cache.
+    Collections are opened on first use and held by a lease while a request uses
+    them; once more than ``MAX_LOADED_COLLECTIONS`` are open, the least recently
+    used idle ones are closed again. The original store is the ``default``
+    collection; it lives at ``VECTOR_DB_PATH`` itself and is never unloaded.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or os.path.join(settings.VECTOR_DB_PATH, "collections")
+        self.manifest_file = os.path.join(self.root, "collections.json")
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._default = Collection(DEFAULT_COLLECTION, vector_store, answer_cache)
+        self._loaded = OrderedDict()
+        self._configs = self._read_manifest()
+        self.stats = {"loads": 0, "unloads": 0}
+        metrics_registry.add_collector(self._collect_metrics)
+
+    @property
+    def default(self) -> Collection:
+        return self._default
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.manifest_file):
+            return {}
+        with open(self.manifest_file) as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self._configs, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def create(self, name: str, index_type: str = None, metric: str = None) -> Dict:
+        if not _NAME.match(name):
+            raise ValueError("Collection names are 1-64 letters, digits, '-' or '_' and start with a letter or digit")
+        index_type = index_type or settings.VECTOR_INDEX_TYPE
+        metric = metric or settings.VECTOR_METRIC
+        if index_type not in index_factory.INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. Expected one of {index_factory.INDEX_TYPES}")
+        if metric not in index_factory.METRICS:
+            raise ValueError(f"Unknown metric: {metric}. Expected one of {tuple(index_factory.METRICS)}")
+        with self._lock:
+            if name == DEFAULT_COLLECTION or name in self._configs:
+                raise CollectionExists(f"Collection already exists: {name}")
+            config = {"index_type": index_type, "metric": metric, "created_at": time.time()}
+            os.makedirs(self._path(name), exist_ok=True)
+            self._configs[name] = config
+            self._write_manifest()
+        return {"name": name, **config}
+
+    def drop(self, name: str):
+        if name == DEFAULT_COLLECTION:
+            raise ValueError("The default collection cannot be dropped")
+        with self._load_lock(name):
+            with self._lock:
+                if name not in self._configs:
+                    raise UnknownCollection(f"Unknown collection: {name}")
+                collection = self._loaded.get(name)
+                if collection is not None and collection.leases:
+                    raise CollectionInUse(f"Collection is in use: {name}")
+                # a migration thread would keep reading segments the rmtree below deletes
+                if collection is not None and collection.store.busy:
+                    raise CollectionInUse(f"Collection is migrating or compacting its index, retry later: {name}")
+                self._loaded.pop(name, None)
+                del self._configs[name]
+                self._write_manifest()
+            if collection is not None:
+                collection.store.close()
+            shutil.rmtree(self._path(name), ignore_errors=True)
+
+    def exists(self, name: str) -> bool:
+        return name == DEFAULT_COLLECTION or name in self._configs
+
+    def is_loaded(self, name: str) -> bool:
+        return name == DEFAULT_COLLECTION or name in self._loaded
+
+    def acquire(self, name: str = None) -> Collection:
+        """Lease a collection, opening it if needed; every acquire needs a ``release``."""
+        name = name or DEFAULT_COLLECTION
+        if name == DEFAULT_COLLECTION:
+            return self._default
+        with self._lock:
+            collection = self._loaded.get(name)
+            if collection is not None:
+                return self._lease(collection)
+            if name not in self._configs:
+                raise UnknownCollection(f"Unknown collection: {name}")
+
+        with self._load_lock(name):
+            with self._lock:
+                collection = self._loaded.get(name)
+                if collection is not None:
+                    return self._lease(collection)
+                config = self._configs.get(name)
+            if config is None:
+                raise UnknownCollection(f"Unknown collection: {name}")
+            print(f"Loading collection '{name}'...")
+            store = VectorStore(
+                index_path=self._path(name), index_type=config["index_type"], metric=config["metric"]
+            )
+            with self._lock:
+                collection = Collection(name, store, AnswerCache())
+                self._loaded[name] = collection
+                self.stats["loads"] += 1
+                self._lease(collection)
+        self._evict()
+        return collection
+
+    def _lease(self, collection: Collection) -> Collection:
+        collection.leases += 1
+        collection.last_used = time.time()
+        self._loaded.move_to_end(collection.name)
+        return collection
+
+    def release(self, collection: Collection):
+        # cheap enough for the event loop; surplus idle collections are closed on the next load
+        if collection is self._default:
+            return
+        with self._lock:
+            collection.leases -= 1
+
+    @contextmanager
+    def use(self, name: str = None) -> Iterator[Collection]:
+        collection = self.acquire(name)
+        try:
+            yield collection
+        finally:
+            self.release(collection)
+
+    def _load_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(name, threading.Lock())
+
+    def _evict(self):
+        """Close least recently used idle collections until at most MAX_LOADED_COLLECTIONS are open."""
+        evicted = []
+        with self._lock:
+            excess = len(self._loaded) - settings.MAX_LOADED_COLLECTIONS
+            for name, collection in list(self._loaded.items()):
+                if excess <= 0:
+                    break
+                # collections serving a request or training an index stay open
+                if collection.leases or collection.store.busy:
+                    continue
+                del self._loaded[name]
+                evicted.append(collection)
+                excess -= 1
+            self.stats["unloads"] += len(evicted)
+        for collection in evicted:
+            print(f"Unloading collection '{collection.name}'")
+            collection.store.close()
+
+    def unload(self, name: str) -> bool:
+        with self._lock:
+            collection = self._loaded.get(name)
+            if collection is None or collection.leases:
+                return False
+            del self._loaded[name]
+            self.stats["unloads"] += 1
+        collection.store.close()
+        return True
+
+    def list_collections(self) -> List[Dict]:
+        with self._lock:
+            collections = [{
+                "name": DEFAULT_COLLECTION,
+                "index_type": vector_store.index_type,
+                "metric": vector_store.metric,
+                "loaded": True
+            }]
+            for name, config in sorted(self._configs.items()):
+                collections.append({**config, "name": name, "loaded": name in self._loaded})
+        return collections
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "collections": len(self._configs) + 1,
+                "loaded": len(self._loaded) + 1,
+                "max_loaded": settings.MAX_LOADED_COLLECTIONS
+            }
+
+    def _collect_metrics(self):
+        with self._lock:
+            collections = [self._default, *self._loaded.values()]
+        index_vectors.replace({(collection.name,): collection.store.total_vectors for collection in collections})
+        lookups = {"exact_hit": 0, "semantic_hit": 0, "miss": 0}
+        for collection in collections:
+            stats = collection.answer_cache.get_stats()
+            lookups["exact_hit"] += stats["exact_hits"]
+            lookups["semantic_hit"] += stats["semantic_hits"]
+            lookups["miss"] += stats["misses"]
+        for result, count in lookups.items():
+            cache_lookups.set(count, "answer", result)
+
+collection_registry = CollectionRegistry()
@@ -0,0 +1,171 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from app.config import settings
+from app.core.embedding_cache import content_hash
+from app.core.model_registry import model_registry
+from app.core.model_loaders import load_generator_tokenizer
+from app.core.tracing import span, traced
+from app.monitoring.prometheus import cache_lookups, metrics_registry
+from app.models import RetrievalResult
+
+PROMPT_TEMPLATE = """Answer the question based on the context below.
+
+Context: {context}
+
+Question: {query}
+
+Answer:"""
+# shorter suffix/prefix matches between neighbouring chunks are more likely coincidence than overlap
+MIN_OVERLAP_CHARS = 8
+
+def strip_overlap(previous: str, text: str, max_overlap: int = None) -> Tuple[str, bool]:
+    """``text`` without the prefix it repeats from the end of ``previous`` (the splitter's
+    chunk overlap); the flag says whether any overlap was found."""
+    max_overlap = settings.CHUNK_OVERLAP if max_overlap is None else max_overlap
+    for size in range(min(max_overlap, len(previous), len(text)), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:], True
+    return text, False
+
+class ContextBuilder:
+    """Packs retrieved chunks into the generator's input token budget.
+
+    Chunks are taken in ranking order and skipped when they do not fit, so a long
+    low-ranked chunk no longer pushes a relevant one past the generator's truncation
+    point. Selected chunks of one document with consecutive ``chunk_index`` are merged
+    into a single passage with the splitter's overlap removed. Token counts are cached
+    per text, so repeated chunks cost a hash lookup instead of a tokenizer call.
+    """
+
+    def __init__(self):
+        model_registry.register("generator_tokenizer", load_generator_tokenizer)
+        self._lock = threading.Lock()
+        self._token_counts = OrderedDict()
+        self._template_tokens = None
+        self.stats = {
+            "prompts": 0,
+            "chunks_packed": 0,
+            "chunks_skipped": 0,
+            "chunks_merged": 0,
+            "truncated": 0,
+            "token_cache_hits": 0,
+            "token_cache_misses": 0
+        }
+        metrics_registry.add_collector(self._collect_metrics)
+
+    @property
+    def tokenizer(self):
+        return model_registry.get("generator_tokenizer")
+
+    def count_tokens(self, text: str) -> int:
+        key = content_hash(text)
+        with self._lock:
+            count = self._token_counts.get(key)
+            if count is not None:
+                self._token_counts.move_to_end(key)
+                self.stats["token_cache_hits"] += 1
+                return count
+        with span("tokenize"):
+            count = len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+        with self._lock:
+            self.stats["token_cache_misses"] += 1
+            self._token_counts[key] = count
+            while len(self._token_counts) > settings.CONTEXT_TOKEN_CACHE_SIZE:
+                self._token_counts.popitem(last=False)
+        return count
+
+    @traced("prompt_assembly")
+    def build_prompt(self, query: str, context_docs: List[RetrievalResult]) -> str:
+        return PROMPT_TEMPLATE.format(context=self.build_context(query, context_docs), query=query)
+
+    def build_context(self, query: str, context_docs: List[RetrievalResult]) -> str:
+        if self._template_tokens is None:
+            # the template plus the end-of-sequence token the tokenizer appends
+            self._template_tokens = self.count_tokens(PROMPT_TEMPLATE.format(context="", query="")) + 1
+        with span("tokenize"):
+            query_tokens = len(self.tokenizer(query, add_special_tokens=False)["input_ids"])
+        budget = settings.GENERATOR_MAX_INPUT_TOKENS - self._template_tokens - query_tokens
+
+        candidates = []
+        seen = set()
+        for doc in context_docs:
+            if doc.text and doc.text not in seen:
+                seen.add(doc.text)
+                candidates.append(doc)
+
+        selected = []
+        skipped = 0
+        for doc in candidates:
+            passages = self._passages(selected + [doc])
+            cost = sum(self.count_tokens(piece) for _, pieces in passages for piece, _ in pieces)
+            if cost <= budget:
+                selected.append(doc)
+            else:
+                skipped += 1
+
+        with self._lock:
+            self.stats["prompts"] += 1
+            self.stats["chunks_skipped"] += skipped
+        if not selected:
+            return self._truncate(candidates[0].text, budget) if candidates and budget > 0 else ""
+
+        passages = self._passages(selected)
+        with self._lock:
+            self.stats["chunks_packed"] += len(selected)
+            self.stats["chunks_merged"] += len(selected) - len(passages)
+        return "\n\n".join(
+            "".join(piece if i == 0 or joined else " " + piece for i, (piece, joined) in enumerate(pieces))
+            for _, pieces in passages
+        )
+
+    def _passages(self, docs: List[RetrievalResult]) -> List[Tuple[int, List[Tuple[str, bool]]]]:
+        """Group ``docs`` into passages of consecutive chunks of one document, in the order of
+        each passage's best-ranked chunk; each piece is ``(text, continues previous piece)``."""
+        runs: Dict[str, Dict[int, Tuple[int, str]]] = {}
+        standalone = []
+        for rank, doc in enumerate(docs):
+            document_id = doc.metadata.get("document_id")
+            chunk_index = doc.metadata.get("chunk_index")
+            if document_id is None or not isinstance(chunk_index, int):
+                standalone.append((rank, [(doc.text, False)]))
+            else:
+                runs.setdefault(document_id, {})[chunk_index] = (rank, doc.text)
+
+        passages = standalone
+        for chunks in runs.values():
+            pieces, best, previous_index, previous_text = [], None, None, None
+            for chunk_index in sorted(chunks):
+                rank, text = chunks[chunk_index]
+                if previous_index is not None and chunk_index == previous_index + 1:
+                    piece, joined = strip_overlap(previous_text, text)
+                    pieces.append((piece, joined))
+                else:
+                    if pieces:
+                        passages.append((best, pieces))
+                    pieces, best = [(text, False)], None
+                best = rank if best is None else min(best, rank)
+                previous_index, previous_text = chunk_index, text
+            passages.append((best, pieces))
+        passages.sort(key=lambda passage: passage[0])
+        return passages
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """The leading ``budget`` tokens of a chunk that is too long to fit whole."""
+        with self._lock:
+            self.stats["truncated"] += 1
+        with span("tokenize"):
+            input_ids = self.tokenizer(text, add_special_tokens=False)["input_ids"][:budget]
+            return self.tokenizer.decode(input_ids, skip_special_tokens=True)
+
+    def _collect_metrics(self):
+        with self._lock:
+            hits, misses = self.stats["token_cache_hits"], self.stats["token_cache_misses"]
+        cache_lookups.set(hits, "token_count", "hit")
+        cache_lookups.set(misses, "token_count", "miss")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "cached_texts": len(self._token_counts)}
+
+context_builder = ContextBuilder()
@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+class DocumentIndex:
+    """document_id -> index rows, so a document can be deleted or replaced without a scan.
+
+    A row can belong to several documents when chunk deduplication shares it; it
+    only becomes dead once the last document referencing it is gone.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_rows ("
+            "document_id TEXT NOT NULL, row_id INTEGER NOT NULL, PRIMARY KEY (document_id, row_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_document_rows_row ON document_rows(row_id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS document_index_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def is_backfilled(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM document_index_meta WHERE key = 'backfilled'").fetchone()
+        return row is not None
+
+    def mark_backfilled(self):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO document_index_meta (key, value) VALUES ('backfilled', '1')")
+            self._conn.commit()
+
+    def add_many(self, entries: Iterable[Tuple[str, int]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO document_rows (document_id, row_id) VALUES (?, ?)", list(entries)
+            )
+            self._conn.commit()
+
+    def rows_of(self, document_id: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT row_id FROM document_rows WHERE document_id = ? ORDER BY row_id", (document_id,)
+            )
+            return [row_id for row_id, in rows]
+
+    def shared_rows(self, document_id: str, row_ids: List[int]) -> Set[int]:
+        """The subset of ``row_ids`` that some other document also references."""
+        shared = set()
+        with self._lock:
+            for start in range(0, len(row_ids), 500):
+                batch = row_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT DISTINCT row_id FROM document_rows "
+                    f"WHERE document_id != ? AND row_id IN ({placeholders})",
+                    [document_id, *batch]
+                )
+                shared.update(row_id for row_id, in rows)
+        return shared
+
+    def remove_document(self, document_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM document_rows WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def remove_rows(self, row_ids: Iterable[int]):
+        row_ids = list(row_ids)
+        with self._lock:
+            for start in range(0, len(row_ids), 500):
+                batch = row_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM document_rows WHERE row_id IN ({placeholders})", batch)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM document_rows")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            documents, = self._conn.execute("SELECT COUNT(DISTINCT document_id) FROM document_rows").fetchone()
+        return {"documents": documents}
@@ -0,0 +1,141 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+def content_hash(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()
+
+class EmbeddingCache:
+    """Persistent chunk-hash -> embedding map, plus the index rows holding each chunk.
+
+    Embeddings survive clear_index so re-ingesting known text skips the encoder.
+    Live rows are keyed by ``(hash, metadata key)``: the same text can be live
+    several times under different metadata (one copy per document), and the
+    vector store reuses a row only for an exact match of both.
+    """
+
+    def __init__(self, db_path: str, model_name: str):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, embedding BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_rows ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, metadata_key TEXT NOT NULL, row_id INTEGER NOT NULL, "
+            "PRIMARY KEY (model, hash, metadata_key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunk_rows_row ON chunk_rows(row_id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embedding_cache_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def rows_backfilled(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM embedding_cache_meta WHERE key = ?", (f"rows_backfilled:{self.model_name}",)
+            ).fetchone()
+        return row is not None
+
+    def mark_rows_backfilled(self):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embedding_cache_meta (key, value) VALUES (?, '1')",
+                (f"rows_backfilled:{self.model_name}",)
+            )
+            self._conn.commit()
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(set(hashes))
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, embedding FROM chunk_embeddings "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [self.model_name, *batch]
+                )
+                for chunk_hash, blob in rows:
+                    found[chunk_hash] = np.frombuffer(blob, dtype='float32')
+        return found
+
+    def put_many(self, entries: List[Tuple[str, np.ndarray]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (model, hash, embedding) VALUES (?, ?, ?)",
+                [
+                    (self.model_name, chunk_hash, np.asarray(embedding, dtype='float32').tobytes())
+                    for chunk_hash, embedding in entries
+                ]
+            )
+            self._conn.commit()
+
+    def live_rows(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        """The live row holding each ``(hash, metadata key)``, for those that have one."""
+        keys = list(set(keys))
+        hashes = list({chunk_hash for chunk_hash, _ in keys})
+        wanted = set(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, metadata_key, row_id FROM chunk_rows "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [self.model_name, *batch]
+                )
+                for chunk_hash, metadata_key, row_id in rows:
+                    if (chunk_hash, metadata_key) in wanted:
+                        found[(chunk_hash, metadata_key)] = row_id
+        return found
+
+    def add_rows(self, entries: List[Tuple[str, str, int]]):
+        """Record ``(hash, metadata key, row_id)`` of rows that became live."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_rows (model, hash, metadata_key, row_id) VALUES (?, ?, ?, ?)",
+                [(self.model_name, chunk_hash, metadata_key, row_id) for chunk_hash, metadata_key, row_id in entries]
+            )
+            self._conn.commit()
+
+    def release_rows(self, row_ids: Iterable[int]):
+        """Mark deleted rows as no longer live so their text can be added again."""
+        row_ids = list(row_ids)
+        with self._lock:
+            for start in range(0, len(row_ids), 500):
+                batch = row_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(
+                    f"DELETE FROM chunk_rows WHERE model = ? AND row_id IN ({placeholders})",
+                    [self.model_name, *batch]
+                )
+            self._conn.commit()
+
+    def release_all(self):
+        """Forget every live row (after clear_index) but keep the embeddings."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_rows WHERE model = ?", (self.model_name,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total, = self._conn.execute(
+                "SELECT COUNT(*) FROM chunk_embeddings WHERE model = ?", (self.model_name,)
+            ).fetchone()
+            live, = self._conn.execute(
+                "SELECT COUNT(*) FROM chunk_rows WHERE model = ?", (self.model_name,)
+            ).fetchone()
+        return {"cached_embeddings": total, "indexed_chunks": live}
@@ -1,22 +1,52 @@
-from sentence_transformers import SentenceTransformer
 from typing import List
 import numpy as np
 from app.config import settings
+from app.core.batching import MicroBatcher
+from app.core.model_registry import model_registry
+from app.core.model_server import loader_for, is_remote
+from app.core.tracing import traced
+from app.monitoring.prometheus import metrics_registry
+
+embedding_batch_size = metrics_registry.histogram(
+    "rag_embedding_batch_size", "Texts per embedding model call", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
 
 class EmbeddingManager:
     
     def __init__(self, model_name: str = None):
         self.model_name = model_name or settings.EMBEDDING_MODEL
-        print(f"Loading embedding model: {self.model_name}")
-        self.model = SentenceTransformer(self.model_name)
-        self.dimension = self.model.get_sentence_embedding_dimension()
-        print(f"Embedding dimension: {self.dimension}")
+        # the index is sized from settings so opening it does not load the model
+        self.dimension = settings.EMBEDDING_DIMENSION
+        model_registry.register("embedding", loader_for("embedding", self.model_name))
+        self._query_batcher = MicroBatcher(
+            lambda texts: list(self.embed_texts(texts, show_progress_bar=False)),
+            max_batch_size=settings.QUERY_BATCH_MAX_SIZE,
+            max_wait_ms=settings.QUERY_BATCH_WAIT_MS,
+            name="query-embedding-batcher"
+        )
         
+    @property
+    def model(self):
+        return model_registry.get("embedding")
+    
+    @traced("embed")
     def embed_text(self, text: str) -> np.ndarray:
+        embedding_batch_size.observe(1)
         return self.model.encode(text, convert_to_numpy=True)
     
-    def embed_texts(self, texts: List[str]) -> np.ndarray:
-        return self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
+    @traced("embed")
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query, coalescing concurrent callers into one encode batch."""
+        # the model server batches across workers itself
+        if settings.QUERY_BATCHING and not is_remote():
+            return self._query_batcher.submit(text)
+        return self.embed_text(text)
+    
+    @traced("embed")
+    def embed_texts(self, texts: List[str], show_progress_bar: bool = True) -> np.ndarray:
+        embedding_batch_size.observe(len(texts))
+        return self.model.encode(texts, convert_to_numpy=True, show_progress_bar=show_progress_bar,
+                                 batch_size=settings.EMBEDDING_BATCH_SIZE)
     
     def get_dimension(self) -> int:
         return self.dimension
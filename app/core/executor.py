@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from app.config import settings
+from app.monitoring.prometheus import metrics_registry
+
+class ExecutorSaturated(Exception):
+    """Raised instead of queueing when a stage already has its maximum backlog."""
+
+class StageExecutor:
+    """Bounded thread pool that runs blocking model code off the event loop.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more may
+    wait; anything beyond that is rejected immediately with ExecutorSaturated so
+    the API can answer 429 instead of piling up latency.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-stage")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._counter_lock = threading.Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._counter_lock:
+                self.rejected += 1
+            raise ExecutorSaturated(f"{self.name} stage is saturated, retry later")
+
+        with self._counter_lock:
+            self.in_flight += 1
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._call, fn, *args, **kwargs)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+        finally:
+            with self._counter_lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def _call(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._counter_lock:
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._counter_lock:
+                self.running -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        return self.in_flight - self.running
+
+    def get_stats(self) -> Dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+stage_executors = {
+    "query": StageExecutor("query", settings.QUERY_WORKERS, settings.QUERY_QUEUE_DEPTH),
+    "ingest": StageExecutor("ingest", settings.INGEST_WORKERS, settings.INGEST_QUEUE_DEPTH),
+    "tools": StageExecutor("tools", settings.TOOL_WORKERS, settings.TOOL_QUEUE_DEPTH),
+}
+
+async def run_in_stage(stage: str, fn: Callable, *args, **kwargs) -> Any:
+    return await stage_executors[stage].run(fn, *args, **kwargs)
+
+def get_executor_stats() -> Dict:
+    return {name: executor.get_stats() for name, executor in stage_executors.items()}
+
+
+executor_queue_depth = metrics_registry.gauge(
+    "rag_executor_queue_depth", "Calls waiting for a free stage worker", ["stage"]
+)
+executor_running = metrics_registry.gauge("rag_executor_running", "Calls running in a stage", ["stage"])
+executor_rejected = metrics_registry.counter(
+    "rag_executor_rejected_total", "Calls rejected because a stage was saturated", ["stage"]
+)
+
+def _collect_executor_metrics():
+    for name, executor in stage_executors.items():
+        executor_queue_depth.set(executor.queue_depth, name)
+        executor_running.set(executor.running, name)
+        executor_rejected.set(executor.rejected, name)
+
+metrics_registry.add_collector(_collect_executor_metrics)
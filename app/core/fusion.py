@@ -0,0 +1,32 @@
+from typing import Dict, Hashable, List
+
+FUSION_METHODS = ("rrf", "weighted")
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]], weights: List[float], k: int = 60) -> List[Hashable]:
+    """Order items by the weighted sum of 1 / (k + rank) over the rankings they appear in."""
+    fused: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, 1):
+            fused[item] = fused.get(item, 0.0) + weight / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
+
+def weighted_score_fusion(rankings: List[List[Hashable]], score_lists: List[List[float]],
+                          weights: List[float]) -> List[Hashable]:
+    """Order items by the weighted sum of their min-max normalized scores."""
+    fused: Dict[Hashable, float] = {}
+    for ranking, scores, weight in zip(rankings, score_lists, weights):
+        if not scores:
+            continue
+        low, high = min(scores), max(scores)
+        for item, score in zip(ranking, scores):
+            normalized = (score - low) / (high - low) if high > low else 1.0
+            fused[item] = fused.get(item, 0.0) + weight * normalized
+    return sorted(fused, key=fused.get, reverse=True)
+
+def fuse(method: str, rankings: List[List[Hashable]], score_lists: List[List[float]],
+         weights: List[float], rrf_k: int = 60) -> List[Hashable]:
+    if method == "rrf":
+        return reciprocal_rank_fusion(rankings, weights, rrf_k)
+    if method == "weighted":
+        return weighted_score_fusion(rankings, score_lists, weights)
+    raise ValueError(f"Unknown fusion method: {method}. Expected one of {FUSION_METHODS}")
@@ -0,0 +1,144 @@
+import faiss
+import numpy as np
+from typing import Dict
+from app.config import settings
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+METRICS = {
+    "l2": faiss.METRIC_L2,
+    # cosine is inner product over L2-normalized vectors
+    "cosine": faiss.METRIC_INNER_PRODUCT,
+}
+
+def create_index(index_type: str, dimension: int, metric: str = "l2") -> faiss.Index:
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}. Expected one of {tuple(METRICS)}")
+    metric_type = METRICS[metric]
+
+    if index_type == "flat":
+        return faiss.IndexFlat(dimension, metric_type)
+    if index_type == "ivf_flat":
+        quantizer = faiss.IndexFlat(dimension, metric_type)
+        return faiss.IndexIVFFlat(quantizer, dimension, settings.IVF_NLIST, metric_type)
+    if index_type == "ivf_pq":
+        quantizer = faiss.IndexFlat(dimension, metric_type)
+        return faiss.IndexIVFPQ(quantizer, dimension, settings.IVF_NLIST, settings.PQ_M, settings.PQ_NBITS, metric_type)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, settings.HNSW_M, metric_type)
+        index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+        return index
+    raise ValueError(f"Unknown index type: {index_type}. Expected one of {INDEX_TYPES}")
+
+def with_ids(index: faiss.Index) -> faiss.Index:
+    """Wrap an empty index so vectors are added and returned under their row ids."""
+    if isinstance(index, faiss.IndexIVF):
+        # IVF lists store ids natively; an IDMap over IVF breaks on remove_ids because
+        # the lists are not renumbered the way the map expects
+        return index
+    return faiss.IndexIDMap(index)
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+def supports_remove(index: faiss.Index) -> bool:
+    # HNSW graphs cannot drop nodes; they are rebuilt instead
+    return not isinstance(base_index(index), faiss.IndexHNSW)
+
+def id_bitmap(ids: np.ndarray) -> np.ndarray:
+    """Bitmap with the bit of every id in ``ids`` set, in the layout IDSelectorBitmap reads."""
+    ids = np.asarray(ids, dtype=np.int64)
+    bitmap = np.zeros(int(ids.max()) // 8 + 1 if len(ids) else 1, dtype=np.uint8)
+    np.bitwise_or.at(bitmap, ids >> 3, (1 << (ids & 7)).astype(np.uint8))
+    return bitmap
+
+def allow_selector(bitmap: np.ndarray) -> faiss.IDSelector:
+    """Selector that only accepts ids whose bit is set in ``bitmap``."""
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+    # the C++ object only holds a raw pointer; keep the array alive with the selector
+    selector.referenced_objects = [bitmap]
+    return selector
+
+def tombstone_selector(bitmap: np.ndarray) -> faiss.IDSelector:
+    """Selector that excludes every id whose bit is set in ``bitmap``."""
+    inner = allow_selector(bitmap)
+    selector = faiss.IDSelectorNot(inner)
+    selector.referenced_objects = [inner]
+    return selector
+
+def search_parameters(index: faiss.Index, selector: faiss.IDSelector, nprobe: int = None, ef_search: int = None):
+    """Per-search parameters carrying an id filter; they replace the index's own nprobe/efSearch."""
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = nprobe if nprobe is not None else base.nprobe
+    elif isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = ef_search if ef_search is not None else base.hnsw.efSearch
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    params.referenced_objects = [selector]
+    return params
+
+def metric_of(index: faiss.Index) -> str:
+    return "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+def min_vectors(index_type: str) -> int:
+    """Number of vectors required before migrating away from the flat index."""
+    if index_type == "flat":
+        return 0
+    if index_type.startswith("ivf"):
+        # faiss recommends ~39 training points per IVF centroid
+        return max(settings.INDEX_TRAIN_MIN_VECTORS, 39 * settings.IVF_NLIST)
+    return settings.INDEX_TRAIN_MIN_VECTORS
+
+def training_size(index_type: str) -> int:
+    """Upper bound on the training sample; faiss gains nothing past ~256 points per centroid."""
+    return 256 * settings.IVF_NLIST if index_type.startswith("ivf") else 0
+
+def apply_search_params(index: faiss.Index, nprobe: int = None, ef_search: int = None):
+    index = base_index(index)
+    params = faiss.ParameterSpace()
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+def index_type_of(index: faiss.Index) -> str:
+    index = base_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+def search_params_of(index: faiss.Index) -> Dict:
+    index = base_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        return {"nprobe": index.nprobe, "nlist": index.nlist}
+    if isinstance(index, faiss.IndexHNSW):
+        return {"efSearch": index.hnsw.efSearch, "M": settings.HNSW_M}
+    return {}
+
+def exact_search(vector_blocks, queries: np.ndarray, k: int, metric: str = "l2"):
+    """Brute-force top-k over ``(ids, vectors)`` blocks, used as ground truth for recall."""
+    # inner product ranks by descending similarity
+    sign = -1 if metric == "cosine" else 1
+    best_distances = np.zeros((len(queries), 0), dtype='float32')
+    best_ids = np.zeros((len(queries), 0), dtype='int64')
+    for block_ids, block in vector_blocks:
+        if len(block) == 0:
+            continue
+        flat = faiss.IndexFlat(queries.shape[1], METRICS[metric])
+        flat.add(np.ascontiguousarray(block, dtype='float32'))
+        distances, positions = flat.search(queries, min(k, len(block)))
+        best_distances = np.hstack([best_distances, distances])
+        best_ids = np.hstack([best_ids, np.asarray(block_ids)[positions]])
+        order = np.argsort(sign * best_distances, axis=1)[:, :k]
+        best_distances = np.take_along_axis(best_distances, order, axis=1)
+        best_ids = np.take_along_axis(best_ids, order, axis=1)
+    return best_distances, best_ids
@@ -0,0 +1,90 @@
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+MAX_QUERY_TERMS = 32
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+def match_expression(query: str) -> str:
+    """OR of the query's quoted terms, so user text never hits FTS5 query syntax."""
+    terms = list(dict.fromkeys(term.lower() for term in _TERM.findall(query)))[:MAX_QUERY_TERMS]
+    return " OR ".join(f'"{term}"' for term in terms)
+
+class LexicalIndex:
+    """BM25 over chunk texts in an SQLite FTS5 table whose rowid is the vector store row id.
+
+    Rows are added as they are committed, so startup only has to index rows past
+    ``next_row`` (the high-water mark stored with them) instead of re-scanning the
+    corpus. Identifiers such as ``ERR_CONN_42`` are split into their word parts on
+    both sides, so the query still matches them as adjacent high-weight terms.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunk_text "
+            "USING fts5(text, tokenize='porter unicode61 remove_diacritics 2')"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS lexical_index_meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+
+    def next_row(self) -> int:
+        """One past the highest row id that has been indexed."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM lexical_index_meta WHERE key = 'next_row'").fetchone()
+        return row[0] if row else 0
+
+    def add_many(self, entries: List[Tuple[int, str]]):
+        """Index ``(row_id, text)`` pairs in increasing row id order."""
+        if not entries:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunk_text (rowid, text) VALUES (?, ?)", entries)
+            self._conn.execute(
+                "INSERT INTO lexical_index_meta (key, value) VALUES ('next_row', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                (entries[-1][0] + 1,)
+            )
+            self._conn.commit()
+
+    def remove_rows(self, row_ids: Iterable[int]):
+        row_ids = list(row_ids)
+        with self._lock:
+            for start in range(0, len(row_ids), 500):
+                batch = row_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM chunk_text WHERE rowid IN ({placeholders})", batch)
+            self._conn.commit()
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Best ``limit`` rows as ``(row_id, score)``; higher scores are better."""
+        expression = match_expression(query)
+        if not expression or limit <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rowid, bm25(chunk_text) FROM chunk_text WHERE chunk_text MATCH ? "
+                "ORDER BY bm25(chunk_text) LIMIT ?",
+                (expression, limit)
+            ).fetchall()
+        # FTS5's bm25() is negated so that ascending order is best first
+        return [(row_id, -score) for row_id, score in rows]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_text")
+            self._conn.execute("DELETE FROM lexical_index_meta")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            rows, = self._conn.execute("SELECT COUNT(*) FROM chunk_text").fetchone()
+        return {"rows": rows}
@@ -0,0 +1,49 @@
+import json
+from typing import Any, Dict, Tuple
+import numpy as np
+
+SCALAR_TYPES = (str, int, float, bool)
+
+def normalize_filters(filters: Dict[str, Any]) -> Dict[str, Tuple]:
+    """``{field: value or [values]}`` -> ``{field: (values,)}``; fields AND together, values OR."""
+    normalized = {}
+    for field, value in (filters or {}).items():
+        values = tuple(value) if isinstance(value, (list, tuple)) else (value,)
+        if not values or not all(isinstance(v, SCALAR_TYPES) for v in values):
+            raise ValueError(f"Filter on {field!r} must be a scalar or a non-empty list of scalars")
+        normalized[field] = values
+    return normalized
+
+def filter_key(filters: Dict[str, Any]) -> str:
+    """Canonical string for a filter, for cache keys; empty when there is no filter."""
+    filters = normalize_filters(filters)
+    if not filters:
+        return ""
+    return json.dumps({field: sorted(values, key=repr) for field, values in filters.items()}, sort_keys=True)
+
+def typed(value: Any) -> Tuple[type, Any]:
+    """Postings key of a value. Python has ``True == 1`` (and equal hashes), but a
+    filter on ``True`` must not match a stored ``1``, nor ``1`` match ``1.0``."""
+    return type(value), value
+
+def matches(metadata: Dict[str, Any], filters: Dict[str, Tuple]) -> bool:
+    return all(
+        field in metadata and typed(metadata[field]) in {typed(v) for v in values}
+        for field, values in filters.items()
+    )
+
+def matching_offsets(postings_of, filters: Dict[str, Tuple]) -> np.ndarray:
+    """Sorted offsets matching every field, from per-field postings ``postings_of(field)``
+    keyed by ``typed(value)``."""
+    result = None
+    for field, values in filters.items():
+        postings = postings_of(field)
+        keys = {typed(value) for value in values}
+        lists = [postings[key] for key in keys if key in postings]
+        if not lists:
+            return np.zeros(0, dtype=np.int64)
+        offsets = lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+        result = offsets if result is None else np.intersect1d(result, offsets, assume_unique=True)
+        if len(result) == 0:
+            break
+    return result if result is not None else np.zeros(0, dtype=np.int64)
@@ -0,0 +1,203 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+import numpy as np
+from app.core.metadata_filter import typed
+
+# sentinels of int columns: the key is absent, or present with a None value;
+# ints outside (INT_NULL, int64 max] are stored in a JSON column instead
+INT_MISSING = np.iinfo(np.int64).min
+INT_NULL = INT_MISSING + 1
+INT_MAX = np.iinfo(np.int64).max
+# the same for the codes of dictionary-encoded str columns
+CODE_MISSING = -1
+CODE_NULL = -2
+
+def _fsync_write(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _save_array(path: str, array: np.ndarray):
+    with open(path, 'wb') as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _open_blob(path: str):
+    if os.path.getsize(path) == 0:
+        return b""
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+class _Blob:
+    """Variable-length byte strings stored as one file plus an int64 offsets array."""
+
+    def __init__(self, path: str):
+        self.data = _open_blob(path + ".bin")
+        self.offsets = np.load(path + ".offsets.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def get(self, i: int) -> bytes:
+        return bytes(self.data[int(self.offsets[i]):int(self.offsets[i + 1])])
+
+    @staticmethod
+    def write(path: str, items: List[bytes]):
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        if items:
+            np.cumsum([len(item) for item in items], out=offsets[1:])
+        _fsync_write(path + ".bin", b"".join(items))
+        _save_array(path + ".offsets.npy", offsets)
+
+class ColumnarMetadata:
+    """Read-only, memory-mapped chunk texts and metadata for one segment.
+
+    Texts live in a single blob addressed by offsets. Every metadata field is a
+    column: ``int`` fields that fit an int64 are an int64 array, low-cardinality
+    ``str`` fields are dictionary-encoded int32 codes, and anything else is stored
+    per row as JSON. A key that is present with a None value is kept apart from a
+    missing key, so metadata reads back exactly as it was written. Only the rows
+    that are actually read get decoded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._postings = {}
+        with open(os.path.join(path, "columns.json")) as f:
+            schema = json.load(f)
+        self.rows = schema["rows"]
+        self.texts = _Blob(os.path.join(path, "texts"))
+        self.columns = []
+        for position, column in enumerate(schema["columns"]):
+            base = os.path.join(path, f"col{position}")
+            if column["kind"] == "int":
+                data = np.load(base + ".npy", mmap_mode="r")
+            elif column["kind"] == "str":
+                data = (np.load(base + ".codes.npy", mmap_mode="r"), _Blob(base + ".values"))
+            else:
+                data = _Blob(base)
+            self.columns.append((column["name"], column["kind"], data))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def text(self, i: int) -> str:
+        return self.texts.get(i).decode("utf-8")
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        metadata = {}
+        for name, kind, data in self.columns:
+            if kind == "int":
+                value = int(data[i])
+                if value != INT_MISSING:
+                    metadata[name] = None if value == INT_NULL else value
+            elif kind == "str":
+                codes, values = data
+                code = int(codes[i])
+                if code != CODE_MISSING:
+                    metadata[name] = None if code == CODE_NULL else values.get(code).decode("utf-8")
+            else:
+                raw = data.get(i)
+                if raw:
+                    metadata[name] = json.loads(raw)
+        return metadata
+
+    def get(self, i: int) -> Dict:
+        return {"text": self.text(i), "metadata": self.metadata(i)}
+
+    def iter_rows(self) -> Iterator[Tuple[str, Dict]]:
+        for i in range(self.rows):
+            yield self.text(i), self.metadata(i)
+
+    def postings(self, name: str) -> Dict[Any, np.ndarray]:
+        """Inverted index of one field: ``typed(value)`` -> sorted row offsets, built from the column once."""
+        postings = self._postings.get(name)
+        if postings is not None:
+            return postings
+        postings = {}
+        for column_name, kind, data in self.columns:
+            if column_name != name:
+                continue
+            if kind == "str":
+                codes, values = data
+                postings = self._group(np.asarray(codes), [typed(values.get(i).decode("utf-8")) for i in range(len(values))])
+            elif kind == "int":
+                distinct, inverse = np.unique(np.asarray(data), return_inverse=True)
+                postings = self._group(inverse, [typed(value) for value in distinct.tolist()])
+                postings.pop(typed(INT_MISSING), None)
+                postings.pop(typed(INT_NULL), None)
+            else:
+                offsets = {}
+                for i in range(self.rows):
+                    raw = data.get(i)
+                    value = json.loads(raw) if raw else None
+                    # lists and objects are not indexable values
+                    if isinstance(value, (str, int, float, bool)):
+                        offsets.setdefault(typed(value), []).append(i)
+                postings = {value: np.array(rows, dtype=np.int64) for value, rows in offsets.items()}
+        self._postings[name] = postings
+        return postings
+
+    @staticmethod
+    def _group(codes: np.ndarray, values: List[Any]) -> Dict[Any, np.ndarray]:
+        """Split row offsets by code; negative codes are missing values."""
+        order = np.argsort(codes, kind="stable")
+        present = order[codes[order] >= 0]
+        counts = np.bincount(codes[present], minlength=len(values))
+        groups = np.split(present, np.cumsum(counts)[:-1]) if len(values) else []
+        return {value: group for value, group in zip(values, groups) if len(group)}
+
+    @staticmethod
+    def write(path: str, texts: List[str], metadatas: List[Dict]):
+        os.makedirs(path, exist_ok=True)
+        _Blob.write(os.path.join(path, "texts"), [text.encode("utf-8") for text in texts])
+
+        names = []
+        for metadata in metadatas:
+            for name in metadata:
+                if name not in names:
+                    names.append(name)
+
+        columns = []
+        for position, name in enumerate(names):
+            base = os.path.join(path, f"col{position}")
+            missing = [name not in metadata for metadata in metadatas]
+            values = [metadata.get(name) for metadata in metadatas]
+            present = [v for v in values if v is not None]
+            kind = ColumnarMetadata._column_kind(present, len(values))
+
+            if kind == "int":
+                array = np.array([
+                    INT_MISSING if absent else INT_NULL if v is None else v for v, absent in zip(values, missing)
+                ], dtype=np.int64)
+                _save_array(base + ".npy", array)
+            elif kind == "str":
+                dictionary = {}
+                codes = np.array([
+                    CODE_MISSING if absent else CODE_NULL if v is None else dictionary.setdefault(v, len(dictionary))
+                    for v, absent in zip(values, missing)
+                ], dtype=np.int32)
+                _save_array(base + ".codes.npy", codes)
+                _Blob.write(base + ".values", [v.encode("utf-8") for v in dictionary])
+            else:
+                # an explicit None is stored as b"null"; only a missing key is empty
+                _Blob.write(base, [b"" if absent else json.dumps(v).encode("utf-8") for v, absent in zip(values, missing)])
+
+            columns.append({"name": name, "kind": kind})
+
+        schema = {"rows": len(texts), "columns": columns}
+        _fsync_write(os.path.join(path, "columns.json"), json.dumps(schema).encode("utf-8"))
+
+    @staticmethod
+    def _column_kind(present: List[Any], rows: int) -> str:
+        if present and all(isinstance(v, int) and not isinstance(v, bool) and INT_NULL < v <= INT_MAX
+                           for v in present):
+            return "int"
+        if present and all(isinstance(v, str) for v in present):
+            distinct = len(set(present))
+            # per-row unique strings (timestamps, ids) gain nothing from a dictionary
+            if distinct <= 16 or distinct <= rows // 2:
+                return "str"
+        return "json"
@@ -0,0 +1,115 @@
+import json
+import os
+from typing import List
+import numpy as np
+from app.config import settings
+
+BACKENDS = ("torch", "int8", "onnx")
+
+def backend_for(name: str) -> str:
+    backend = settings.MODEL_BACKENDS.get(name, settings.MODEL_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}' for {name}; expected one of {BACKENDS}")
+    return backend
+
+def quantize_int8(module):
+    """Dynamic int8 quantization of every Linear layer (weights int8, activations quantized per batch)."""
+    import torch
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+def onnx_cache_path(model_name: str) -> str:
+    return os.path.join(settings.ONNX_CACHE_DIR, model_name.replace("/", "--"))
+
+def _require_optimum():
+    try:
+        import optimum.onnxruntime as ort
+    except ImportError:
+        raise ImportError("The onnx backend needs optimum[onnxruntime]: pip install 'optimum[onnxruntime]'")
+    return ort
+
+class OnnxEncoder:
+    """ONNX Runtime replacement for a SentenceTransformer (transformer + pooling + optional normalize)."""
+
+    def __init__(self, path: str):
+        ort = _require_optimum()
+        from transformers import AutoTokenizer
+        with open(os.path.join(path, "encoder.json")) as f:
+            self.config = json.load(f)
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.model = ort.ORTModelForFeatureExtraction.from_pretrained(path)
+
+    @classmethod
+    def export(cls, model_name: str, path: str) -> "OnnxEncoder":
+        ort = _require_optimum()
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+
+        reference = SentenceTransformer(model_name)
+        pooling = next(m for m in reference.modules() if isinstance(m, Pooling))
+        if pooling.pooling_mode_mean_tokens:
+            mode = "mean"
+        elif pooling.pooling_mode_cls_token:
+            mode = "cls"
+        else:
+            raise ValueError(f"Unsupported pooling for ONNX export of {model_name}")
+
+        transformer_path = reference[0].auto_model.name_or_path
+        ort.ORTModelForFeatureExtraction.from_pretrained(transformer_path, export=True).save_pretrained(path)
+        reference.tokenizer.save_pretrained(path)
+        with open(os.path.join(path, "encoder.json"), "w") as f:
+            json.dump({
+                "model_name": model_name,
+                "pooling": mode,
+                "normalize": any(isinstance(m, Normalize) for m in reference.modules()),
+                "max_seq_length": reference.max_seq_length,
+                "dimension": reference.get_sentence_embedding_dimension()
+            }, f, indent=2)
+        return cls(path)
+
+    def encode(self, texts, convert_to_numpy: bool = True, show_progress_bar: bool = False,
+               batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batches.append(self._encode_batch(texts[start:start + batch_size]))
+        embeddings = np.vstack(batches) if batches else np.zeros((0, self.config["dimension"]), dtype='float32')
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.config["max_seq_length"], return_tensors="np")
+        hidden = np.asarray(self.model(**inputs).last_hidden_state, dtype='float32')
+        if self.config["pooling"] == "cls":
+            embeddings = hidden[:, 0]
+        else:
+            mask = inputs["attention_mask"][..., None].astype('float32')
+            embeddings = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings.astype('float32')
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+def load_onnx_encoder(model_name: str) -> OnnxEncoder:
+    path = onnx_cache_path(model_name)
+    if os.path.exists(os.path.join(path, "encoder.json")):
+        return OnnxEncoder(path)
+    print(f"Exporting {model_name} to ONNX (cached in {path})...")
+    return OnnxEncoder.export(model_name, path)
+
+def load_onnx_pipeline(task: str, model_name: str, **pipeline_kwargs):
+    ort = _require_optimum()
+    from transformers import AutoTokenizer, pipeline
+    path = onnx_cache_path(model_name)
+    if os.path.exists(os.path.join(path, "config.json")):
+        model = ort.ORTModelForSeq2SeqLM.from_pretrained(path)
+        tokenizer = AutoTokenizer.from_pretrained(path)
+    else:
+        print(f"Exporting {model_name} to ONNX (cached in {path})...")
+        model = ort.ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model.save_pretrained(path)
+        tokenizer.save_pretrained(path)
+    return pipeline(task, model=model, tokenizer=tokenizer, **pipeline_kwargs)
@@ -0,0 +1,93 @@
+import threading
+from typing import Iterator
+from app.config import settings
+from app.core.model_backends import backend_for, quantize_int8, load_onnx_encoder, load_onnx_pipeline
+
+def load_embedding_model(model_name: str = None, backend: str = None):
+    model_name = model_name or settings.EMBEDDING_MODEL
+    backend = backend or backend_for("embedding")
+    if backend == "onnx":
+        model = load_onnx_encoder(model_name)
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name, device="cpu" if backend == "int8" else None)
+        if backend == "int8":
+            model = quantize_int8(model)
+    dimension = model.get_sentence_embedding_dimension()
+    if dimension != settings.EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"{model_name} produces {dimension}-d embeddings but EMBEDDING_DIMENSION is {settings.EMBEDDING_DIMENSION}"
+        )
+    return model
+
+def _load_pipeline(name: str, task: str, model_name: str, backend: str = None, **pipeline_kwargs):
+    backend = backend or backend_for(name)
+    if backend == "onnx":
+        return load_onnx_pipeline(task, model_name, **pipeline_kwargs)
+    from transformers import pipeline
+    generator = pipeline(task, model=model_name, **pipeline_kwargs)
+    if backend == "int8":
+        generator.model = quantize_int8(generator.model)
+    return generator
+
+def load_generator(backend: str = None):
+    return _load_pipeline("generator", "text2text-generation", settings.GENERATOR_MODEL, backend, max_length=512)
+
+def load_generator_tokenizer():
+    # always local: prompts are sized in the API process even when the generator is served remotely
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(settings.GENERATOR_MODEL)
+
+def load_summarizer(backend: str = None):
+    return _load_pipeline("summarizer", "summarization", "facebook/bart-large-cnn", backend)
+
+def load_translator(backend: str = None):
+    return _load_pipeline("translator", "translation_en_to_fr", "Helsinki-NLP/opus-mt-en-fr", backend)
+
+def load_reranker(backend: str = None):
+    backend = backend or backend_for("reranker")
+    if backend == "onnx":
+        raise ValueError("The onnx backend is not available for the reranker; use torch or int8")
+    from sentence_transformers import CrossEncoder
+    model = CrossEncoder(settings.RERANKER_MODEL, max_length=512, device="cpu" if backend == "int8" else None)
+    if backend == "int8":
+        model.model = quantize_int8(model.model)
+    return model
+
+LOCAL_LOADERS = {
+    "embedding": load_embedding_model,
+    "generator": load_generator,
+    "summarizer": load_summarizer,
+    "translator": load_translator,
+    "reranker": load_reranker,
+}
+
+def stream_generate(generator, prompt: str, **generate_kwargs) -> Iterator[str]:
+    """Yield decoded text from a text2text pipeline (or a remote proxy) as it is produced."""
+    if hasattr(generator, "stream"):
+        yield from generator.stream(prompt, **generate_kwargs)
+        return
+
+    from transformers import TextIteratorStreamer
+    tokenizer = generator.tokenizer
+    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=settings.GENERATOR_MAX_INPUT_TOKENS)
+    # skip_prompt drops the decoder start token that generate() emits first
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    errors = []
+
+    def run():
+        try:
+            generator.model.generate(**inputs, streamer=streamer, **generate_kwargs)
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=run, name="stream-generation", daemon=True)
+    thread.start()
+    for piece in streamer:
+        if piece:
+            yield piece
+    thread.join()
+
+    if errors:
+        raise errors[0]
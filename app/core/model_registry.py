@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+class ModelRegistry:
+    """Named model loaders that run on first use instead of at import time.
+
+    Modules register a loader for each model they own; ``get`` loads it once
+    (other callers wait on a per-model lock) and caches the instance. Models
+    listed in ``settings.MODEL_WARMUP`` are loaded at application startup.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._load_times = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+        with self._locks[name]:
+            if name not in self._models:
+                print(f"Loading model '{name}'...")
+                start = time.time()
+                self._models[name] = self._loaders[name]()
+                self._load_times[name] = time.time() - start
+                print(f"Model '{name}' loaded in {self._load_times[name]:.1f}s")
+        return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def unload(self, name: str):
+        with self._locks.get(name, self._lock):
+            self._models.pop(name, None)
+
+    def warm_up(self, names: List[str]):
+        for name in names:
+            if name not in self._loaders:
+                print(f"Skipping warm-up of unknown model '{name}'")
+                continue
+            self.get(name)
+
+    def get_stats(self) -> Dict:
+        return {
+            name: {
+                "loaded": name in self._models,
+                "load_seconds": self._load_times.get(name)
+            }
+            for name in sorted(self._loaders)
+        }
+
+model_registry = ModelRegistry()
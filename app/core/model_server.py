@@ -0,0 +1,296 @@
+import argparse
+import functools
+import os
+import threading
+from collections import OrderedDict
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Iterator, List
+import numpy as np
+from app.config import settings
+from app.core.batching import MicroBatcher
+from app.core.model_loaders import LOCAL_LOADERS, stream_generate
+from app.core.model_registry import ModelRegistry
+
+class ModelServerError(Exception):
+    """Raised in the client when the model server reports a failure."""
+
+def load_authkey(address: str, create: bool = False) -> bytes:
+    """The socket's shared secret: MODEL_SERVER_AUTHKEY, or the key file next to the socket.
+
+    With ``create`` (the server starting) a new random key file is written, readable
+    only by its owner.
+    """
+    if settings.MODEL_SERVER_AUTHKEY:
+        return settings.MODEL_SERVER_AUTHKEY.encode()
+    path = f"{address}.key"
+    if create:
+        if os.path.exists(path):
+            os.remove(path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(os.urandom(32).hex())
+    with open(path) as f:
+        return f.read().strip().encode()
+
+class ModelServer:
+    """One process that owns the models and serves every API worker over a Unix socket.
+
+    Each client connection is handled on its own thread; requests from all
+    connections for the same operation are coalesced by a MicroBatcher, so
+    concurrent workers share one encode/generate call.
+    """
+
+    def __init__(self, address: str = None, warmup: List[str] = None):
+        self.address = address or settings.MODEL_SERVER_ADDRESS
+        self.models = ModelRegistry()
+        for name, loader in LOCAL_LOADERS.items():
+            self.models.register(name, loader)
+        self.models.warm_up(warmup if warmup is not None else settings.MODEL_WARMUP)
+
+        batch_options = {
+            "max_batch_size": settings.MODEL_SERVER_BATCH_SIZE,
+            "max_wait_ms": settings.MODEL_SERVER_BATCH_WAIT_MS
+        }
+        self._batchers = {
+            "embed": MicroBatcher(self._embed_batch, name="server-embed-batcher", **batch_options),
+            "rerank": MicroBatcher(self._rerank_batch, name="server-rerank-batcher", **batch_options),
+        }
+        for name in ("generator", "summarizer", "translator"):
+            self._batchers[name] = MicroBatcher(
+                functools.partial(self._pipeline_batch, name), name=f"server-{name}-batcher", **batch_options
+            )
+
+    def _embed_batch(self, requests: List[List[str]]) -> List[np.ndarray]:
+        # coalescing only groups requests; the model still runs in bounded forward passes,
+        # so one bulk-ingest request does not become a single huge one
+        texts = [text for texts in requests for text in texts]
+        embeddings = self.models.get("embedding").encode(
+            texts, convert_to_numpy=True, show_progress_bar=False, batch_size=settings.EMBEDDING_BATCH_SIZE
+        )
+        results = []
+        offset = 0
+        for texts in requests:
+            results.append(embeddings[offset:offset + len(texts)])
+            offset += len(texts)
+        return results
+
+    def _rerank_batch(self, requests: List[List[tuple]]) -> List[np.ndarray]:
+        pairs = [pair for pairs in requests for pair in pairs]
+        scores = self.models.get("reranker").predict(pairs, batch_size=settings.RERANK_BATCH_SIZE, show_progress_bar=False)
+        results = []
+        offset = 0
+        for pairs in requests:
+            results.append(scores[offset:offset + len(pairs)])
+            offset += len(pairs)
+        return results
+
+    def _pipeline_batch(self, name: str, requests: List[tuple]) -> List[list]:
+        # requests with different generation kwargs cannot share a call
+        groups = OrderedDict()
+        for i, (inputs, kwargs) in enumerate(requests):
+            groups.setdefault(tuple(sorted(kwargs.items())), []).append(i)
+
+        pipeline = self.models.get(name)
+        results = [None] * len(requests)
+        for key, indices in groups.items():
+            inputs = [text for i in indices for text in requests[i][0]]
+            kwargs = dict(key)
+            kwargs["batch_size"] = len(inputs)
+            outputs = pipeline(inputs, **kwargs)
+            offset = 0
+            for i in indices:
+                count = len(requests[i][0])
+                results[i] = outputs[offset:offset + count]
+                offset += count
+        return results
+
+    def _handle(self, op: str, args: tuple) -> Any:
+        if op == "embed":
+            return self._batchers["embed"].submit(args[0])
+        if op == "rerank":
+            return self._batchers["rerank"].submit(args[0])
+        if op == "pipeline":
+            name, inputs, kwargs = args
+            kwargs.pop("batch_size", None)
+            return self._batchers[name].submit((inputs, kwargs))
+        if op == "stats":
+            return {"models": self.models.get_stats(),
+                    "batchers": {name: b.get_stats() for name, b in self._batchers.items()}}
+        raise ValueError(f"Unknown model server operation: {op}")
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op == "stream":
+                        prompt, kwargs = args
+                        for piece in stream_generate(self.models.get("generator"), prompt, **kwargs):
+                            conn.send(("token", piece))
+                        conn.send(("end", None))
+                    else:
+                        conn.send(("ok", self._handle(op, args)))
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {str(e)}"))
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        authkey = load_authkey(self.address, create=True)
+        # requests are pickled, so only the owning user may connect: the socket is created
+        # without group/other permissions, and clients must prove they know the key
+        previous_umask = os.umask(0o077)
+        try:
+            listener = Listener(self.address, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(previous_umask)
+        with listener:
+            print(f"Model server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except AuthenticationError as e:
+                    print(f"Rejected model server connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+class ModelClient:
+    """Per-thread connections to the model server, reconnecting once on a dropped socket."""
+
+    def __init__(self, address: str = None):
+        self.address = address or settings.MODEL_SERVER_ADDRESS
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # read per connection: a restarted server writes a new key
+            conn = Client(self.address, family="AF_UNIX", authkey=load_authkey(self.address))
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _send(self, message: tuple):
+        try:
+            conn = self._connection()
+            conn.send(message)
+        except (EOFError, OSError):
+            self._reset()
+            conn = self._connection()
+            conn.send(message)
+        return conn
+
+    def call(self, op: str, *args) -> Any:
+        conn = self._send((op, args))
+        try:
+            status, value = conn.recv()
+        except (EOFError, OSError):
+            self._reset()
+            raise
+        if status == "error":
+            raise ModelServerError(value)
+        return value
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        conn = self._send(("stream", (prompt, kwargs)))
+        finished = False
+        try:
+            while True:
+                status, value = conn.recv()
+                if status == "token":
+                    yield value
+                elif status == "end":
+                    finished = True
+                    return
+                else:
+                    finished = True
+                    raise ModelServerError(value)
+        finally:
+            if not finished:
+                # abandoned mid-stream; the rest of the tokens would desync this socket
+                self._reset()
+
+class RemoteEncoder:
+    """Stands in for SentenceTransformer inside API workers."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def encode(self, texts, convert_to_numpy: bool = True, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self.client.call("embed", [texts])[0]
+        return self.client.call("embed", list(texts))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return settings.EMBEDDING_DIMENSION
+
+class RemoteCrossEncoder:
+    """Stands in for a sentence-transformers CrossEncoder inside API workers."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def predict(self, pairs, batch_size: int = None, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        return np.asarray(self.client.call("rerank", [tuple(pair) for pair in pairs]))
+
+class RemotePipeline:
+    """Stands in for a transformers pipeline inside API workers."""
+
+    def __init__(self, client: ModelClient, name: str):
+        self.client = client
+        self.name = name
+
+    def __call__(self, inputs, **kwargs) -> list:
+        if isinstance(inputs, str):
+            return self.client.call("pipeline", self.name, [inputs], kwargs)
+        return self.client.call("pipeline", self.name, list(inputs), kwargs)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        if self.name != "generator":
+            raise ValueError(f"Streaming is not supported for {self.name}")
+        return self.client.stream(prompt, **kwargs)
+
+_client = None
+
+def get_client() -> ModelClient:
+    global _client
+    if _client is None:
+        _client = ModelClient()
+    return _client
+
+def is_remote() -> bool:
+    return bool(settings.MODEL_SERVER_ADDRESS)
+
+def loader_for(name: str, *args) -> Callable[[], Any]:
+    """Local loader, or a proxy to the model server when MODEL_SERVER_ADDRESS is set."""
+    if not is_remote():
+        return functools.partial(LOCAL_LOADERS[name], *args)
+    if name == "embedding":
+        return lambda: RemoteEncoder(get_client())
+    if name == "reranker":
+        return lambda: RemoteCrossEncoder(get_client())
+    return lambda: RemotePipeline(get_client(), name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the embedding and generation models to API workers")
+    parser.add_argument("--address", default=settings.MODEL_SERVER_ADDRESS or "./model_server.sock",
+                        help="Unix socket path to listen on")
+    parser.add_argument("--warmup", nargs="*", default=None,
+                        help="Models to load before accepting connections (default: MODEL_WARMUP)")
+    args = parser.parse_args()
+
+    ModelServer(args.address, args.warmup).serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,142 @@
-from typing import List, Tuple
+from typing import List, Tuple, Dict, Iterator
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from app.config import settings
-from app.core.vector_store import vector_store
+from app.core.vector_store import VectorStore
+from app.core.embeddings import embedding_manager
+from app.core.collection_registry import Collection, collection_registry
+from app.core.calibration import confidence_calibrator
+from app.core.model_registry import model_registry
+from app.core.model_loaders import stream_generate
+from app.core.model_server import loader_for
+from app.core.reranker import reranker
+from app.core.context_builder import context_builder
+from app.core.tracing import propagate, span, traced
+from app.core import fusion, metadata_filter
+from app.monitoring.prometheus import metrics_registry
 from app.models import RetrievalResult
-from transformers import pipeline
+
+NO_CONTEXT_ANSWER = "I don't have enough information in my knowledge base to answer this question."
+GENERATION_ERROR_PREFIX = "Error generating answer"
+
+generated_tokens = metrics_registry.counter("rag_generated_tokens_total", "Answer tokens produced by the generator")
+generation_seconds = metrics_registry.histogram(
+    "rag_generation_seconds", "Generator call time, excluding the wait for a generation slot"
+)
+generation_tokens_per_second = metrics_registry.histogram(
+    "rag_generation_tokens_per_second", "Answer tokens per second of each generator call",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+)
 
 class RAGPipeline:
     
     def __init__(self):
-        print("Loading HuggingFace model for text generation...")
-        self.generator = pipeline(
-            "text2text-generation",
-            model="google/flan-t5-base",
-            max_length=512
+        model_registry.register("generator", loader_for("generator"))
+        # generation is the slowest stage; cap how many requests run it at once
+        self._generation_slots = threading.BoundedSemaphore(settings.GENERATION_CONCURRENCY)
+        # keyword searches run here while the calling thread embeds and searches FAISS
+        self._lexical_pool = ThreadPoolExecutor(max_workers=settings.HYBRID_SEARCH_THREADS,
+                                                thread_name_prefix="lexical-search")
+    
+    @property
+    def generator(self):
+        return model_registry.get("generator")
+    
+    def retrieve(self, query: str, top_k: int = None, query_embedding: np.ndarray = None,
+                 filters: Dict = None, collection: Collection = None) -> Tuple[List[RetrievalResult], float]:
+        vector_store = (collection or collection_registry.default).store
+        return self._to_retrieval_results(
+            vector_store, *self.retrieve_hits(query, top_k, query_embedding, filters, collection)
         )
     
-    def retrieve(self, query: str, top_k: int = None) -> Tuple[List[RetrievalResult], float]:
+    def retrieve_hits(self, query: str, top_k: int = None, query_embedding: np.ndarray = None,
+                      filters: Dict = None, collection: Collection = None) -> Tuple[List[Dict], List[float]]:
+        """Rows and raw scores of ``retrieve``, before confidence calibration (what calibration is fitted on)."""
         top_k = top_k or settings.TOP_K_RESULTS
-        results, scores = vector_store.search(query, top_k)
+        vector_store = (collection or collection_registry.default).store
+        # with re-ranking, the first stage retrieves a wider candidate set
+        candidates = max(top_k, settings.RERANK_CANDIDATES) if settings.RERANK_ENABLED else top_k
+        if not settings.HYBRID_SEARCH:
+            if query_embedding is None:
+                hits = vector_store.search(query, candidates, filters)
+            else:
+                hits = vector_store.search_by_vector(query_embedding, candidates, filters)
+        else:
+            per_retriever = max(candidates, settings.HYBRID_CANDIDATES)
+            lexical = self._lexical_pool.submit(propagate(vector_store.lexical_search), query, per_retriever, filters)
+            if query_embedding is None:
+                query_embedding = embedding_manager.embed_query(query)
+            dense = vector_store.search_by_vector(query_embedding, per_retriever, filters)
+            hits = self._fuse(vector_store, query_embedding, dense, lexical.result(), candidates)
+        
+        if settings.RERANK_ENABLED:
+            hits = reranker.rerank(query, *hits, top_k)
+        return hits
+    
+    def retrieve_batch(self, queries: List[str], top_k: int = None,
+                       collection: Collection = None) -> List[Tuple[List[RetrievalResult], float]]:
+        top_k = top_k or settings.TOP_K_RESULTS
+        vector_store = (collection or collection_registry.default).store
+        return [
+            self._to_retrieval_results(vector_store, results, scores)
+            for results, scores in self._search_many(vector_store, queries, top_k)
+        ]
+    
+    def _search_many(self, vector_store: VectorStore, queries: List[str], top_k: int,
+                     query_embeddings: np.ndarray = None) -> List[Tuple[List[Dict], List[float]]]:
+        candidates = max(top_k, settings.RERANK_CANDIDATES) if settings.RERANK_ENABLED else top_k
+        if not settings.HYBRID_SEARCH:
+            if query_embeddings is None:
+                hits = vector_store.search_batch(queries, candidates)
+            else:
+                hits = vector_store.search_by_vectors(query_embeddings, candidates)
+        else:
+            per_retriever = max(candidates, settings.HYBRID_CANDIDATES)
+            lexical = [self._lexical_pool.submit(propagate(vector_store.lexical_search), query, per_retriever)
+                       for query in queries]
+            if query_embeddings is None:
+                query_embeddings = embedding_manager.embed_texts(queries, show_progress_bar=False)
+            dense = vector_store.search_by_vectors(query_embeddings, per_retriever)
+            hits = [
+                self._fuse(vector_store, embedding, dense_hits, lexical_hits.result(), candidates)
+                for embedding, dense_hits, lexical_hits in zip(query_embeddings, dense, lexical)
+            ]
+        
+        if settings.RERANK_ENABLED:
+            # one cross-encoder pass over the candidates of every query in the batch
+            hits = reranker.rerank_many(queries, hits, top_k)
+        return hits
+    
+    @traced("fusion")
+    def _fuse(self, vector_store: VectorStore, query_embedding: np.ndarray, dense: Tuple[List[Dict], List[float]],
+              lexical: Tuple[List[Dict], List[float]], top_k: int) -> Tuple[List[Dict], List[float]]:
+        """Merge dense and BM25 hits; results keep their vector similarity as the score
+        so confidence calibration sees the same scale with or without hybrid search."""
+        (dense_rows, dense_scores), (lexical_rows, lexical_scores) = dense, lexical
+        rows = {row["id"]: row for row in lexical_rows}
+        rows.update((row["id"], row) for row in dense_rows)
+        weight = settings.HYBRID_LEXICAL_WEIGHT
+        ranked = fusion.fuse(
+            settings.HYBRID_FUSION,
+            [[row["id"] for row in dense_rows], [row["id"] for row in lexical_rows]],
+            [dense_scores, lexical_scores],
+            [1.0 - weight, weight],
+            settings.HYBRID_RRF_K
+        )[:top_k]
+        
+        similarity = {row["id"]: score for row, score in zip(dense_rows, dense_scores)}
+        keyword_only = [row_id for row_id in ranked if row_id not in similarity]
+        if keyword_only:
+            similarity.update(vector_store.similarities(query_embedding, keyword_only))
+        ranked = [row_id for row_id in ranked if row_id in similarity]
+        return [rows[row_id] for row_id in ranked], [similarity[row_id] for row_id in ranked]
+    
+    def _to_retrieval_results(self, vector_store: VectorStore, results: List[Dict],
+                              scores: List[float]) -> Tuple[List[RetrievalResult], float]:
         avg_confidence = sum(scores) / len(scores) if scores else 0.0
+        avg_confidence = confidence_calibrator.calibrate(avg_confidence, vector_store)
         
         retrieval_results = [
             RetrievalResult(
@@ -30,29 +149,175 @@ class RAGPipeline:
         
         return retrieval_results, avg_confidence
     
+    def _build_prompt(self, query: str, context_docs: List[RetrievalResult]) -> str:
+        return context_builder.build_prompt(query, context_docs)
+    
+    @traced("generate_answer")
     def generate_answer(self, query: str, context_docs: List[RetrievalResult]) -> str:
         if not context_docs:
-            return "I don't have enough information in my knowledge base to answer this question."
+            return NO_CONTEXT_ANSWER
         
-        context = "\n\n".join([doc.text for doc in context_docs[:3]])
-        
-        prompt = f"""Answer the question based on the context below.
-
-Context: {context}
-
-Question: {query}
-
-Answer:"""
+        try:
+            prompt = self._build_prompt(query, context_docs)
+            with self._generation_slots, span("generation"):
+                started = time.perf_counter()
+                result = self.generator(prompt, max_length=200, do_sample=False)
+                elapsed = time.perf_counter() - started
+            answer = result[0]['generated_text']
+        except Exception as e:
+            return f"{GENERATION_ERROR_PREFIX}: {str(e)}"
+        self._record_generation([answer], elapsed)
+        return answer
+    
+    @traced("generate_answer")
+    def generate_answers(self, queries: List[str], contexts: List[List[RetrievalResult]]) -> List[str]:
+        """Generate answers for several queries in one batched generator call."""
+        answers = [NO_CONTEXT_ANSWER] * len(queries)
+        pending = [i for i, context_docs in enumerate(contexts) if context_docs]
+        if not pending:
+            return answers
         
         try:
-            result = self.generator(prompt, max_length=200, do_sample=False)
-            return result[0]['generated_text']
+            prompts = [self._build_prompt(queries[i], contexts[i]) for i in pending]
+            with self._generation_slots, span("generation", batch_size=len(prompts)):
+                started = time.perf_counter()
+                results = self.generator(prompts, max_length=200, do_sample=False, batch_size=len(prompts))
+                elapsed = time.perf_counter() - started
+            for i, result in zip(pending, results):
+                answers[i] = result[0]['generated_text'] if isinstance(result, list) else result['generated_text']
         except Exception as e:
-            return f"Error generating answer: {str(e)}"
+            for i in pending:
+                answers[i] = f"{GENERATION_ERROR_PREFIX}: {str(e)}"
+            return answers
+        self._record_generation([answers[i] for i in pending], elapsed)
+        return answers
+    
+    def _record_generation(self, answers: List[str], seconds: float):
+        tokenizer = context_builder.tokenizer
+        tokens = sum(len(tokenizer(answer, add_special_tokens=False)["input_ids"]) for answer in answers)
+        generated_tokens.inc(amount=tokens)
+        generation_seconds.observe(seconds)
+        if seconds > 0:
+            generation_tokens_per_second.observe(tokens / seconds)
     
-    def query(self, query: str, top_k: int = None) -> Tuple[str, List[RetrievalResult], float]:
-        retrieval_results, confidence = self.retrieve(query, top_k)
+    def _lookup_cache(self, collection: Collection, query: str, top_k: int, filter_key: str = ""):
+        """Return (version, query embedding, cached result or None)."""
+        version = collection.store.version
+        cached = collection.answer_cache.get_exact(query, top_k, version, filter_key)
+        if cached is not None:
+            return version, None, cached
+        
+        query_embedding = embedding_manager.embed_query(query)
+        return version, query_embedding, collection.answer_cache.get_similar(query_embedding, top_k, version, filter_key)
+    
+    def query(self, query: str, top_k: int = None, filters: Dict = None,
+              collection: Collection = None) -> Tuple[str, List[RetrievalResult], float]:
+        top_k = top_k or settings.TOP_K_RESULTS
+        collection = collection or collection_registry.default
+        if not settings.ANSWER_CACHE_ENABLED:
+            retrieval_results, confidence = self.retrieve(query, top_k, filters=filters, collection=collection)
+            answer = self.generate_answer(query, retrieval_results)
+            return answer, retrieval_results, confidence
+        
+        filter_key = metadata_filter.filter_key(filters)
+        version, query_embedding, cached = self._lookup_cache(collection, query, top_k, filter_key)
+        if cached is not None:
+            return cached
+        
+        retrieval_results, confidence = self.retrieve(
+            query, top_k, query_embedding=query_embedding, filters=filters, collection=collection
+        )
         answer = self.generate_answer(query, retrieval_results)
-        return answer, retrieval_results, confidence
+        result = (answer, retrieval_results, confidence)
+        if not answer.startswith(GENERATION_ERROR_PREFIX):
+            collection.answer_cache.put(query, query_embedding, top_k, result, version, filter_key)
+        return result
+    
+    def stream_answer(self, query: str, context_docs: List[RetrievalResult]) -> Iterator[str]:
+        """Yield answer text as flan-t5 decodes it instead of after the last token."""
+        if not context_docs:
+            yield NO_CONTEXT_ANSWER
+            return
+        
+        pieces = []
+        try:
+            prompt = self._build_prompt(query, context_docs)
+            with self._generation_slots:
+                started = time.perf_counter()
+                for piece in stream_generate(self.generator, prompt, max_length=200, do_sample=False):
+                    pieces.append(piece)
+                    yield piece
+                elapsed = time.perf_counter() - started
+        except Exception as e:
+            yield f"{GENERATION_ERROR_PREFIX}: {str(e)}"
+            return
+        self._record_generation(["".join(pieces)], elapsed)
+    
+    def stream_query(self, query: str, top_k: int = None,
+                     collection: Collection = None) -> Tuple[List[RetrievalResult], float, Iterator[str]]:
+        """Retrieve now and return an iterator that generates the answer lazily."""
+        top_k = top_k or settings.TOP_K_RESULTS
+        collection = collection or collection_registry.default
+        version, query_embedding, cached = None, None, None
+        if settings.ANSWER_CACHE_ENABLED:
+            version, query_embedding, cached = self._lookup_cache(collection, query, top_k)
+        if cached is not None:
+            answer, retrieval_results, confidence = cached
+            return retrieval_results, confidence, iter([answer])
+        
+        retrieval_results, confidence = self.retrieve(query, top_k, query_embedding=query_embedding,
+                                                      collection=collection)
+        
+        def tokens():
+            pieces = []
+            for piece in self.stream_answer(query, retrieval_results):
+                pieces.append(piece)
+                yield piece
+            answer = "".join(pieces)
+            failed = bool(pieces) and pieces[-1].startswith(GENERATION_ERROR_PREFIX)
+            if settings.ANSWER_CACHE_ENABLED and not failed:
+                collection.answer_cache.put(query, query_embedding, top_k, (answer, retrieval_results, confidence), version)
+        
+        return retrieval_results, confidence, tokens()
+    
+    def query_batch(self, queries: List[str], top_k: int = None,
+                    collection: Collection = None) -> List[Tuple[str, List[RetrievalResult], float]]:
+        top_k = top_k or settings.TOP_K_RESULTS
+        collection = collection or collection_registry.default
+        if not settings.ANSWER_CACHE_ENABLED:
+            return self._answer_batch(collection.store, queries, top_k)
+        
+        answer_cache = collection.answer_cache
+        version = collection.store.version
+        answers = [answer_cache.get_exact(query, top_k, version) for query in queries]
+        pending = [i for i, answer in enumerate(answers) if answer is None]
+        if pending:
+            embeddings = embedding_manager.embed_texts([queries[i] for i in pending], show_progress_bar=False)
+            misses = []
+            for i, embedding in zip(pending, embeddings):
+                answers[i] = answer_cache.get_similar(embedding, top_k, version)
+                if answers[i] is None:
+                    misses.append((i, embedding))
+            
+            if misses:
+                fresh = self._answer_batch(collection.store, [queries[i] for i, _ in misses], top_k,
+                                           np.stack([e for _, e in misses]))
+                for (i, embedding), result in zip(misses, fresh):
+                    answers[i] = result
+                    if not result[0].startswith(GENERATION_ERROR_PREFIX):
+                        answer_cache.put(queries[i], embedding, top_k, result, version)
+        return answers
+    
+    def _answer_batch(self, vector_store: VectorStore, queries: List[str], top_k: int,
+                      query_embeddings: np.ndarray = None) -> List[Tuple[str, List[RetrievalResult], float]]:
+        retrievals = [
+            self._to_retrieval_results(vector_store, results, scores)
+            for results, scores in self._search_many(vector_store, queries, top_k, query_embeddings)
+        ]
+        answers = self.generate_answers(queries, [retrieval_results for retrieval_results, _ in retrievals])
+        return [
+            (answer, retrieval_results, confidence)
+            for answer, (retrieval_results, confidence) in zip(answers, retrievals)
+        ]
 
 rag_pipeline = RAGPipeline()
\ No newline at end of file
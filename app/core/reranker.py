@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from app.config import settings
+from app.core.embedding_cache import content_hash
+from app.core.model_registry import model_registry
+from app.core.model_server import loader_for
+from app.core.tracing import traced
+from app.monitoring.prometheus import cache_lookups, metrics_registry
+
+class Reranker:
+    """Re-scores first-stage candidates with a cross-encoder.
+
+    Pairs are scored in batches, in first-stage order, and their scores are cached
+    per (query, chunk). Scoring stops when the next batch would overrun
+    ``RERANK_BUDGET_MS`` (including time spent waiting for a free model slot under
+    load); candidates left unscored keep their first-stage order after the scored ones.
+    """
+
+    def __init__(self):
+        model_registry.register("reranker", loader_for("reranker"))
+        self._slots = threading.BoundedSemaphore(settings.RERANK_CONCURRENCY)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        # running estimate of cross-encoder seconds per pair, used to stop before the budget
+        self._seconds_per_pair = None
+        self.stats = {
+            "queries": 0,
+            "pairs_scored": 0,
+            "cache_hits": 0,
+            "budget_exhausted": 0,
+            "errors": 0
+        }
+        metrics_registry.add_collector(self._collect_metrics)
+
+    @property
+    def model(self):
+        return model_registry.get("reranker")
+
+    def rerank(self, query: str, rows: List[Dict], scores: List[float], top_k: int) -> Tuple[List[Dict], List[float]]:
+        return self.rerank_many([query], [(rows, scores)], top_k)[0]
+
+    @traced("rerank")
+    def rerank_many(self, queries: List[str], hits: List[Tuple[List[Dict], List[float]]],
+                    top_k: int) -> List[Tuple[List[Dict], List[float]]]:
+        """Reorder each query's ``(rows, scores)`` by cross-encoder score and keep ``top_k``."""
+        deadline = time.perf_counter() + settings.RERANK_BUDGET_MS / 1000
+        keys = [
+            [(query, content_hash(row["text"])) for row in rows]
+            for query, (rows, _) in zip(queries, hits)
+        ]
+        rerank_scores = {}
+        pending = []
+        with self._lock:
+            self.stats["queries"] += len(queries)
+            for query, (rows, _), query_keys in zip(queries, hits, keys):
+                for row, key in zip(rows, query_keys):
+                    if key in rerank_scores:
+                        continue
+                    cached = self._cache.get(key)
+                    if cached is not None:
+                        self._cache.move_to_end(key)
+                        rerank_scores[key] = cached
+                        self.stats["cache_hits"] += 1
+                    else:
+                        rerank_scores[key] = None
+                        pending.append((key, query, row["text"]))
+
+        if pending:
+            rerank_scores.update(self._score(pending, deadline))
+
+        results = []
+        for (rows, scores), query_keys in zip(hits, keys):
+            scored = [i for i, key in enumerate(query_keys) if rerank_scores.get(key) is not None]
+            scored.sort(key=lambda i: rerank_scores[query_keys[i]], reverse=True)
+            unscored = [i for i, key in enumerate(query_keys) if rerank_scores.get(key) is None]
+            order = (scored + unscored)[:top_k]
+            results.append(([rows[i] for i in order], [scores[i] for i in order]))
+        return results
+
+    def _score(self, pending: List[Tuple], deadline: float) -> Dict:
+        scores = {}
+        batch_size = settings.RERANK_BATCH_SIZE
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+            self._exhausted()
+            return scores
+        try:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                estimate = (self._seconds_per_pair or 0.0) * len(batch)
+                if time.perf_counter() + estimate > deadline:
+                    self._exhausted()
+                    break
+                started = time.perf_counter()
+                batch_scores = self.model.predict(
+                    [(query, text) for _, query, text in batch], batch_size=len(batch), show_progress_bar=False
+                )
+                per_pair = (time.perf_counter() - started) / len(batch)
+                with self._lock:
+                    self._seconds_per_pair = per_pair if self._seconds_per_pair is None \
+                        else 0.8 * self._seconds_per_pair + 0.2 * per_pair
+                    for (key, _, _), score in zip(batch, batch_scores):
+                        scores[key] = float(score)
+                        self._cache[key] = float(score)
+                    while len(self._cache) > settings.RERANK_CACHE_SIZE:
+                        self._cache.popitem(last=False)
+                    self.stats["pairs_scored"] += len(batch)
+        except Exception as e:
+            # a failing reranker must not fail the query; first-stage order is still valid
+            print(f"Re-ranking failed: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+        finally:
+            self._slots.release()
+        return scores
+
+    def _exhausted(self):
+        with self._lock:
+            self.stats["budget_exhausted"] += 1
+
+    def _collect_metrics(self):
+        with self._lock:
+            hits, misses = self.stats["cache_hits"], self.stats["pairs_scored"]
+        cache_lookups.set(hits, "rerank", "hit")
+        cache_lookups.set(misses, "rerank", "miss")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "cached_pairs": len(self._cache),
+                "ms_per_pair": self._seconds_per_pair * 1000 if self._seconds_per_pair is not None else None
+            }
+
+reranker = Reranker()
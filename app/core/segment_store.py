@@ -0,0 +1,200 @@
+import bisect
+import json
+import os
+import shutil
+from typing import Dict, Iterator, List
+import numpy as np
+from app.core.metadata_filter import matching_offsets
+from app.core.metadata_store import ColumnarMetadata
+
+class Segment:
+    """Immutable, compacted range of row ids [start, end): raw vectors plus their metadata.
+
+    A segment starts out dense (one stored row per id). Purging deleted rows
+    rewrites it with the survivors only, and their ids are kept in ids.npy.
+    """
+
+    def __init__(self, path: str, start: int, rows: int, end: int = None):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.start = start
+        self.rows = rows
+        self.end = end if end is not None else start + rows
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.metadata = ColumnarMetadata(path)
+        self._ids = None
+        if not self.dense:
+            self._ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+
+    @property
+    def dense(self) -> bool:
+        return self.rows == self.end - self.start
+
+    @property
+    def row_ids(self) -> np.ndarray:
+        if self._ids is None:
+            self._ids = np.arange(self.start, self.end, dtype=np.int64)
+        return self._ids
+
+    def offset_of(self, row_id: int) -> int:
+        if self.dense:
+            return row_id - self.start
+        offset = int(np.searchsorted(self.row_ids, row_id))
+        if offset >= self.rows or self.row_ids[offset] != row_id:
+            raise IndexError(row_id)
+        return offset
+
+    def get(self, offset: int) -> Dict:
+        return self.metadata.get(offset)
+
+    def matching_ids(self, filters: Dict) -> np.ndarray:
+        """Row ids whose metadata satisfies normalized ``filters``, via the columns' postings."""
+        offsets = matching_offsets(self.metadata.postings, filters)
+        return np.asarray(self.row_ids[offsets], dtype=np.int64) if len(offsets) else offsets
+
+    @staticmethod
+    def write(path: str, vectors: np.ndarray, texts: List[str], metadatas: List[Dict], ids: np.ndarray = None):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "vectors.npy"), 'wb') as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype='float32'))
+            f.flush()
+            os.fsync(f.fileno())
+        if ids is not None:
+            with open(os.path.join(path, "ids.npy"), 'wb') as f:
+                np.save(f, np.ascontiguousarray(ids, dtype=np.int64))
+                f.flush()
+                os.fsync(f.fileno())
+        ColumnarMetadata.write(path, texts, metadatas)
+
+class SegmentStore:
+    """Ordered list of segments described by an atomically replaced manifest."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_file = os.path.join(directory, "manifest.json")
+        self.segments: List[Segment] = []
+        self.next_seq = 0
+        # bumped when rows disappear (a purge or a clear), so readers know to reload
+        self.generation = 0
+
+    @property
+    def end(self) -> int:
+        """One past the highest row id covered by a segment."""
+        return self.segments[-1].end if self.segments else 0
+
+    @property
+    def rows(self) -> int:
+        return sum(segment.rows for segment in self.segments)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_file)
+
+    def load(self, remove_orphans: bool = True):
+        self.segments = []
+        self.next_seq = 0
+        self.generation = 0
+        if not self.exists():
+            return
+        with open(self.manifest_file) as f:
+            manifest = json.load(f)
+        self.next_seq = manifest["next_seq"]
+        self.generation = manifest.get("generation", 0)
+        for entry in manifest["segments"]:
+            path = os.path.join(self.directory, entry["name"])
+            self.segments.append(Segment(path, entry["start"], entry["rows"], entry.get("end")))
+        if remove_orphans:
+            # only the writer may; a reader could see a segment written before its manifest
+            self._remove_orphans()
+
+    def locate(self, row_id: int):
+        starts = [segment.start for segment in self.segments]
+        position = bisect.bisect_right(starts, row_id) - 1
+        if position < 0 or row_id >= self.segments[position].end:
+            raise IndexError(row_id)
+        segment = self.segments[position]
+        return segment, segment.offset_of(row_id)
+
+    def get(self, row_id: int) -> Dict:
+        segment, offset = self.locate(row_id)
+        return segment.get(offset)
+
+    def iter_vectors(self) -> Iterator[np.ndarray]:
+        for segment in self.segments:
+            yield segment.vectors
+
+    def write_segment(self, start: int, vectors: np.ndarray, texts: List[str], metadatas: List[Dict],
+                      end: int = None, ids: np.ndarray = None) -> Segment:
+        """Write rows covering ids [start, end); ``ids`` is only needed when some are missing."""
+        end = end if end is not None else start + len(texts)
+        if ids is not None and len(ids) == end - start:
+            ids = None
+        name = f"seg-{self.next_seq:08d}"
+        self.next_seq += 1
+        path = os.path.join(self.directory, name)
+        Segment.write(path, vectors, texts, metadatas, ids)
+        return Segment(path, start, len(texts), end)
+
+    def merge(self, first: Segment, second: Segment) -> Segment:
+        vectors = np.concatenate([first.vectors, second.vectors])
+        ids = np.concatenate([first.row_ids, second.row_ids])
+        texts = []
+        metadatas = []
+        for segment in (first, second):
+            for text, metadata in segment.metadata.iter_rows():
+                texts.append(text)
+                metadatas.append(metadata)
+        return self.write_segment(first.start, vectors, texts, metadatas, end=second.end, ids=ids)
+
+    def purge(self, segment: Segment, row_ids: np.ndarray) -> Segment:
+        """Rewrite a segment without the given (deleted) rows, keeping its id range."""
+        keep = ~np.isin(segment.row_ids, row_ids)
+        offsets = np.flatnonzero(keep)
+        texts = []
+        metadatas = []
+        for offset in offsets:
+            row = segment.get(int(offset))
+            texts.append(row["text"])
+            metadatas.append(row["metadata"])
+        vectors = segment.vectors[offsets] if len(offsets) else np.zeros((0, segment.vectors.shape[1]), dtype='float32')
+        return self.write_segment(segment.start, vectors, texts, metadatas,
+                                  end=segment.end, ids=np.asarray(segment.row_ids)[offsets])
+
+    @staticmethod
+    def pick_merge(segments: List[Segment], max_segments: int):
+        """Return the index of the smallest adjacent pair when there are too many segments."""
+        if len(segments) <= max_segments:
+            return None
+        sizes = [a.rows + b.rows for a, b in zip(segments, segments[1:])]
+        return sizes.index(min(sizes))
+
+    def write_manifest(self, segments: List[Segment]):
+        manifest = {
+            "next_seq": self.next_seq,
+            "generation": self.generation,
+            "segments": [
+                {"name": s.name, "start": s.start, "rows": s.rows, "end": s.end}
+                for s in segments
+            ]
+        }
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.manifest_file)
+
+    def replace(self, segments: List[Segment]):
+        """Swap in a segment list that has already been written to the manifest."""
+        self.segments = segments
+        self._remove_orphans()
+
+    def clear(self):
+        self.generation += 1
+        self.write_manifest([])
+        self.replace([])
+
+    def _remove_orphans(self):
+        live = {s.name for s in self.segments}
+        for name in os.listdir(self.directory):
+            if name.startswith("seg-") and name not in live:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
@@ -0,0 +1,206 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from app.config import settings
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+class Trace:
+    """The spans recorded while one request was being served."""
+
+    def __init__(self, name: str, attributes: Dict):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.root = Span(self, name, None, attributes)
+
+    def timings(self) -> Dict[str, float]:
+        """Milliseconds per stage name, summed over repeated stages, plus the total.
+
+        A span nested in a span of the same name (a traced method calling another
+        traced method of the same stage) is not counted twice.
+        """
+        names = {s.span_id: (s.name, s.parent_id) for s in self.spans}
+        timings = {}
+        for finished in self.spans:
+            parent_id = finished.parent_id
+            while parent_id in names and names[parent_id][0] != finished.name:
+                parent_id = names[parent_id][1]
+            if parent_id in names:
+                continue
+            timings[finished.name] = timings.get(finished.name, 0.0) + finished.duration_ms
+        timings["total"] = self.root.duration_ms
+        return timings
+
+    def to_otlp(self) -> Dict:
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", settings.APP_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "app.core.tracing"},
+                "spans": [self._otlp_span(s) for s in [self.root, *self.spans]]
+            }]
+        }]}
+
+    def _otlp_span(self, s: Span) -> Dict:
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 2 if s is self.root else 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in s.attributes.items()]
+        }
+        if s.parent_id:
+            otlp["parentSpanId"] = s.parent_id
+        return otlp
+
+def _otlp_attribute(key: str, value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Optional[Trace]]:
+    """Trace everything run under this block, including work handed to stage executors."""
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace(name, attributes)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(token)
+        trace.root.end_ns = time.time_ns()
+        trace_exporter.submit(trace)
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Time a stage of the current trace; outside a trace this does nothing."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        parent.trace.spans.append(current)
+
+def traced(name: str) -> Callable:
+    """Decorator form of ``span``."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def propagate(fn: Callable) -> Callable:
+    """Bind ``fn`` to the caller's trace context, for work submitted to other thread pools."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+class TraceExporter:
+    """Writes finished traces off the request path.
+
+    Traces are queued in memory and a background thread appends them as OTLP/JSON
+    lines to ``TRACE_EXPORT_PATH`` and stores each request's per-stage timings in
+    MetricsDB's ``stage_timings`` table (the whole request as stage ``total``), apart
+    from the request metrics and their rollups. When the queue is full, traces are
+    dropped and counted.
+    """
+
+    def __init__(self):
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.stats = {"exported": 0, "dropped": 0, "failed": 0}
+
+    def submit(self, trace: Trace):
+        if len(self._queue) >= settings.TRACE_EXPORT_QUEUE_SIZE:
+            self.stats["dropped"] += 1
+            return
+        self._queue.append(trace)
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.TRACE_EXPORT_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+
+    def flush(self):
+        traces = []
+        while self._queue:
+            traces.append(self._queue.popleft())
+        if not traces:
+            return
+        try:
+            if settings.TRACE_EXPORT_PATH:
+                with open(settings.TRACE_EXPORT_PATH, "a") as f:
+                    for trace in traces:
+                        f.write(json.dumps(trace.to_otlp()) + "\n")
+            if settings.TRACE_RECORD_METRICS:
+                from app.monitoring.metrics import metrics_db
+                metrics_db.log_stage_timings([
+                    {"trace_id": trace.trace_id, "trace": trace.root.name, "stage": name, "latency": milliseconds / 1000}
+                    for trace in traces
+                    for name, milliseconds in trace.timings().items()
+                ])
+        except Exception:
+            self.stats["failed"] += len(traces)
+            raise
+        self.stats["exported"] += len(traces)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "queued": len(self._queue)}
+
+trace_exporter = TraceExporter()
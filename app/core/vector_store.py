@@ -1,91 +1,1164 @@
 import faiss
+import fcntl
 import numpy as np
 import pickle
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Tuple, Dict
 from app.config import settings
 from app.core.embeddings import embedding_manager
+from app.core import index_factory, metadata_filter
+from app.core.batching import MicroBatcher
+from app.core.embedding_cache import EmbeddingCache, content_hash
+from app.core.document_index import DocumentIndex
+from app.core.lexical_index import LexicalIndex
+from app.core.segment_store import SegmentStore
+from app.core.tracing import traced
+from app.monitoring.prometheus import metrics_registry
+from app.core.wal import WriteAheadLog, RECORD_ADD, RECORD_DELETE
+
+faiss_search_seconds = metrics_registry.histogram(
+    "rag_faiss_search_seconds", "Time in the FAISS (or exact filtered) search of a query batch", ["mode"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# chunk metadata that differs between ingests of identical content
+VOLATILE_METADATA = ("created_at",)
+
+def _metadata_key(metadata: Dict) -> str:
+    return json.dumps({key: value for key, value in metadata.items() if key not in VOLATILE_METADATA},
+                      sort_keys=True, default=str)
+
+def _file_version(path: str):
+    """Identity of a file's current contents (None if it does not exist), to notice replacements cheaply."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+class ReadOnlyStore(RuntimeError):
+    """A write to a store opened while another process holds the index's writer lock."""
 
 class VectorStore:
-    
-    def __init__(self, dimension: int = None, index_path: str = None):
+    """Chunk vectors, texts and metadata in one index directory.
+
+    Only one process writes a directory: the first to open it takes an exclusive
+    lock on ``writer.lock``. Every other opener (another API worker, the dashboard,
+    an ingest script) gets a read-only store: it never truncates the log, removes
+    files, compacts or checkpoints, and its writes raise ``ReadOnlyStore``.
+
+    A read-only store follows the writer. Before each search it compares the
+    manifest, the tombstone file and the log sizes with what it has read (a few
+    stats) and replays only the new log records, compactions and deletes. A purge
+    or clear bumps the manifest generation and makes it reload from disk.
+
+    With several API workers, searches on every worker see writes within one
+    refresh, but only the worker holding the lock can write: uploads, upserts and
+    deletes that reach another worker return 503, and clients should retry them
+    (or send writes to a single-worker ingest service).
+    """
+
+    def __init__(self, dimension: int = None, index_path: str = None, index_type: str = None, metric: str = None):
         self.dimension = dimension or embedding_manager.get_dimension()
         self.index_path = index_path or settings.VECTOR_DB_PATH
+        self.index_type = index_type or settings.VECTOR_INDEX_TYPE
+        self.metric = metric or settings.VECTOR_METRIC
         self.index_file = os.path.join(self.index_path, "faiss_index.bin")
         self.metadata_file = os.path.join(self.index_path, "metadata.pkl")
-        
+        self.checkpoint_file = os.path.join(self.index_path, "index.json")
+        self.tombstone_file = os.path.join(self.index_path, "tombstones.npy")
+        self._writer_lock = self._acquire_writer_lock()
+        self.read_only = self._writer_lock is None
+        if self.read_only:
+            print(f"Vector store {self.index_path} is being written by another process; opening read-only")
+
         self.index = None
-        self.metadata_store = []
+        self.segment_store = SegmentStore(self.index_path)
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(self.index_path, "embedding_cache.db"), embedding_manager.model_name
+        )
+        self.documents = DocumentIndex(os.path.join(self.index_path, "documents.db"))
+        self.lexical = LexicalIndex(os.path.join(self.index_path, "lexical.db"))
+        self.wal = WriteAheadLog(self.index_path, fsync=settings.WAL_FSYNC)
+        # rows that are in the write-ahead log but not yet compacted into a segment
+        self.tail = []
+        # deleted row ids still present in segments, the tail and the FAISS index;
+        # searches filter them out until compaction purges them
+        self.tombstones = set()
+        self.purged_rows = 0
+        self._search_params = None
+        # (filter, corpus version) -> matching live row ids
+        self._filter_cache = OrderedDict()
+        self.nprobe = settings.IVF_NPROBE
+        self.ef_search = settings.HNSW_EF_SEARCH
+        self.checkpoint_end = 0
+        self.index_evaluation = None
+        # what a read-only store has seen of the writer's files
+        self._manifest_version = None
+        self._tombstone_version = None
+        self._wal_positions = {}
+        # bumped on every corpus change so caches of query results can be invalidated
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._compaction_wakeup = threading.Event()
+        self._last_compaction = time.time()
+        self._migrating = False
+        self._closed = False
+        # bumped by clear_index and purges so an in-flight migration does not resurrect old rows
+        self._generation = 0
+        self._checkpoint_lock = threading.Lock()
+        self._search_batcher = MicroBatcher(
+            self._search_requests,
+            max_batch_size=settings.QUERY_BATCH_MAX_SIZE,
+            max_wait_ms=settings.QUERY_BATCH_WAIT_MS,
+            name="vector-store-search-batcher"
+        )
+
         self.load_or_create_index()
-    
+        if not self.read_only:
+            self._start_compactor()
+
+    def _acquire_writer_lock(self):
+        """The open, exclusively locked ``writer.lock``, or None if another process holds it."""
+        os.makedirs(self.index_path, exist_ok=True)
+        lock_file = open(os.path.join(self.index_path, "writer.lock"), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ReadOnlyStore(f"Vector store {self.index_path} is read-only in this process; "
+                                "write through the process that holds its writer lock")
+
+    @property
+    def next_id(self) -> int:
+        return self.segment_store.end + len(self.tail)
+
     def load_or_create_index(self):
-        if os.path.exists(self.index_file) and os.path.exists(self.metadata_file):
-            print("Loading existing FAISS index...")
-            self.index = faiss.read_index(self.index_file)
-            with open(self.metadata_file, 'rb') as f:
-                self.metadata_store = pickle.load(f)
-            print(f"Loaded index with {self.index.ntotal} vectors")
+        with self._compaction_lock, self._lock:
+            if (not self.read_only and not self.segment_store.exists()
+                    and os.path.exists(self.index_file) and os.path.exists(self.metadata_file)):
+                self._migrate_legacy_index()
+
+            print("Loading FAISS index from segments...")
+            self._manifest_version = _file_version(self.segment_store.manifest_file)
+            self.segment_store.load(remove_orphans=not self.read_only)
+            self.tail = []
+            self.tombstones = set()
+            self._tombstone_version = None
+            self._wal_positions = {}
+
+            self.index, self.checkpoint_end = self._load_checkpoint()
+            for ids, block in self._iter_vector_blocks(self.segment_store.segments, [], self.checkpoint_end):
+                self.index.add_with_ids(block, ids)
+
+            if self.read_only:
+                # the writer keeps the side indexes in step with the log
+                if not self._catch_up():
+                    # purged or cleared while loading; the next refresh reloads
+                    self._manifest_version = None
+                self._refresh_search_params()
+                print(f"Opened {index_factory.index_type_of(self.index)} index with {self.index.ntotal} vectors "
+                      f"read-only ({len(self.tail)} rows from the writer's log)")
+            else:
+                replayed, deleted, _ = self._replay(self.wal.replay())
+                # rows deleted before the last compaction; purged ones no longer exist
+                self.tombstones.update(row_id for row_id in self._load_tombstones() if self._row_exists(row_id))
+                self._refresh_search_params()
+                self._sync_side_indexes(replayed, deleted)
+                self.wal.open(self.next_id)
+                print(f"Loaded {index_factory.index_type_of(self.index)} index with {self.index.ntotal} vectors "
+                      f"({len(self.tail)} replayed from log, {len(self.tombstones)} deleted)")
+
+        self._maybe_migrate()
+
+    def _replay(self, records, stop_at_gap: bool = False) -> Tuple[List[Tuple[int, Dict]], List[int], bool]:
+        """Apply logged records; returns the rows added, the rows deleted and whether a gap stopped it.
+
+        A gap is an add past the next row id: rows before it were compacted out of
+        the log before this process read them. The writer skips such records; a
+        reader stops so it can pick the rows up from the new segment first.
+        """
+        replayed = []
+        deleted = []
+        for kind, row_id, payload in records:
+            if kind == RECORD_DELETE:
+                # deletes can target rows of any age, including ones already compacted
+                if self._row_exists(row_id) and row_id not in self.tombstones:
+                    self.tombstones.add(row_id)
+                    deleted.append(row_id)
+                continue
+            if row_id < self.next_id:
+                continue
+            if kind != RECORD_ADD or row_id != self.next_id:
+                if stop_at_gap:
+                    return replayed, deleted, True
+                print(f"Skipping out-of-order write-ahead log record {row_id}")
+                continue
+            row = self._decode_row(payload)
+            self.index.add_with_ids(self._prepare(row["vector"]), np.array([row_id], dtype=np.int64))
+            self.tail.append(row)
+            replayed.append((row_id, row))
+        return replayed, deleted, False
+
+    def refresh(self) -> bool:
+        """Catch a read-only store up with its writer; returns whether anything changed."""
+        if not self.read_only or self._closed or not self._changed_on_disk():
+            return False
+        with self._lock:
+            if not self._changed_on_disk():
+                return False
+            caught_up = self._catch_up()
+            if caught_up:
+                self._refresh_search_params()
+                self.version += 1
+        if not caught_up:
+            print(f"Vector store {self.index_path} was purged or cleared by its writer; reloading")
+            self._generation += 1
+            self.load_or_create_index()
+            self.version += 1
+        return True
+
+    def _changed_on_disk(self) -> bool:
+        return (_file_version(self.segment_store.manifest_file) != self._manifest_version
+                or _file_version(self.tombstone_file) != self._tombstone_version
+                or self.wal.has_unread(self._wal_positions))
+
+    def _catch_up(self) -> bool:
+        """Apply the writer's compactions, log records and deletes since the last call.
+
+        Returns False when the writer purged or cleared rows, which needs a reload.
+        """
+        for _ in range(3):
+            if not self._adopt_manifest():
+                return False
+            _, _, gap = self._replay(self.wal.replay(truncate=False, positions=self._wal_positions),
+                                     stop_at_gap=True)
+            if not gap:
+                break
+        if not self._adopt_manifest():
+            # a clear can reuse log file names; what was just read may be from the new log
+            return False
+
+        tombstones = _file_version(self.tombstone_file)
+        if tombstones != self._tombstone_version:
+            self._tombstone_version = tombstones
+            self.tombstones.update(row_id for row_id in self._load_tombstones() if self._row_exists(row_id))
+        return True
+
+    def _adopt_manifest(self) -> bool:
+        """Switch to the writer's current segments if it compacted; False if it purged or cleared."""
+        version = _file_version(self.segment_store.manifest_file)
+        if version == self._manifest_version:
+            return True
+        segment_store = SegmentStore(self.index_path)
+        segment_store.load(remove_orphans=False)
+        if segment_store.generation != self.segment_store.generation or segment_store.end < self.segment_store.end:
+            return False
+        # rows the writer compacted before this store read them from the log
+        self._add_blocks(self.index, self._iter_vector_blocks(
+            segment_store.segments, [], self.next_id, segment_store.end
+        ))
+        self.tail = self.tail[segment_store.end - self.segment_store.end:]
+        self.segment_store.segments = segment_store.segments
+        self.segment_store.next_seq = segment_store.next_seq
+        self._manifest_version = version
+        return True
+
+    def _sync_side_indexes(self, replayed: List[Tuple[int, Dict]], deleted: List[int]):
+        """Bring the sqlite indexes up to date with the segments and the replayed log."""
+        if not self.documents.is_backfilled():
+            self._backfill_documents()
+        if not self.embedding_cache.rows_backfilled():
+            self._backfill_chunk_rows()
+        self._catch_up_lexical()
+
+        # the cache and document index commits may not have happened before a crash;
+        # the log is authoritative
+        live = [(row_id, row) for row_id, row in replayed if row_id not in self.tombstones]
+        if live:
+            self.embedding_cache.put_many([(content_hash(row["text"]), row["vector"]) for _, row in live])
+            self.embedding_cache.add_rows([
+                (content_hash(row["text"]), _metadata_key(row["metadata"]), row_id) for row_id, row in live
+            ])
+            self.documents.add_many([
+                (row["metadata"]["document_id"], row_id)
+                for row_id, row in live if "document_id" in row["metadata"]
+            ])
+        if deleted:
+            self.embedding_cache.release_rows(deleted)
+            self.documents.remove_rows(deleted)
+            self.lexical.remove_rows(deleted)
+
+    def _load_checkpoint(self):
+        """Return the last persisted ANN index, or an empty flat index to rebuild from segments."""
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file) as f:
+                checkpoint = json.load(f)
+            # a checkpoint for another metric is ignored; the index is rebuilt from the
+            # stored raw vectors, so switching metric never needs re-embedding. Checkpoints
+            # from before row ids were stored in the index have no "end" and are rebuilt too.
+            if (checkpoint["file"] and checkpoint["type"] == self.index_type
+                    and checkpoint.get("metric", "l2") == self.metric
+                    and checkpoint.get("end") is not None
+                    and checkpoint["end"] <= self.segment_store.end):
+                index = faiss.read_index(os.path.join(self.index_path, checkpoint["file"]))
+                index_factory.apply_search_params(index, self.nprobe, self.ef_search)
+                return index, checkpoint["end"]
+        return self._new_index("flat"), 0
+
+    def _new_index(self, index_type: str) -> faiss.Index:
+        return index_factory.with_ids(index_factory.create_index(index_type, self.dimension, self.metric))
+
+    def _load_tombstones(self) -> set:
+        if not os.path.exists(self.tombstone_file):
+            return set()
+        return {int(row_id) for row_id in np.load(self.tombstone_file)}
+
+    def _write_tombstones(self):
+        tmp_file = self.tombstone_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            np.save(f, np.array(sorted(self.tombstones), dtype=np.int64))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.tombstone_file)
+
+    def _backfill_documents(self):
+        """Build the document index for segments written before it existed (runs once)."""
+        entries = []
+        for segment in self.segment_store.segments:
+            for offset, row_id in enumerate(segment.row_ids):
+                if int(row_id) in self.tombstones:
+                    continue
+                document_id = segment.metadata.metadata(offset).get("document_id")
+                if document_id is not None:
+                    entries.append((document_id, int(row_id)))
+        if entries:
+            print(f"Indexed {len(entries)} existing chunks by document id")
+            self.documents.add_many(entries)
+        self.documents.mark_backfilled()
+
+    def _backfill_chunk_rows(self, batch_size: int = 10000):
+        """Record the live rows of chunks stored before rows were keyed by metadata (runs once)."""
+        indexed = 0
+        batch = []
+        for segment in self.segment_store.segments:
+            for offset, row_id in enumerate(segment.row_ids):
+                if int(row_id) in self.tombstones:
+                    continue
+                batch.append((content_hash(segment.metadata.text(offset)),
+                              _metadata_key(segment.metadata.metadata(offset)), int(row_id)))
+                if len(batch) >= batch_size:
+                    self.embedding_cache.add_rows(batch)
+                    indexed += len(batch)
+                    batch = []
+        tail_start = self.segment_store.end
+        batch.extend(
+            (content_hash(row["text"]), _metadata_key(row["metadata"]), tail_start + offset)
+            for offset, row in enumerate(self.tail) if tail_start + offset not in self.tombstones
+        )
+        self.embedding_cache.add_rows(batch)
+        indexed += len(batch)
+        if indexed:
+            print(f"Recorded {indexed} existing chunks for deduplication")
+        self.embedding_cache.mark_rows_backfilled()
+
+    def _catch_up_lexical(self, batch_size: int = 10000):
+        """Add rows past the keyword index's high-water mark (every row the first time)."""
+        start = self.lexical.next_row()
+        if start >= self.next_id:
+            return
+        indexed = 0
+        batch = []
+        for segment in self.segment_store.segments:
+            if segment.end <= start:
+                continue
+            for offset in range(int(np.searchsorted(segment.row_ids, start)), segment.rows):
+                row_id = int(segment.row_ids[offset])
+                if row_id not in self.tombstones:
+                    batch.append((row_id, segment.metadata.text(offset)))
+                if len(batch) >= batch_size:
+                    self.lexical.add_many(batch)
+                    indexed += len(batch)
+                    batch = []
+        tail_start = self.segment_store.end
+        for offset, row in enumerate(self.tail):
+            row_id = tail_start + offset
+            if row_id >= start and row_id not in self.tombstones:
+                batch.append((row_id, row["text"]))
+        self.lexical.add_many(batch)
+        indexed += len(batch)
+        if indexed:
+            print(f"Indexed {indexed} chunks for keyword search")
+
+    def _row_exists(self, row_id: int) -> bool:
+        if row_id >= self.segment_store.end:
+            return row_id < self.next_id
+        try:
+            self.segment_store.locate(row_id)
+            return True
+        except IndexError:
+            return False
+
+    def _migrate_legacy_index(self):
+        print("Migrating legacy FAISS index to segment storage...")
+        index = faiss.read_index(self.index_file)
+        with open(self.metadata_file, 'rb') as f:
+            metadata_store = pickle.load(f)
+
+        segments = []
+        if index.ntotal:
+            vectors = index.reconstruct_n(0, index.ntotal)
+            texts = [record["text"] for record in metadata_store]
+            metadatas = [record["metadata"] for record in metadata_store]
+            segments.append(self.segment_store.write_segment(0, vectors, texts, metadatas))
+        self.segment_store.write_manifest(segments)
+        os.remove(self.index_file)
+        os.remove(self.metadata_file)
+
+    def _encode_row(self, vector: np.ndarray, text: str, metadata: Dict) -> bytes:
+        record = json.dumps({"text": text, "metadata": metadata}).encode("utf-8")
+        return vector.astype('float32').tobytes() + record
+
+    def _decode_row(self, payload: bytes) -> Dict:
+        split = self.dimension * 4
+        row = json.loads(payload[split:].decode("utf-8"))
+        row["vector"] = np.frombuffer(payload[:split], dtype='float32')
+        return row
+
+    def _get_row(self, row_id: int) -> Dict:
+        """Materialize a single chunk, from its mmap'd segment or the in-memory tail."""
+        compacted = self.segment_store.end
+        if row_id < compacted:
+            row = self.segment_store.get(row_id)
         else:
-            print("Creating new FAISS index...")
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.metadata_store = []
-            print("New index created")
-    
+            tail_row = self.tail[row_id - compacted]
+            row = {"text": tail_row["text"], "metadata": tail_row["metadata"]}
+        row["id"] = row_id
+        return row
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Copy raw embeddings into the form the index expects (normalized for cosine)."""
+        vectors = np.array(vectors, dtype='float32', ndmin=2)
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _iter_vector_blocks(self, segments, tail, start: int = 0, end: int = None, exclude=None,
+                            block_size: int = 65536):
+        """Yield ``(ids, vectors)`` for stored rows with ids in [start, end), in id order and bounded blocks."""
+        tail_start = segments[-1].end if segments else 0
+        end = end if end is not None else tail_start + len(tail)
+        for segment in segments:
+            if segment.end <= start or segment.start >= end:
+                continue
+            lo, hi = np.searchsorted(segment.row_ids, [start, end])
+            for block_start in range(int(lo), int(hi), block_size):
+                block_end = min(int(hi), block_start + block_size)
+                ids = np.asarray(segment.row_ids[block_start:block_end], dtype=np.int64)
+                vectors = segment.vectors[block_start:block_end]
+                if exclude:
+                    keep = ~np.isin(ids, list(exclude))
+                    ids, vectors = ids[keep], vectors[keep]
+                if len(ids):
+                    yield ids, self._prepare(vectors)
+        first = max(0, start - tail_start)
+        rows = tail[first:max(0, end - tail_start)]
+        for block_start in range(0, len(rows), block_size):
+            block = rows[block_start:block_start + block_size]
+            ids = np.arange(tail_start + first + block_start, tail_start + first + block_start + len(block),
+                            dtype=np.int64)
+            vectors = np.stack([row["vector"] for row in block])
+            if exclude:
+                keep = ~np.isin(ids, list(exclude))
+                ids, vectors = ids[keep], vectors[keep]
+            if len(ids):
+                yield ids, self._prepare(vectors)
+
+    def _add_blocks(self, index: faiss.Index, blocks):
+        for ids, block in blocks:
+            index.add_with_ids(block, ids)
+
+    def _embed(self, texts: List[str]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Content hashes of ``texts`` and their embeddings, computing only the uncached ones."""
+        hashes = [content_hash(text) for text in texts]
+        vectors = self.embedding_cache.get_many(hashes)
+        missing = list({h: text for h, text in zip(hashes, texts) if h not in vectors}.items())
+        if missing:
+            computed = embedding_manager.embed_texts([text for _, text in missing]).astype('float32')
+            for (chunk_hash, _), vector in zip(missing, computed):
+                vectors[chunk_hash] = vector
+        return hashes, vectors
+
     def add_documents(self, texts: List[str], metadatas: List[Dict]) -> int:
+        """Embed and add chunks, returning how many were new to the index."""
         if len(texts) != len(metadatas):
             raise ValueError("Number of texts must match number of metadata entries")
-        
-        embeddings = embedding_manager.embed_texts(texts)
-        
-        self.index.add(embeddings.astype('float32'))
-        
-        for text, metadata in zip(texts, metadatas):
-            self.metadata_store.append({
-                "text": text,
-                "metadata": metadata
-            })
-        
-        self.save_index()
-        
-        return len(texts)
-    
-    def search(self, query: str, top_k: int = 5) -> Tuple[List[Dict], List[float]]:
+        self._check_writable()
+
+        hashes, vectors = self._embed(texts)
+        added, _ = self._commit(hashes, vectors, texts, metadatas)
+        self._maybe_migrate()
+        return added
+
+    def delete_document(self, document_id: str) -> int:
+        """Delete every chunk of a document; returns how many it had (0 if it is unknown)."""
+        self._check_writable()
+        rows = self.documents.rows_of(document_id)
+        if not rows:
+            return 0
+        self._commit([], {}, [], [], replaced_document=document_id)
+        return len(rows)
+
+    def upsert_document(self, document_id: str, texts: List[str], metadatas: List[Dict]) -> Tuple[int, int]:
+        """Atomically replace a document's chunks; returns (chunks added, chunks removed)."""
+        if len(texts) != len(metadatas):
+            raise ValueError("Number of texts must match number of metadata entries")
+
+        self._check_writable()
+        metadatas = [{**metadata, "document_id": document_id} for metadata in metadatas]
+        hashes, vectors = self._embed(texts)
+        added, removed = self._commit(hashes, vectors, texts, metadatas, replaced_document=document_id)
+        self._maybe_migrate()
+        return added, removed
+
+    def _commit(self, hashes: List[str], vectors: Dict[str, np.ndarray], texts: List[str],
+                metadatas: List[Dict], replaced_document: str = None) -> Tuple[int, int]:
+        """Log and apply one batch: the deletes of a replaced document, then the new rows."""
+        with self._lock:
+            self._check_writable()
+            # a stored row stands in for a chunk only if its metadata matches too; otherwise
+            # the chunk is written again so filters see the new metadata
+            keys = [(chunk_hash, _metadata_key(metadata)) for chunk_hash, metadata in zip(hashes, metadatas)]
+            live = self.embedding_cache.live_rows(keys) if settings.DEDUPLICATE_CHUNKS else {}
+            reused = [live.get(key) for key in keys]
+
+            dead = set()
+            if replaced_document is not None:
+                replaced = self.documents.rows_of(replaced_document)
+                # rows another document shares through deduplication stay, and so do
+                # unchanged chunks the new version still contains
+                kept = self.documents.shared_rows(replaced_document, replaced) | {
+                    row_id for row_id in reused if row_id is not None
+                }
+                dead = set(replaced) - kept
+
+            start = self.next_id
+            records = [(RECORD_DELETE, row_id, b"") for row_id in sorted(dead)]
+            rows = []
+            cache_entries = []
+            row_entries = []
+            document_rows = []
+            # duplicates within the batch are merged only if their metadata matches as well:
+            # a chunk of one document never ends up indexed under another's metadata
+            seen = {}
+            for (chunk_hash, metadata_key), text, metadata, row_id in zip(keys, texts, metadatas, reused):
+                key = (chunk_hash, metadata_key)
+                if row_id is None:
+                    row_id = seen.get(key)
+                if row_id is not None:
+                    if "document_id" in metadata:
+                        document_rows.append((metadata["document_id"], row_id))
+                    continue
+                vector = vectors[chunk_hash]
+                row_id = start + len(rows)
+                if settings.DEDUPLICATE_CHUNKS:
+                    seen[key] = row_id
+                records.append((RECORD_ADD, row_id, self._encode_row(vector, text, metadata)))
+                rows.append({"text": text, "metadata": metadata, "vector": vector})
+                cache_entries.append((chunk_hash, vector))
+                row_entries.append((chunk_hash, metadata_key, row_id))
+                if "document_id" in metadata:
+                    document_rows.append((metadata["document_id"], row_id))
+
+            if records:
+                self.wal.append(records)
+            if dead:
+                self._tombstone(dead)
+            if replaced_document is not None:
+                self.documents.remove_document(replaced_document)
+            if rows:
+                ids = np.arange(start, start + len(rows), dtype=np.int64)
+                self.index.add_with_ids(self._prepare(np.stack([row["vector"] for row in rows])), ids)
+                self.tail.extend(rows)
+                self.embedding_cache.put_many(cache_entries)
+                self.embedding_cache.add_rows(row_entries)
+                self.lexical.add_many([(start + offset, row["text"]) for offset, row in enumerate(rows)])
+            if document_rows:
+                self.documents.add_many(document_rows)
+            if records:
+                self.version += 1
+
+            if len(self.tail) >= settings.COMPACTION_MIN_ROWS or self._purge_due():
+                self._compaction_wakeup.set()
+
+        return len(rows), len(dead)
+
+    def _tombstone(self, row_ids):
+        self.tombstones.update(row_ids)
+        self._refresh_search_params()
+        self.embedding_cache.release_rows(row_ids)
+        self.documents.remove_rows(row_ids)
+        self.lexical.remove_rows(row_ids)
+
+    def _refresh_search_params(self):
+        """Rebuild the search filter that hides deleted rows (None when nothing is deleted)."""
+        if not self.tombstones:
+            self._search_params = None
+            return
+        bitmap = index_factory.id_bitmap(np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones)))
+        self._search_params = index_factory.search_parameters(
+            self.index, index_factory.tombstone_selector(bitmap), self.nprobe, self.ef_search
+        )
+
+    def _purge_due(self) -> bool:
+        return (len(self.tombstones) >= settings.TOMBSTONE_PURGE_MIN_ROWS
+                and len(self.tombstones) >= settings.TOMBSTONE_PURGE_RATIO * (self.segment_store.rows + len(self.tail)))
+
+    def search(self, query: str, top_k: int = 5, filters: Dict = None) -> Tuple[List[Dict], List[float]]:
+        self.refresh()
         if self.index.ntotal == 0:
             return [], []
-        
-        query_embedding = embedding_manager.embed_text(query)
-        query_embedding = np.array([query_embedding]).astype('float32')
-        
-        top_k = min(top_k, self.index.ntotal)
-        distances, indices = self.index.search(query_embedding, top_k)
-        
-        results = []
-        scores = []
-        
-        for distance, idx in zip(distances[0], indices[0]):
-            if idx < len(self.metadata_store):
-                similarity_score = 1 / (1 + distance)
-                
-                results.append(self.metadata_store[idx])
-                scores.append(float(similarity_score))
-        
+        return self.search_by_vector(embedding_manager.embed_query(query), top_k, filters)
+
+    @traced("vector_search")
+    def search_by_vector(self, query_embedding: np.ndarray, top_k: int = 5, filters: Dict = None) -> Tuple[List[Dict], List[float]]:
+        """Search one embedding, coalescing concurrent unfiltered callers into one FAISS call."""
+        if settings.QUERY_BATCHING and not filters:
+            return self._search_batcher.submit((query_embedding, top_k))
+        return self.search_by_vectors(np.array([query_embedding]), top_k, filters)[0]
+
+    def _search_requests(self, requests: List[Tuple[np.ndarray, int]]) -> List[Tuple[List[Dict], List[float]]]:
+        query_embeddings = np.stack([embedding for embedding, _ in requests])
+        results = self.search_by_vectors(query_embeddings, max(top_k for _, top_k in requests))
+        return [
+            (rows[:top_k], scores[:top_k])
+            for (rows, scores), (_, top_k) in zip(results, requests)
+        ]
+
+    def search_batch(self, queries: List[str], top_k: int = 5, filters: Dict = None) -> List[Tuple[List[Dict], List[float]]]:
+        """Embed and search many queries as one matrix."""
+        self.refresh()
+        if self.index.ntotal == 0 or not queries:
+            return [([], []) for _ in queries]
+
+        query_embeddings = embedding_manager.embed_texts(queries, show_progress_bar=False)
+        return self.search_by_vectors(query_embeddings, top_k, filters)
+
+    @traced("vector_search")
+    def search_by_vectors(self, query_embeddings: np.ndarray, top_k: int = 5,
+                          filters: Dict = None) -> List[Tuple[List[Dict], List[float]]]:
+        """Top-k search; ``filters`` (``{field: value or [values]}``) restricts it to matching chunks."""
+        self.refresh()
+        query_embeddings = self._prepare(query_embeddings)
+        filters = metadata_filter.normalize_filters(filters)
+
+        with self._lock:
+            started = time.perf_counter()
+            if filters:
+                distances, indices = self._search_filtered(query_embeddings, top_k, filters)
+            else:
+                top_k = min(top_k, self.total_vectors)
+                if top_k <= 0:
+                    return [([], []) for _ in query_embeddings]
+                distances, indices = self._search_index(query_embeddings, top_k, self._search_params)
+            faiss_search_seconds.observe(time.perf_counter() - started, "filtered" if filters else "ann")
+
+            batch = []
+            for row_distances, row_indices in zip(distances, indices):
+                results = []
+                scores = []
+
+                for distance, idx in zip(row_distances, row_indices):
+                    if 0 <= idx < self.next_id:
+                        similarity_score = self._similarity(distance)
+
+                        results.append(self._get_row(int(idx)))
+                        scores.append(float(similarity_score))
+
+                batch.append((results, scores))
+
+        return batch
+
+    def _search_index(self, query_embeddings: np.ndarray, k: int, params=None):
+        if params is not None:
+            return self.index.search(query_embeddings, k, params=params)
+        return self.index.search(query_embeddings, k)
+
+    def _search_filtered(self, query_embeddings: np.ndarray, top_k: int, filters: Dict):
+        """Pick a strategy by how many live rows match.
+
+        Few matches are scanned exactly; a selective filter searches the index with an
+        id selector; a broad one searches without it, oversampled by the inverse of its
+        selectivity, and drops non-matching hits.
+        """
+        allowed = self._filter_ids(filters)
+        top_k = min(top_k, len(allowed))
+        if top_k == 0:
+            empty = np.zeros((len(query_embeddings), 0))
+            return empty, empty.astype(np.int64)
+        if len(allowed) <= settings.FILTER_EXACT_MAX_ROWS:
+            blocks = self._gather_vector_blocks(allowed)
+            return index_factory.exact_search(blocks, query_embeddings, top_k, self.metric)
+
+        selectivity = len(allowed) / max(1, self.index.ntotal - len(self.tombstones))
+        if selectivity >= settings.FILTER_OVERSAMPLE_MIN_SELECTIVITY:
+            k = min(self.index.ntotal, int(np.ceil(top_k / selectivity * settings.FILTER_OVERSAMPLE_FACTOR)))
+            distances, indices = self._search_index(query_embeddings, k, self._search_params)
+            keep = np.isin(indices, allowed)
+            if keep.sum(axis=1).min() >= top_k:
+                # stable sort keeps each row's matching hits in rank order
+                order = np.argsort(~keep, axis=1, kind="stable")[:, :top_k]
+                return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+        params = index_factory.search_parameters(
+            self.index, index_factory.allow_selector(index_factory.id_bitmap(allowed)), self.nprobe, self.ef_search
+        )
+        return self._search_index(query_embeddings, top_k, params)
+
+    def _filter_ids(self, filters: Dict) -> np.ndarray:
+        """Sorted live row ids matching normalized ``filters``, cached per corpus version."""
+        key = (metadata_filter.filter_key(filters), self.version)
+        allowed = self._filter_cache.get(key)
+        if allowed is not None:
+            self._filter_cache.move_to_end(key)
+            return allowed
+
+        parts = [segment.matching_ids(filters) for segment in self.segment_store.segments]
+        tail_start = self.segment_store.end
+        parts.append(np.array([
+            tail_start + offset for offset, row in enumerate(self.tail)
+            if metadata_filter.matches(row["metadata"], filters)
+        ], dtype=np.int64))
+        allowed = np.concatenate(parts)
+        if self.tombstones and len(allowed):
+            allowed = allowed[~np.isin(allowed, list(self.tombstones))]
+
+        self._filter_cache[key] = allowed
+        while len(self._filter_cache) > settings.FILTER_CACHE_SIZE:
+            self._filter_cache.popitem(last=False)
+        return allowed
+
+    def _gather_vector_blocks(self, ids: np.ndarray):
+        """``(ids, vectors)`` blocks for a sorted array of stored row ids."""
+        for segment in self.segment_store.segments:
+            lo, hi = np.searchsorted(ids, [segment.start, segment.end])
+            if hi > lo:
+                offsets = np.searchsorted(segment.row_ids, ids[lo:hi])
+                yield ids[lo:hi], self._prepare(segment.vectors[offsets])
+        tail_start = self.segment_store.end
+        tail_ids = ids[np.searchsorted(ids, tail_start):]
+        if len(tail_ids):
+            yield tail_ids, self._prepare(np.stack([self.tail[row_id - tail_start]["vector"] for row_id in tail_ids]))
+
+    @traced("lexical_search")
+    def lexical_search(self, query: str, top_k: int = 5, filters: Dict = None) -> Tuple[List[Dict], List[float]]:
+        """BM25 keyword search over chunk texts; scores are BM25, not vector similarities."""
+        self.refresh()
+        filters = metadata_filter.normalize_filters(filters)
+        allowed = None
+        if filters:
+            with self._lock:
+                allowed = self._filter_ids(filters)
+            if len(allowed) == 0:
+                return [], []
+
+        limit = top_k
+        while True:
+            hits = self.lexical.search(query, limit)
+            matched = hits
+            if allowed is not None and hits:
+                keep = np.isin([row_id for row_id, _ in hits], allowed)
+                matched = [hit for hit, kept in zip(hits, keep) if kept]
+            # widen the keyword search until the filter leaves top_k hits or nothing more matches
+            if len(matched) >= top_k or len(hits) < limit:
+                break
+            limit *= 4
+
+        results, scores = [], []
+        with self._lock:
+            for row_id, score in matched[:top_k]:
+                if row_id not in self.tombstones and self._row_exists(row_id):
+                    results.append(self._get_row(row_id))
+                    scores.append(score)
         return results, scores
-    
+
+    def similarities(self, query_embedding: np.ndarray, row_ids: List[int]) -> Dict[int, float]:
+        """Similarity of the query to specific rows, on the same scale as search scores."""
+        query = self._prepare(query_embedding)[0]
+        with self._lock:
+            ids = np.array(sorted({row_id for row_id in row_ids if self._row_exists(row_id)}), dtype=np.int64)
+            blocks = list(self._gather_vector_blocks(ids))
+        similarities = {}
+        for block_ids, vectors in blocks:
+            if self.metric == "cosine":
+                distances = vectors @ query
+            else:
+                distances = ((vectors - query) ** 2).sum(axis=1)
+            similarities.update(
+                (int(row_id), float(self._similarity(distance))) for row_id, distance in zip(block_ids, distances)
+            )
+        return similarities
+
+    def _similarity(self, distance: float) -> float:
+        if self.metric == "cosine":
+            # inner product of normalized vectors is already the cosine similarity
+            return distance
+        return 1 / (1 + distance)
+
+    def set_search_params(self, nprobe: int = None, ef_search: int = None):
+        """Adjust the recall/latency knobs of the live ANN index."""
+        with self._lock:
+            if nprobe is not None:
+                self.nprobe = nprobe
+            if ef_search is not None:
+                self.ef_search = ef_search
+            index_factory.apply_search_params(self.index, self.nprobe, self.ef_search)
+            self._refresh_search_params()
+
+    def _maybe_migrate(self):
+        if self._migrating or self.index_type == index_factory.index_type_of(self.index):
+            return
+        if self.index.ntotal - len(self.tombstones) < index_factory.min_vectors(self.index_type):
+            return
+        self._migrating = True
+        thread = threading.Thread(target=self._migrate_index, name="vector-store-migration", daemon=True)
+        thread.start()
+
+    def _migrate_index(self):
+        """Train the configured ANN index off the request path, then swap it in."""
+        retry = False
+        try:
+            with self._lock:
+                segments = list(self.segment_store.segments)
+                tail = list(self.tail)
+                end = self.next_id
+                deleted = set(self.tombstones)
+                generation = self._generation
+
+            print(f"Building {self.index_type} index over {end} row ids...")
+            started = time.time()
+            index = self._new_index(self.index_type)
+            if not index.is_trained:
+                index.train(self._training_sample(segments, tail, end, deleted))
+            # deleted rows are added too: the index always holds every stored row and
+            # the tombstone filter hides them until compaction purges them
+            self._add_blocks(index, self._iter_vector_blocks(segments, tail, 0, end))
+            index_factory.apply_search_params(index, self.nprobe, self.ef_search)
+
+            with self._lock:
+                if generation != self._generation:
+                    # a purge or clear replaced the rows this index was built from
+                    retry = True
+                    return
+                # catch up on rows added while the new index was being built
+                self._add_blocks(index, self._iter_vector_blocks(
+                    self.segment_store.segments, self.tail, end, self.next_id
+                ))
+                self.index = index
+                self._refresh_search_params()
+            print(f"Migrated to {self.index_type} index in {time.time() - started:.1f}s")
+
+            self.checkpoint_index()
+            self.evaluate_index()
+        except Exception as e:
+            print(f"Index migration failed: {e}")
+        finally:
+            self._migrating = False
+            if retry:
+                self._maybe_migrate()
+
+    def _training_sample(self, segments, tail, end: int, deleted: set) -> np.ndarray:
+        rows = sum(len(ids) for ids, _ in self._iter_vector_blocks(segments, tail, 0, end, exclude=deleted))
+        size = min(rows, index_factory.training_size(self.index_type))
+        picked = np.sort(np.random.default_rng(0).choice(rows, size=size, replace=False))
+        sample = []
+        offset = 0
+        for _, block in self._iter_vector_blocks(segments, tail, 0, end, exclude=deleted):
+            lo, hi = np.searchsorted(picked, [offset, offset + len(block)])
+            sample.append(block[picked[lo:hi] - offset])
+            offset += len(block)
+        return np.concatenate(sample)
+
+    def checkpoint_index(self):
+        """Persist a trained ANN index so a restart does not have to rebuild it."""
+        with self._checkpoint_lock:
+            self._checkpoint_index()
+
+    def _checkpoint_index(self):
+        if self.read_only:
+            # a reader's migrated index lives only in memory
+            return
+        with self._lock:
+            index_type = index_factory.index_type_of(self.index)
+            # only rows that are already in segments can be re-added on reload
+            if index_type == "flat" or self.next_id > self.segment_store.end:
+                return
+            end = self.segment_store.end
+            data = faiss.serialize_index(self.index)
+
+        name = f"index-{end:012d}.faiss"
+        tmp_file = os.path.join(self.index_path, name + ".tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(data.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, os.path.join(self.index_path, name))
+        self._write_checkpoint({"type": index_type, "metric": self.metric, "file": name, "end": end})
+        self.checkpoint_end = end
+
+    def _write_checkpoint(self, checkpoint: Dict):
+        tmp_file = self.checkpoint_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.checkpoint_file)
+
+        for name in os.listdir(self.index_path):
+            if name.startswith("index-") and name.endswith(".faiss") and name != checkpoint["file"]:
+                os.remove(os.path.join(self.index_path, name))
+
+    def evaluate_index(self, num_queries: int = 100, k: int = 10) -> Dict:
+        """Measure recall@k and per-query latency of the live index against an exact scan."""
+        with self._lock:
+            segments = list(self.segment_store.segments)
+            tail = list(self.tail)
+            end = self.next_id
+            deleted = set(self.tombstones)
+            index = self.index
+            search_params = self._search_params
+
+        blocks = list(self._iter_vector_blocks(segments, tail, 0, end, exclude=deleted))
+        rows = sum(len(ids) for ids, _ in blocks)
+        if rows == 0:
+            return None
+
+        k = min(k, rows)
+        picked = np.sort(np.random.default_rng().choice(rows, size=min(num_queries, rows), replace=False))
+        queries = []
+        offset = 0
+        for _, block in blocks:
+            lo, hi = np.searchsorted(picked, [offset, offset + len(block)])
+            queries.append(block[picked[lo:hi] - offset])
+            offset += len(block)
+        queries = np.concatenate(queries)
+
+        started = time.time()
+        _, exact_ids = index_factory.exact_search(blocks, queries, k, self.metric)
+        exact_latency = (time.time() - started) / len(queries)
+
+        started = time.time()
+        with self._lock:
+            if search_params is not None:
+                _, ann_ids = index.search(queries, k, params=search_params)
+            else:
+                _, ann_ids = index.search(queries, k)
+        ann_latency = (time.time() - started) / len(queries)
+
+        hits = sum(len(set(a) & set(e)) for a, e in zip(ann_ids, exact_ids))
+        self.index_evaluation = {
+            "k": k,
+            "queries": len(queries),
+            "recall": hits / (len(queries) * k),
+            "ann_latency_ms": ann_latency * 1000,
+            "exact_latency_ms": exact_latency * 1000,
+            "search_params": index_factory.search_params_of(index),
+            "evaluated_at": time.time()
+        }
+        return self.index_evaluation
+
+    def compact(self) -> bool:
+        """Move logged rows into a new segment, purge deleted rows when due and merge small segments."""
+        with self._compaction_lock:
+            with self._lock:
+                if self._closed:
+                    return False
+                self._check_writable()
+                purge = self._purge_due()
+                if not self.tail and not purge:
+                    return False
+                frozen = list(self.tail)
+                start = self.segment_store.end
+                end = start + len(frozen)
+                purge_ids = sorted(row_id for row_id in self.tombstones if row_id < end) if purge else []
+                purge_ids = np.array(purge_ids, dtype=np.int64)
+                self.wal.rotate(end)
+
+            segments = list(self.segment_store.segments)
+            if frozen:
+                ids = np.arange(start, end, dtype=np.int64)
+                keep = np.flatnonzero(~np.isin(ids, purge_ids))
+                vectors = np.stack([row["vector"] for row in frozen])[keep]
+                texts = [frozen[i]["text"] for i in keep]
+                metadatas = [frozen[i]["metadata"] for i in keep]
+                segments.append(self.segment_store.write_segment(start, vectors, texts, metadatas, end=end, ids=ids[keep]))
+            if len(purge_ids):
+                for position, segment in enumerate(segments[:len(segments) - bool(frozen)]):
+                    lo, hi = np.searchsorted(purge_ids, [segment.start, segment.end])
+                    if hi > lo:
+                        segments[position] = self.segment_store.purge(segment, purge_ids[lo:hi])
+
+            pair = self.segment_store.pick_merge(segments, settings.MAX_SEGMENTS)
+            while pair is not None:
+                merged = self.segment_store.merge(segments[pair], segments[pair + 1])
+                segments = segments[:pair] + [merged] + segments[pair + 2:]
+                pair = self.segment_store.pick_merge(segments, settings.MAX_SEGMENTS)
+
+            rebuilt = None
+            if len(purge_ids) and not index_factory.supports_remove(self.index):
+                rebuilt = self._rebuild_index(segments, len(frozen), purge_ids)
+
+            with self._checkpoint_lock:
+                if len(purge_ids):
+                    # the persisted index still holds the purged rows
+                    self._write_checkpoint({"type": "flat", "metric": self.metric, "file": None, "end": 0})
+                    self.checkpoint_end = 0
+                    self.segment_store.generation += 1
+                self.segment_store.write_manifest(segments)
+
+                with self._lock:
+                    self.segment_store.replace(segments)
+                    self.tail = self.tail[len(frozen):]
+                    if len(purge_ids):
+                        self._apply_purge(purge_ids, rebuilt)
+                    self._write_tombstones()
+                    self.wal.discard_before(end)
+
+            if len(purge_ids) or self.segment_store.end - self.checkpoint_end >= settings.INDEX_CHECKPOINT_ROWS:
+                self.checkpoint_index()
+
+            self._last_compaction = time.time()
+            return True
+
+    def _rebuild_index(self, segments, compacted: int, purge_ids: np.ndarray) -> Tuple[faiss.Index, faiss.Index, int]:
+        """Copy the live index without the purged rows, for index types that cannot remove them."""
+        with self._lock:
+            source = self.index
+            tail = self.tail[compacted:]
+            end = self.next_id
+        print(f"Rebuilding {index_factory.index_type_of(source)} index without {len(purge_ids)} deleted rows...")
+        index = self._new_index(index_factory.index_type_of(source))
+        self._add_blocks(index, self._iter_vector_blocks(segments, tail, 0, end, exclude=set(purge_ids.tolist())))
+        index_factory.apply_search_params(index, self.nprobe, self.ef_search)
+        return source, index, end
+
+    def _apply_purge(self, purge_ids: np.ndarray, rebuilt):
+        if rebuilt is not None and rebuilt[0] is not self.index:
+            # a migration swapped the index while the copy was being built
+            rebuilt = None if index_factory.supports_remove(self.index) else \
+                self._rebuild_index(self.segment_store.segments, 0, purge_ids)
+        if rebuilt is not None:
+            _, index, end = rebuilt
+            self._add_blocks(index, self._iter_vector_blocks(
+                self.segment_store.segments, self.tail, end, self.next_id
+            ))
+            self.index = index
+        else:
+            self.index.remove_ids(faiss.IDSelectorBatch(len(purge_ids), faiss.swig_ptr(purge_ids)))
+        self.tombstones.difference_update(purge_ids.tolist())
+        self.purged_rows += len(purge_ids)
+        self._generation += 1
+        self._refresh_search_params()
+        print(f"Purged {len(purge_ids)} deleted rows")
+
+    def _start_compactor(self):
+        thread = threading.Thread(target=self._compaction_loop, name="vector-store-compactor", daemon=True)
+        thread.start()
+
+    def _compaction_loop(self):
+        interval = settings.COMPACTION_INTERVAL_SECONDS
+        while not self._closed:
+            self._compaction_wakeup.wait(interval)
+            self._compaction_wakeup.clear()
+            if self._closed:
+                return
+
+            due = time.time() - self._last_compaction >= interval
+            if (self.tail and (due or len(self.tail) >= settings.COMPACTION_MIN_ROWS)) or self._purge_due():
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"Vector store compaction failed: {e}")
+
     def save_index(self):
-        faiss.write_index(self.index, self.index_file)
-        with open(self.metadata_file, 'wb') as f:
-            pickle.dump(self.metadata_store, f)
-    
+        self.compact()
+        self.checkpoint_index()
+
+    @property
+    def busy(self) -> bool:
+        """True while a background index migration or a compaction is running."""
+        return self._migrating or self._compaction_lock.locked()
+
+    def close(self):
+        """Stop the background threads and release files; logged rows are replayed on the next load."""
+        self._closed = True
+        self._compaction_wakeup.set()
+        self._search_batcher.close()
+        with self._compaction_lock, self._checkpoint_lock, self._lock:
+            self.wal.close()
+            self.embedding_cache.close()
+            self.documents.close()
+            self.lexical.close()
+            if self._writer_lock is not None:
+                fcntl.flock(self._writer_lock.fileno(), fcntl.LOCK_UN)
+                self._writer_lock.close()
+                self._writer_lock = None
+
     def clear_index(self):
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.metadata_store = []
-        self.save_index()
-    
+        with self._compaction_lock, self._checkpoint_lock, self._lock:
+            self._check_writable()
+            self._generation += 1
+            self.version += 1
+            self.index = self._new_index("flat")
+            self.tail = []
+            # the log goes first: a reader that sees the new manifest must not replay old records
+            self.wal.clear()
+            self.segment_store.clear()
+            self.embedding_cache.release_all()
+            self.documents.clear()
+            self.lexical.clear()
+            self.tombstones = set()
+            self._write_tombstones()
+            self._refresh_search_params()
+            self._write_checkpoint({"type": "flat", "metric": self.metric, "file": None, "end": 0})
+            self.checkpoint_end = 0
+            self.index_evaluation = None
+
+    @property
+    def total_vectors(self) -> int:
+        return self.index.ntotal - len(self.tombstones)
+
     def get_stats(self) -> Dict:
+        self.refresh()
         return {
-            "total_vectors": self.index.ntotal,
+            "total_vectors": self.total_vectors,
             "dimension": self.dimension,
-            "index_type": type(self.index).__name__
+            "index_type": type(index_factory.base_index(self.index)).__name__,
+            "configured_index_type": self.index_type,
+            "metric": self.metric,
+            "search_params": index_factory.search_params_of(self.index),
+            "migrating": self._migrating,
+            "read_only": self.read_only,
+            "segments": len(self.segment_store.segments),
+            "pending_log_rows": len(self.tail),
+            "deleted_rows": len(self.tombstones),
+            "purged_rows": self.purged_rows,
+            "documents": self.documents.get_stats()["documents"],
+            "lexical_rows": self.lexical.get_stats()["rows"],
+            "search_batching": self._search_batcher.get_stats(),
+            "embedding_cache": self.embedding_cache.get_stats(),
+            "index_evaluation": self.index_evaluation
         }
 
-vector_store = VectorStore()
\ No newline at end of file
+vector_store = VectorStore()
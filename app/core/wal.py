@@ -0,0 +1,118 @@
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Tuple
+
+RECORD_ADD = 1
+# row id is the deleted row; no payload
+RECORD_DELETE = 2
+
+# record type, row id, payload length, crc32 of payload
+_HEADER = struct.Struct("<BQII")
+
+class WriteAheadLog:
+    """Append-only log of vector store mutations that are not yet in a segment.
+
+    The log is split into files named after the first row id they were opened at.
+    Compaction rotates to a new file and discards the older ones once their rows
+    have been written to a segment and their deletes to the tombstone file.
+    """
+
+    def __init__(self, directory: str, fsync: bool = True):
+        self.directory = directory
+        self.fsync = fsync
+        self._file = None
+        self._start = None
+
+    def _path(self, start: int) -> str:
+        return os.path.join(self.directory, f"wal-{start:012d}.log")
+
+    def files(self) -> List[Tuple[int, str]]:
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("wal-") and name.endswith(".log"):
+                entries.append((int(name[4:-4]), os.path.join(self.directory, name)))
+        return sorted(entries)
+
+    def replay(self, truncate: bool = True, positions: Dict[str, int] = None) -> Iterator[Tuple[int, int, bytes]]:
+        """Yield logged records; ``truncate=False`` reads without cutting off a torn tail
+        (a reader replaying another process's log may see a record still being written).
+
+        With ``positions`` (path -> byte offset) each file is read from its offset and
+        the offset is advanced past every record the caller asked for, so a reader can
+        pick up where it stopped; files that no longer exist are dropped from it.
+        """
+        files = self.files()
+        if positions is not None:
+            for path in set(positions) - {path for _, path in files}:
+                del positions[path]
+        for _, path in files:
+            valid = positions.get(path, 0) if positions is not None else 0
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                # discarded by the writer's compaction since it was listed
+                continue
+            with f:
+                f.seek(valid)
+                while True:
+                    header = f.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        break
+                    kind, row_id, length, crc = _HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        break
+                    valid = f.tell()
+                    yield kind, row_id, payload
+                    if positions is not None:
+                        positions[path] = valid
+
+            if truncate and os.path.getsize(path) > valid:
+                print(f"Truncating torn write-ahead log record in {path}")
+                os.truncate(path, valid)
+
+    def has_unread(self, positions: Dict[str, int]) -> bool:
+        """Whether any log file holds bytes past the reader's ``positions``."""
+        for _, path in self.files():
+            try:
+                if os.path.getsize(path) != positions.get(path, 0):
+                    return True
+            except FileNotFoundError:
+                continue
+        return False
+
+    def open(self, start: int):
+        self.close()
+        self._start = start
+        self._file = open(self._path(start), "ab")
+
+    def append(self, records: List[Tuple[int, int, bytes]]):
+        for kind, row_id, payload in records:
+            self._file.write(_HEADER.pack(kind, row_id, len(payload), zlib.crc32(payload)))
+            self._file.write(payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def rotate(self, start: int) -> int:
+        """Start a new log file and return the start of the previous one."""
+        previous = self._start
+        self.open(start)
+        return previous
+
+    def discard_before(self, start: int):
+        for file_start, path in self.files():
+            if file_start < start and file_start != self._start:
+                os.remove(path)
+
+    def clear(self):
+        self.close()
+        for _, path in self.files():
+            os.remove(path)
+        self.open(0)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,7 +1,11 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from app.api.routes import router
 from app.mcp.server import mcp_router
+from app.core.model_registry import model_registry
+from app.monitoring.prometheus import CONTENT_TYPE, RequestMetricsMiddleware, metrics_registry
 from app.config import settings
 
 app = FastAPI(
@@ -17,10 +21,25 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(router, prefix="/api/v1", tags=["API"])
 app.include_router(mcp_router, prefix="/api/v1", tags=["MCP"])
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # collectors read component state under their locks; keep that off the event loop
+    return Response(await asyncio.to_thread(metrics_registry.render), media_type=CONTENT_TYPE)
+
+@app.on_event("startup")
+async def warm_up_models():
+    if settings.MODEL_WARMUP:
+        await asyncio.to_thread(model_registry.warm_up, settings.MODEL_WARMUP)
+
+@app.on_event("startup")
+async def start_metrics_snapshots():
+    metrics_registry.start()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,14 +1,42 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from app.orchestrator.chains import orchestrator
 from app.monitoring.metrics import metrics_db
+from app.monitoring.drift_monitor import drift_monitor
+from app.core.executor import run_in_stage, ExecutorSaturated
+from app.core.tracing import start_trace
+from app.monitoring.prometheus import metrics_registry
+import time
 
 mcp_router = APIRouter()
 
+COMMANDS = [
+    {
+        "name": "query-docs",
+        "description": "Query the RAG system",
+        "args": {"query": "string"}
+    },
+    {
+        "name": "summarize",
+        "description": "Summarize text",
+        "args": {"text": "string"}
+    },
+    {
+        "name": "translate",
+        "description": "Translate English to French",
+        "args": {"text": "string"}
+    }
+]
+_COMMAND_NAMES = {command["name"] for command in COMMANDS}
+
+mcp_commands = metrics_registry.counter("rag_mcp_commands_total", "MCP commands by outcome", ["command", "status"])
+mcp_command_seconds = metrics_registry.histogram("rag_mcp_command_duration_seconds", "MCP command latency", ["command"])
+
 class MCPCommand(BaseModel):
     command: str
     args: dict
+    trace: bool = False
 
 class MCPResponse(BaseModel):
     status: str
@@ -16,10 +44,29 @@ class MCPResponse(BaseModel):
 
 @mcp_router.post("/mcp/execute", response_model=MCPResponse)
 async def execute_mcp_command(cmd: MCPCommand):
+    # arbitrary command strings must not create new series
+    command = cmd.command if cmd.command in _COMMAND_NAMES else "unknown"
+    started = time.perf_counter()
+    status = "failed"
+    try:
+        with start_trace(f"mcp:{command}") as request_trace:
+            response = await _execute(cmd)
+        status = response.status
+        if cmd.trace and request_trace is not None and response.status == "success":
+            response.result["timings"] = request_trace.timings()
+        return response
+    except ExecutorSaturated as e:
+        status = "rejected"
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    finally:
+        mcp_commands.inc(command, status)
+        mcp_command_seconds.observe(time.perf_counter() - started, command)
+
+async def _execute(cmd: MCPCommand) -> MCPResponse:
     
     if cmd.command == "query-docs":
         query = cmd.args.get("query", "")
-        result = orchestrator.rag_chain(query)
+        result = await run_in_stage("query", orchestrator.rag_chain, query)
         
         metrics_db.log_metric(
             tool="rag",
@@ -28,12 +75,13 @@ async def execute_mcp_command(cmd: MCPCommand):
             result=result["answer"],
             confidence=result["confidence"]
         )
+        drift_monitor.log_prediction(query, result["answer"], result["confidence"])
         
         return MCPResponse(status="success", result=result)
     
     elif cmd.command == "summarize":
         text = cmd.args.get("text", "")
-        result = orchestrator.summarize_chain(text)
+        result = await run_in_stage("tools", orchestrator.summarize_chain, text)
         
         metrics_db.log_metric(
             tool="summarizer",
@@ -46,7 +94,7 @@ async def execute_mcp_command(cmd: MCPCommand):
     
     elif cmd.command == "translate":
         text = cmd.args.get("text", "")
-        result = orchestrator.translate_chain(text)
+        result = await run_in_stage("tools", orchestrator.translate_chain, text)
         
         metrics_db.log_metric(
             tool="translator",
@@ -62,22 +110,4 @@ async def execute_mcp_command(cmd: MCPCommand):
 
 @mcp_router.get("/mcp/commands")
 async def list_commands():
-    return {
-        "commands": [
-            {
-                "name": "query-docs",
-                "description": "Query the RAG system",
-                "args": {"query": "string"}
-            },
-            {
-                "name": "summarize",
-                "description": "Summarize text",
-                "args": {"text": "string"}
-            },
-            {
-                "name": "translate",
-                "description": "Translate English to French",
-                "args": {"text": "string"}
-            }
-        ]
-    }
\ No newline at end of file
+    return {"commands": COMMANDS}
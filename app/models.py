@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 class DocumentUpload(BaseModel):
@@ -11,9 +11,39 @@ class DocumentResponse(BaseModel):
     chunks_created: int
     message: str
     
+class DocumentDeleteResponse(BaseModel):
+    document_id: str
+    chunks_deleted: int
+    message: str
+    
+class BulkIngestRequest(BaseModel):
+    source: str = Field(..., description="Directory or .jsonl file, relative to DOCUMENTS_PATH")
+    job_id: Optional[str] = Field(default=None, pattern=r"^[A-Za-z0-9_-]{1,64}$", description="Checkpoint name; defaults to a hash of the source path")
+    resume: bool = Field(default=True, description="Continue from the job's checkpoint if one exists")
+    
+class BulkIngestStatus(BaseModel):
+    job_id: str
+    source: str
+    collection: str = "default"
+    status: str
+    position: int
+    documents: int
+    chunks: int
+    chunks_added: int
+    duplicates: int
+    failed_documents: int
+    elapsed_seconds: float
+    docs_per_second: float = 0.0
+    chunks_per_second: float = 0.0
+    error: Optional[str] = None
+    
+FilterValue = Union[str, int, float, bool]
+
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1, description="User query")
     top_k: Optional[int] = Field(default=5, ge=1, le=20, description="Number of results to retrieve")
+    filters: Optional[Dict[str, Union[FilterValue, List[FilterValue]]]] = Field(default=None, description="Metadata filters: field -> value or list of allowed values; fields are combined with AND")
+    trace: bool = Field(default=False, description="Include per-stage timings in the response")
     
 class RetrievalResult(BaseModel):
     text: str
@@ -26,6 +56,33 @@ class QueryResponse(BaseModel):
     confidence: float
     source: str
     processing_time: float
+    timings: Optional[Dict[str, float]] = Field(default=None, description="Milliseconds per pipeline stage, when requested")
+    
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, description="User queries, answered together")
+    top_k: Optional[int] = Field(default=5, ge=1, le=20, description="Number of results to retrieve per query")
+    trace: bool = Field(default=False, description="Include per-stage timings of the whole batch in the response")
+    
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+    processing_time: float
+    timings: Optional[Dict[str, float]] = None
+    
+class IndexSearchParams(BaseModel):
+    nprobe: Optional[int] = Field(default=None, ge=1, description="IVF lists probed per query")
+    ef_search: Optional[int] = Field(default=None, ge=1, description="HNSW search beam width")
+    
+class CollectionCreate(BaseModel):
+    name: str = Field(..., pattern=r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$", description="Collection name")
+    index_type: Optional[str] = Field(default=None, description="flat, ivf_flat, hnsw or ivf_pq; defaults to VECTOR_INDEX_TYPE")
+    metric: Optional[str] = Field(default=None, description="l2 or cosine; defaults to VECTOR_METRIC")
+    
+class CollectionInfo(BaseModel):
+    name: str
+    index_type: str
+    metric: str
+    loaded: bool
+    created_at: Optional[float] = None
     
 class HealthResponse(BaseModel):
     status: str
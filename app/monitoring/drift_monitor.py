@@ -0,0 +1,311 @@
+from sqlalchemy import Column, Index, Integer, Float, String, DateTime, Text, func, select
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import bisect
+import json
+import math
+import threading
+from app.config import settings
+from app.monitoring.metrics import Base, metrics_db
+
+# upper bin bounds per feature; values past the last bound share one overflow bin
+FEATURE_BOUNDS = {
+    "query_length": [1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 25, 30, 40, 50, 75, 100, 150, 200],
+    "answer_length": [0, 1, 2, 4, 6, 8, 10, 15, 20, 30, 40, 60, 80, 120, 160, 240, 320, 480],
+    "confidence": [i / 20 for i in range(1, 21)],
+}
+FEATURES = tuple(FEATURE_BOUNDS)
+# proportion used for empty bins so PSI stays finite
+PSI_EPSILON = 1e-4
+
+class DriftReport(Base):
+    """One feature's drift check: the recent window against the reference."""
+    __tablename__ = 'drift_reports'
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    feature = Column(String(50))
+    window_count = Column(Integer)
+    reference_count = Column(Integer)
+    psi = Column(Float)
+    # largest distance between the binned CDFs (Kolmogorov-Smirnov statistic)
+    ks = Column(Float)
+    drifted = Column(Integer)
+    mean = Column(Float)
+    reference_mean = Column(Float)
+    p50 = Column(Float)
+    p90 = Column(Float)
+    p99 = Column(Float)
+    histogram = Column(Text)
+
+    __table_args__ = (
+        Index('ix_drift_reports_feature_timestamp', 'feature', 'timestamp'),
+    )
+
+class DriftReference(Base):
+    __tablename__ = 'drift_reference'
+
+    feature = Column(String(50), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    count = Column(Integer)
+    total = Column(Float)
+    histogram = Column(Text)
+
+class FeatureSketch:
+    """Fixed-bin histogram with a running sum; values can be removed as well as added."""
+
+    def __init__(self, bounds: Sequence[float], counts: List[int] = None, total: float = 0.0):
+        self.bounds = bounds
+        self.counts = list(counts) if counts is not None else [0] * (len(bounds) + 1)
+        self.total = total
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def add(self, value: float, weight: int = 1):
+        self.counts[bisect.bisect_left(self.bounds, value)] += weight
+        self.total += weight * value
+
+    def copy(self) -> "FeatureSketch":
+        return FeatureSketch(self.bounds, self.counts, self.total)
+
+    def mean(self) -> Optional[float]:
+        count = self.count
+        return self.total / count if count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bin holding the ``q`` quantile (the last bound for overflow)."""
+        count = self.count
+        if not count:
+            return None
+        seen = 0
+        for bin_index, bin_count in enumerate(self.counts):
+            seen += bin_count
+            if seen >= q * count:
+                return self.bounds[min(bin_index, len(self.bounds) - 1)]
+        return self.bounds[-1]
+
+def population_stability_index(reference: FeatureSketch, current: FeatureSketch) -> float:
+    reference_count, current_count = reference.count, current.count
+    psi = 0.0
+    for r, c in zip(reference.counts, current.counts):
+        r = max(r / reference_count, PSI_EPSILON)
+        c = max(c / current_count, PSI_EPSILON)
+        psi += (c - r) * math.log(c / r)
+    return psi
+
+def ks_statistic(reference: FeatureSketch, current: FeatureSketch) -> float:
+    reference_count, current_count = reference.count, current.count
+    distance = reference_seen = current_seen = 0.0
+    for r, c in zip(reference.counts, current.counts):
+        reference_seen += r
+        current_seen += c
+        distance = max(distance, abs(reference_seen / reference_count - current_seen / current_count))
+    return distance
+
+class DriftMonitor:
+    """Bounded drift monitoring of query length, answer length and confidence.
+
+    Each prediction is reduced to three numbers. The first ``DRIFT_REFERENCE_SIZE``
+    of them build a reference histogram per feature, which is then frozen and
+    persisted, so restarts and other workers compare against the same baseline.
+    The last ``DRIFT_WINDOW_SIZE`` predictions sit in a ring buffer whose histograms
+    are updated as values enter and leave it, so memory stays fixed however long
+    the service runs. A background thread compares window and reference every
+    ``DRIFT_CHECK_INTERVAL_SECONDS`` (population stability index and KS distance
+    over the bins) and stores one ``DriftReport`` row per feature; a feature
+    counts as drifted when its PSI exceeds ``DRIFT_PSI_THRESHOLD``.
+    """
+
+    def __init__(self):
+        DriftReport.__table__.create(metrics_db.engine, checkfirst=True)
+        DriftReference.__table__.create(metrics_db.engine, checkfirst=True)
+        self._lock = threading.Lock()
+        self._window = deque()
+        self._current = {feature: FeatureSketch(bounds) for feature, bounds in FEATURE_BOUNDS.items()}
+        self._reference = self._load_reference()
+        self._reference_frozen = self._reference is not None
+        if self._reference is None:
+            self._reference = {feature: FeatureSketch(bounds) for feature, bounds in FEATURE_BOUNDS.items()}
+        self._reference_size = self._reference["confidence"].count
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.stats = {"logged": 0, "checks": 0, "failed_checks": 0, "last_check": None}
+
+    def _load_reference(self) -> Optional[Dict[str, FeatureSketch]]:
+        with metrics_db.Session() as session:
+            rows = {row.feature: row for row in session.query(DriftReference).all()}
+        if set(rows) != set(FEATURES):
+            return None
+        reference = {}
+        for feature, bounds in FEATURE_BOUNDS.items():
+            counts = json.loads(rows[feature].histogram)
+            if len(counts) != len(bounds) + 1:
+                # the bins changed since the reference was saved; build a new one
+                return None
+            reference[feature] = FeatureSketch(bounds, counts, rows[feature].total)
+        return reference
+
+    def log_prediction(self, query: str, answer: str, confidence: float):
+        values = (len(query.split()), len(answer.split()), confidence or 0.0)
+        with self._lock:
+            if len(self._window) >= settings.DRIFT_WINDOW_SIZE:
+                for feature, value in zip(FEATURES, self._window.popleft()):
+                    self._current[feature].add(value, -1)
+            self._window.append(values)
+            building_reference = not self._reference_frozen and self._reference_size < settings.DRIFT_REFERENCE_SIZE
+            for feature, value in zip(FEATURES, values):
+                self._current[feature].add(value)
+                if building_reference:
+                    self._reference[feature].add(value)
+            if building_reference:
+                self._reference_size += 1
+            self.stats["logged"] += 1
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.DRIFT_CHECK_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            try:
+                self.check_drift()
+                self.apply_retention()
+            except Exception as e:
+                self.stats["failed_checks"] += 1
+                print(f"Drift check failed: {e}")
+
+    def _freeze_reference(self):
+        """Persist the reference once it is full, or adopt one another worker already saved."""
+        with self._lock:
+            reference = {feature: sketch.copy() for feature, sketch in self._reference.items()}
+        with metrics_db.Session() as session:
+            if session.query(DriftReference).count() == 0:
+                session.add_all([
+                    DriftReference(feature=feature, count=sketch.count, total=sketch.total,
+                                   histogram=json.dumps(sketch.counts))
+                    for feature, sketch in reference.items()
+                ])
+                session.commit()
+        saved = self._load_reference()
+        with self._lock:
+            self._reference = saved or reference
+            self._reference_size = self._reference["confidence"].count
+            self._reference_frozen = True
+
+    def _snapshot(self) -> Tuple[Dict[str, FeatureSketch], Dict[str, FeatureSketch], bool]:
+        with self._lock:
+            return (
+                {feature: sketch.copy() for feature, sketch in self._reference.items()},
+                {feature: sketch.copy() for feature, sketch in self._current.items()},
+                self._reference_frozen
+            )
+
+    def check_drift(self) -> List[Dict]:
+        """Compare the window with the reference and store the results; empty until both are full enough."""
+        reference, current, frozen = self._snapshot()
+        if not frozen:
+            if reference["confidence"].count < settings.DRIFT_REFERENCE_SIZE:
+                return []
+            self._freeze_reference()
+            reference, current, _ = self._snapshot()
+        if current["confidence"].count < settings.DRIFT_MIN_WINDOW:
+            return []
+
+        timestamp = datetime.utcnow()
+        reports = []
+        for feature in FEATURES:
+            psi = population_stability_index(reference[feature], current[feature])
+            reports.append({
+                "timestamp": timestamp,
+                "feature": feature,
+                "window_count": current[feature].count,
+                "reference_count": reference[feature].count,
+                "psi": psi,
+                "ks": ks_statistic(reference[feature], current[feature]),
+                "drifted": int(psi > settings.DRIFT_PSI_THRESHOLD),
+                "mean": current[feature].mean(),
+                "reference_mean": reference[feature].mean(),
+                "p50": current[feature].quantile(0.5),
+                "p90": current[feature].quantile(0.9),
+                "p99": current[feature].quantile(0.99),
+                "histogram": json.dumps(current[feature].counts)
+            })
+        with metrics_db.engine.begin() as connection:
+            connection.execute(DriftReport.__table__.insert(), reports)
+        self.stats["checks"] += 1
+        self.stats["last_check"] = timestamp.isoformat()
+        return reports
+
+    def apply_retention(self):
+        cutoff = datetime.utcnow() - timedelta(days=settings.DRIFT_REPORT_RETENTION_DAYS)
+        table = DriftReport.__table__
+        with metrics_db.engine.begin() as connection:
+            connection.execute(table.delete().where(table.c.timestamp < cutoff))
+
+    def reset_reference(self):
+        """Start a new reference from the next ``DRIFT_REFERENCE_SIZE`` predictions."""
+        with metrics_db.engine.begin() as connection:
+            connection.execute(DriftReference.__table__.delete())
+        with self._lock:
+            self._reference = {feature: FeatureSketch(bounds) for feature, bounds in FEATURE_BOUNDS.items()}
+            self._reference_size = 0
+            self._reference_frozen = False
+
+    def get_reports(self, since: datetime = None, feature: str = None) -> List[Dict]:
+        """Stored drift reports, oldest first."""
+        table = DriftReport.__table__
+        query = table.select()
+        if since is not None:
+            query = query.where(table.c.timestamp >= since)
+        if feature is not None:
+            query = query.where(table.c.feature == feature)
+        return self._read_reports(query.order_by(table.c.timestamp, table.c.feature))
+
+    def get_latest(self) -> List[Dict]:
+        """The reports of the most recent check."""
+        table = DriftReport.__table__
+        latest = select(func.max(table.c.timestamp)).scalar_subquery()
+        return self._read_reports(table.select().where(table.c.timestamp == latest).order_by(table.c.feature))
+
+    @staticmethod
+    def _read_reports(query) -> List[Dict]:
+        with metrics_db.engine.connect() as connection:
+            rows = connection.execute(query).mappings().all()
+        return [{key: value for key, value in row.items() if key not in ("id", "histogram")} for row in rows]
+
+    def get_summary(self) -> Dict[str, Dict]:
+        """Distribution of each feature over the current window, from the sketches."""
+        reference, current, frozen = self._snapshot()
+        return {
+            feature: {
+                "count": current[feature].count,
+                "mean": current[feature].mean(),
+                "p50": current[feature].quantile(0.5),
+                "p90": current[feature].quantile(0.9),
+                "p99": current[feature].quantile(0.99),
+                "reference_mean": reference[feature].mean() if frozen else None
+            }
+            for feature in FEATURES
+        }
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "window": len(self._window),
+                "reference_count": self._reference_size,
+                "reference_frozen": self._reference_frozen
+            }
+
+drift_monitor = DriftMonitor()
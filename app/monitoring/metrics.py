@@ -1,14 +1,21 @@
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, Text
+from sqlalchemy import create_engine, event, func, select, Column, Index, Integer, Float, String, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-import os
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import atexit
+import json
+import math
+import threading
+import time
+from app.config import settings
 
 Base = declarative_base()
 
 class Metric(Base):
     __tablename__ = 'metrics'
-    
+
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     tool = Column(String(50))
@@ -16,34 +23,383 @@ class Metric(Base):
     confidence = Column(Float, nullable=True)
     query = Column(Text)
     result = Column(Text)
-    tokens_used = Column(Integer, default=0)  
+    tokens_used = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('ix_metrics_timestamp', 'timestamp'),
+        Index('ix_metrics_tool_timestamp', 'tool', 'timestamp'),
+    )
+
+class MetricRollup(Base):
+    """Per-tool aggregates of one time bucket; ``bucket_seconds`` 0 holds all-time totals."""
+    __tablename__ = 'metric_rollups'
+
+    bucket_seconds = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    tool = Column(String(50), primary_key=True)
+    count = Column(Integer, default=0)
+    latency_sum = Column(Float, default=0.0)
+    latency_max = Column(Float, default=0.0)
+    latency_p50 = Column(Float)
+    latency_p95 = Column(Float)
+    latency_p99 = Column(Float)
+    confidence_sum = Column(Float, default=0.0)
+    confidence_count = Column(Integer, default=0)
+    # sparse {bin: count} over LATENCY_BOUNDS, so buckets merge without the raw rows
+    latency_histogram = Column(Text)
+
+class StageTiming(Base):
+    """One stage of a traced request; kept apart from ``metrics`` so stages are not counted as requests."""
+    __tablename__ = 'stage_timings'
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    trace_id = Column(String(32))
+    # name of the request's root span, e.g. "query"
+    trace = Column(String(50))
+    stage = Column(String(50))
+    latency = Column(Float)
+
+    __table_args__ = (
+        Index('ix_stage_timings_timestamp', 'timestamp'),
+        Index('ix_stage_timings_stage_timestamp', 'stage', 'timestamp'),
+    )
+
+ROLLUP_BUCKETS = {"all": 0, "minute": 60, "hour": 3600}
+EPOCH = datetime(1970, 1, 1)
+# latency bins grow by 2^(1/4) (~19%) from 1ms to about 10 minutes
+LATENCY_BOUNDS = [0.001 * 2 ** (i / 4) for i in range(78)]
+
+def latency_bin(latency: float) -> int:
+    if latency <= LATENCY_BOUNDS[0]:
+        return 0
+    return min(len(LATENCY_BOUNDS) - 1, math.ceil(4 * math.log2(latency / LATENCY_BOUNDS[0])))
+
+def histogram_quantile(histogram: Dict[int, int], q: float) -> Optional[float]:
+    """Upper bound of the bin holding the ``q`` quantile."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bin_index in sorted(histogram):
+        seen += histogram[bin_index]
+        if seen >= q * total:
+            return LATENCY_BOUNDS[bin_index]
+    return LATENCY_BOUNDS[-1]
+
+def bucket_start(timestamp: datetime, seconds: int) -> datetime:
+    if seconds == 0:
+        return EPOCH
+    offset = int((timestamp - EPOCH).total_seconds()) // seconds * seconds
+    return EPOCH + timedelta(seconds=offset)
 
 class MetricsDB:
+    """Metrics table fed through an in-memory buffer.
+
+    ``log_metric`` only appends a row to a bounded deque, so the request path never
+    touches SQLite. A background thread drains the buffer every
+    ``METRICS_FLUSH_INTERVAL_SECONDS`` (sooner once ``METRICS_FLUSH_BATCH`` rows are
+    waiting) and writes each drain as one bulk insert in one transaction. When the
+    writer falls behind and the buffer is full, new rows are dropped and counted
+    instead of blocking requests.
+
+    The same transaction folds the rows into per-minute, per-hour and all-time
+    rollups per tool, so dashboard reads never scan the raw table. Raw rows and
+    rollups are deleted past their ``METRICS_*_RETENTION_DAYS``.
+
+    The writer thread starts with the first ``log_metric``, so a process that only
+    reads (the dashboard) never runs one.
+    """
+
     def __init__(self, db_path: str = "./monitoring.db"):
-        self.engine = create_engine(f'sqlite:///{db_path}')
+        self.engine = create_engine(f'sqlite:///{db_path}', connect_args={"check_same_thread": False})
+        event.listen(self.engine, "connect", self._configure_connection)
         Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
-    
+        # create_all skips tables that already exist, and with them their new indexes
+        for index in Metric.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        # one short-lived session per read; sessions are not shared across threads
+        self.Session = sessionmaker(bind=self.engine)
+
+        self._buffer = deque()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_retention = 0.0
+        self.stats = {
+            "logged": 0,
+            "written": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": None,
+            "retention_runs": 0
+        }
+
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, connection_record):
+        # WAL lets the dashboard read while the writer appends; NORMAL skips the per-commit fsync
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
     def log_metric(self, tool: str, latency: float, query: str, result: str, confidence: float = None):
-        metric = Metric(
-            tool=tool,
-            latency=latency,
-            confidence=confidence,
-            query=query,
-            result=result
-        )
-        self.session.add(metric)
-        self.session.commit()
-    
+        if len(self._buffer) >= settings.METRICS_BUFFER_SIZE:
+            self.stats["dropped"] += 1
+            return
+        self._buffer.append({
+            "timestamp": datetime.utcnow(),
+            "tool": tool,
+            "latency": latency,
+            "confidence": confidence,
+            "query": query,
+            "result": result,
+            "tokens_used": 0
+        })
+        self.stats["logged"] += 1
+        self._ensure_writer()
+        if len(self._buffer) >= settings.METRICS_FLUSH_BATCH:
+            self._wakeup.set()
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None and not self._closed:
+                self._writer = threading.Thread(target=self._flush_loop, name="metrics-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def close(self):
+        """Stop the writer thread after writing what is still buffered."""
+        with self._writer_lock:
+            self._closed = True
+            writer = self._writer
+        self._wakeup.set()
+        if writer is not None:
+            writer.join()
+            atexit.unregister(self.flush)
+        self.flush()
+        self.engine.dispose()
+
+    def log_stage_timings(self, rows: List[Dict]):
+        """Bulk-insert ``{"trace_id", "trace", "stage", "latency"}`` rows; called from the trace exporter's thread."""
+        if not rows:
+            return
+        timestamp = datetime.utcnow()
+        with self.engine.begin() as connection:
+            connection.execute(StageTiming.__table__.insert(), [{"timestamp": timestamp, **row} for row in rows])
+
+    def _flush_loop(self):
+        try:
+            self._remove_legacy_stage_rows()
+            self._backfill_rollups()
+        except Exception as e:
+            print(f"Metrics rollup backfill failed: {e}")
+        while not self._closed:
+            self._wakeup.wait(settings.METRICS_FLUSH_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+                if time.time() - self._last_retention >= settings.METRICS_RETENTION_INTERVAL_SECONDS:
+                    self.apply_retention()
+            except Exception as e:
+                print(f"Metrics flush failed: {e}")
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while self._buffer:
+                rows = self._drain(settings.METRICS_FLUSH_BATCH)
+                started = time.perf_counter()
+                try:
+                    with self.engine.begin() as connection:
+                        connection.execute(Metric.__table__.insert(), rows)
+                        self._update_rollups(connection, rows)
+                except Exception:
+                    self.stats["failed_flushes"] += 1
+                    self.stats["dropped"] += len(rows)
+                    raise
+                self.stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+                self.stats["flushes"] += 1
+                self.stats["written"] += len(rows)
+                written += len(rows)
+        return written
+
+    def _drain(self, limit: int) -> List[Dict]:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._buffer.popleft())
+            except IndexError:
+                break
+        return rows
+
+    def _update_rollups(self, connection, rows: List[Dict]):
+        """Merge ``rows`` into the rollup buckets they fall in, inside the caller's transaction."""
+        deltas = {}
+        for row in rows:
+            latency = row["latency"] or 0.0
+            bin_index = latency_bin(latency)
+            for seconds in ROLLUP_BUCKETS.values():
+                key = (seconds, bucket_start(row["timestamp"], seconds), row["tool"])
+                delta = deltas.setdefault(key, {
+                    "count": 0, "latency_sum": 0.0, "latency_max": 0.0,
+                    "confidence_sum": 0.0, "confidence_count": 0, "histogram": {}
+                })
+                delta["count"] += 1
+                delta["latency_sum"] += latency
+                delta["latency_max"] = max(delta["latency_max"], latency)
+                if row["confidence"] is not None:
+                    delta["confidence_sum"] += row["confidence"]
+                    delta["confidence_count"] += 1
+                delta["histogram"][bin_index] = delta["histogram"].get(bin_index, 0) + 1
+
+        table = MetricRollup.__table__
+        for (seconds, start, tool), delta in deltas.items():
+            bucket = (table.c.bucket_seconds == seconds) & (table.c.bucket_start == start) & (table.c.tool == tool)
+            existing = connection.execute(table.select().where(bucket)).mappings().first()
+            histogram = delta.pop("histogram")
+            if existing is not None:
+                for bin_index, count in json.loads(existing["latency_histogram"] or "{}").items():
+                    histogram[int(bin_index)] = histogram.get(int(bin_index), 0) + count
+                for field in ("count", "latency_sum", "confidence_sum", "confidence_count"):
+                    delta[field] += existing[field] or 0
+                delta["latency_max"] = max(delta["latency_max"], existing["latency_max"] or 0.0)
+
+            values = {
+                **delta,
+                "latency_p50": histogram_quantile(histogram, 0.50),
+                "latency_p95": histogram_quantile(histogram, 0.95),
+                "latency_p99": histogram_quantile(histogram, 0.99),
+                "latency_histogram": json.dumps(histogram)
+            }
+            if existing is None:
+                connection.execute(table.insert(), {
+                    "bucket_seconds": seconds, "bucket_start": start, "tool": tool, **values
+                })
+            else:
+                connection.execute(table.update().where(bucket), values)
+
+    def _remove_legacy_stage_rows(self):
+        """Drop stage timings that earlier versions logged as ``stage:``/``trace:`` metrics."""
+        metrics, rollups = Metric.__table__, MetricRollup.__table__
+        with self._flush_lock, self.engine.begin() as connection:
+            for table in (metrics, rollups):
+                connection.execute(table.delete().where(
+                    table.c.tool.like("stage:%") | table.c.tool.like("trace:%")
+                ))
+
+    def _backfill_rollups(self, batch_size: int = 5000):
+        """Build rollups once for a database written before they existed."""
+        metrics, rollups = Metric.__table__, MetricRollup.__table__
+        with self._flush_lock:
+            with self.engine.connect() as connection:
+                if connection.execute(rollups.select().limit(1)).first() is not None:
+                    return
+                if connection.execute(metrics.select().limit(1)).first() is None:
+                    return
+            print("Building metrics rollups from existing rows...")
+            last_id = 0
+            while True:
+                with self.engine.begin() as connection:
+                    rows = [dict(row) for row in connection.execute(
+                        metrics.select().where(metrics.c.id > last_id).order_by(metrics.c.id).limit(batch_size)
+                    ).mappings()]
+                    if not rows:
+                        return
+                    self._update_rollups(connection, [row for row in rows if row["timestamp"] is not None])
+                last_id = rows[-1]["id"]
+
+    def apply_retention(self):
+        """Delete raw rows and minute/hour buckets older than their retention."""
+        now = datetime.utcnow()
+        metrics, rollups = Metric.__table__, MetricRollup.__table__
+        with self._flush_lock, self.engine.begin() as connection:
+            for table in (metrics, StageTiming.__table__):
+                connection.execute(table.delete().where(
+                    table.c.timestamp < now - timedelta(days=settings.METRICS_RAW_RETENTION_DAYS)
+                ))
+            for bucket, days in (("minute", settings.METRICS_MINUTE_RETENTION_DAYS),
+                                 ("hour", settings.METRICS_HOUR_RETENTION_DAYS)):
+                connection.execute(rollups.delete().where(
+                    (rollups.c.bucket_seconds == ROLLUP_BUCKETS[bucket])
+                    & (rollups.c.bucket_start < now - timedelta(days=days))
+                ))
+        self._last_retention = time.time()
+        self.stats["retention_runs"] += 1
+
+    def get_rollups(self, bucket: str = "minute", since: datetime = None, tool: str = None) -> List[Dict]:
+        """Rollup rows of one granularity ("minute", "hour" or "all"), oldest first."""
+        if bucket not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unknown rollup bucket: {bucket}. Expected one of {tuple(ROLLUP_BUCKETS)}")
+        table = MetricRollup.__table__
+        condition = table.c.bucket_seconds == ROLLUP_BUCKETS[bucket]
+        if since is not None:
+            condition &= table.c.bucket_start >= bucket_start(since, ROLLUP_BUCKETS[bucket])
+        if tool is not None:
+            condition &= table.c.tool == tool
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                table.select().where(condition).order_by(table.c.bucket_start, table.c.tool)
+            ).mappings().all()
+        return [
+            {
+                "bucket_start": row["bucket_start"],
+                "tool": row["tool"],
+                "count": row["count"],
+                "avg_latency": row["latency_sum"] / row["count"] if row["count"] else None,
+                "max_latency": row["latency_max"],
+                "p50_latency": row["latency_p50"],
+                "p95_latency": row["latency_p95"],
+                "p99_latency": row["latency_p99"],
+                "avg_confidence": row["confidence_sum"] / row["confidence_count"] if row["confidence_count"] else None
+            }
+            for row in rows
+        ]
+
+    def get_total_count(self) -> int:
+        return sum(row["count"] for row in self.get_rollups("all"))
+
     def get_metrics(self, limit: int = 100):
-        return self.session.query(Metric).order_by(Metric.timestamp.desc()).limit(limit).all()
-    
+        with self.Session() as session:
+            return session.query(Metric).order_by(Metric.timestamp.desc()).limit(limit).all()
+
     def get_avg_latency_by_tool(self):
-        from sqlalchemy import func
-        return self.session.query(
-            Metric.tool,
-            func.avg(Metric.latency).label('avg_latency')
-        ).group_by(Metric.tool).all()
+        return [(row["tool"], row["avg_latency"]) for row in self.get_rollups("all")]
+
+    def get_stage_latencies(self, since: datetime = None, trace: str = None) -> List[Dict]:
+        """Count and mean/max latency per stage of traced requests."""
+        table = StageTiming.__table__
+        query = select(
+            table.c.stage,
+            func.count().label("count"),
+            func.avg(table.c.latency).label("avg_latency"),
+            func.max(table.c.latency).label("max_latency")
+        ).group_by(table.c.stage).order_by(table.c.stage)
+        if since is not None:
+            query = query.where(table.c.timestamp >= since)
+        if trace is not None:
+            query = query.where(table.c.trace == trace)
+        with self.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(query).mappings()]
+
+    def clear(self):
+        with self._flush_lock:
+            self._buffer.clear()
+            with self.engine.begin() as connection:
+                connection.execute(Metric.__table__.delete())
+                connection.execute(MetricRollup.__table__.delete())
+                connection.execute(StageTiming.__table__.delete())
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "buffered": len(self._buffer)}
 
-metrics_db = MetricsDB()
\ No newline at end of file
+metrics_db = MetricsDB()
@@ -0,0 +1,363 @@
+import atexit
+import bisect
+import fcntl
+import glob
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+from app.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *labels: str):
+        """Overwrite a value; counters use this to mirror a component's own cumulative stats."""
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def replace(self, values: Dict[Tuple[str, ...], float]):
+        """Swap in the full set of series, dropping those no longer present."""
+        values = {labels: float(value) for labels, value in values.items()}
+        with self._lock:
+            self._values = values
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            values = [[list(labels), value] for labels, value in self._values.items()]
+        return {"type": self.kind, "help": self.documentation, "labelnames": list(self.labelnames), "values": values}
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+class Gauge(_Metric):
+    """A current value. Across workers gauges are summed, or with ``aggregate="max"``
+    maximized (for state every worker holds a copy of, like index size)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), aggregate: str = "sum"):
+        super().__init__(name, documentation, labelnames)
+        self.aggregate = aggregate
+
+    def snapshot(self) -> Dict:
+        return {**super().snapshot(), "aggregate": self.aggregate}
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # one count per bucket plus +Inf, then the sum
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[slot] += 1
+            state[-1] += value
+
+    def set(self, value: float, *labels: str):
+        raise TypeError("Histograms can only be observed")
+
+    def replace(self, values: Dict[Tuple[str, ...], float]):
+        raise TypeError("Histograms can only be observed")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            values = [[list(labels), list(state)] for labels, state in self._values.items()]
+        return {"type": self.kind, "help": self.documentation, "labelnames": list(self.labelnames),
+                "buckets": list(self.buckets), "values": values}
+
+class MetricsRegistry:
+    """In-process metrics in the Prometheus text exposition format.
+
+    Hot-path updates touch one dict under a per-metric lock. State that components
+    already track (queue depths, cache counters, index sizes) is copied in by
+    collectors only when metrics are read. With ``METRICS_MULTIPROC_DIR`` set, each
+    worker process writes a snapshot to ``<dir>/<pid>-<token>.json`` every
+    ``METRICS_SNAPSHOT_INTERVAL_SECONDS`` and at exit, and holds a lock on the
+    matching ``.lock`` file while it runs. A scrape of any worker merges its live
+    values with the other workers' snapshots. Snapshots whose lock is free belong
+    to exited workers: their counters and histograms are folded into
+    ``archive.json`` and the files removed, so totals neither go backwards nor
+    keep exited workers' files around; their gauges are dropped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._writer = None
+        # unique per process, so a reused pid never overwrites an exited worker's snapshot
+        self._token = None
+        self._token_lock = None
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), aggregate: str = "sum") -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames, aggregate))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a function that updates metrics from component state before each read."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+    def start(self):
+        """Start writing this worker's snapshots when running with several workers."""
+        if not settings.METRICS_MULTIPROC_DIR or self._writer is not None:
+            return
+        os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+        self._token = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self._token_lock = open(self._path(self._token, ".lock"), "a")
+        fcntl.flock(self._token_lock.fileno(), fcntl.LOCK_EX)
+        with self._archive_lock():
+            # snapshots left by workers that exited before this one started
+            self._fold_exited(self._worker_tokens())
+        self._writer = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._writer.start()
+        atexit.register(self.write_snapshot)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.METRICS_SNAPSHOT_INTERVAL_SECONDS)
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                print(f"Writing metrics snapshot failed: {e}")
+
+    @staticmethod
+    def _path(token: str, suffix: str) -> str:
+        return os.path.join(settings.METRICS_MULTIPROC_DIR, f"{token}{suffix}")
+
+    def write_snapshot(self):
+        path = self._path(self._token, ".json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    @contextmanager
+    def _archive_lock(self):
+        """Serializes folding exited workers with reading the archive, across processes."""
+        with open(self._path("archive", ".lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _worker_tokens(self) -> List[str]:
+        """Tokens of every other worker, live or exited (including ones that never wrote a snapshot)."""
+        tokens = set()
+        for pattern in ("*.json", "*.lock"):
+            for path in glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, pattern)):
+                tokens.add(os.path.splitext(os.path.basename(path))[0])
+        tokens.discard(self._token)
+        tokens.discard("archive")
+        return sorted(tokens)
+
+    def _read_archive(self) -> Dict:
+        try:
+            with open(self._path("archive", ".json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"metrics": {}, "folded": []}
+
+    def _fold_exited(self, tokens: List[str]) -> List[str]:
+        """Fold the snapshots of exited workers into the archive; returns the live tokens.
+
+        The archive records which tokens it holds before their files are removed, so
+        a crash in between does not count a worker twice.
+        """
+        live, exited = [], []
+        for token in tokens:
+            (live if _is_locked(self._path(token, ".lock")) else exited).append(token)
+        if not exited:
+            return live
+
+        archive = self._read_archive()
+        folded = {token for token in archive["folded"] if os.path.exists(self._path(token, ".json"))}
+        for token in exited:
+            if token in folded:
+                continue
+            try:
+                with open(self._path(token, ".json")) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                snapshot = {}
+            for name, metric in snapshot.items():
+                if metric["type"] != "gauge":
+                    _merge(archive["metrics"], name, metric)
+            folded.add(token)
+        archive["folded"] = sorted(folded)
+        path = self._path("archive", ".json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(archive, f)
+        os.replace(f"{path}.tmp", path)
+
+        for token in exited:
+            for suffix in (".json", ".json.tmp", ".lock"):
+                try:
+                    os.remove(self._path(token, suffix))
+                except FileNotFoundError:
+                    pass
+        return live
+
+    def render(self) -> str:
+        merged = self.snapshot()
+        if settings.METRICS_MULTIPROC_DIR:
+            os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+            with self._archive_lock():
+                live = self._fold_exited(self._worker_tokens())
+                snapshots = [self._read_archive()["metrics"]]
+                for token in live:
+                    try:
+                        with open(self._path(token, ".json")) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue
+            for snapshot in snapshots:
+                for name, metric in snapshot.items():
+                    _merge(merged, name, metric)
+        return "".join(_render_metric(name, metric) for name, metric in sorted(merged.items()))
+
+def _is_locked(path: str) -> bool:
+    """Whether a worker holds the lock file, i.e. is still running."""
+    try:
+        f = open(path)
+    except FileNotFoundError:
+        return False
+    with f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return False
+
+def _merge(merged: Dict, name: str, metric: Dict):
+    target = merged.setdefault(name, {**metric, "values": []})
+    if target["type"] != metric["type"] or target.get("buckets") != metric.get("buckets"):
+        return
+    values = {tuple(labels): value for labels, value in target["values"]}
+    for labels, value in metric["values"]:
+        labels = tuple(labels)
+        current = values.get(labels)
+        if current is None:
+            values[labels] = value
+        elif metric["type"] == "histogram":
+            values[labels] = [a + b for a, b in zip(current, value)]
+        elif metric.get("aggregate") == "max":
+            values[labels] = max(current, value)
+        else:
+            values[labels] = current + value
+    target["values"] = [[list(labels), value] for labels, value in values.items()]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def _render_metric(name: str, metric: Dict) -> str:
+    lines = [f"# HELP {name} {_escape(metric['help'])}", f"# TYPE {name} {metric['type']}"]
+    labelnames = metric["labelnames"]
+    for labels, value in sorted(metric["values"]):
+        if metric["type"] != "histogram":
+            lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+            continue
+        cumulative = 0
+        for bound, count in zip(metric["buckets"] + [math.inf], value[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labelnames, labels, ('le', _number(bound)))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labelnames, labels)} {_number(value[-1])}")
+        lines.append(f"{name}_count{_labels(labelnames, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+metrics_registry = MetricsRegistry()
+
+cache_lookups = metrics_registry.counter(
+    "rag_cache_lookups_total", "Cache lookups by cache and outcome", ["cache", "result"]
+)
+http_requests = metrics_registry.counter(
+    "rag_http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+http_request_seconds = metrics_registry.histogram(
+    "rag_http_request_duration_seconds", "HTTP request latency until the last body byte", ["method", "route"]
+)
+
+class RequestMetricsMiddleware:
+    """ASGI middleware counting requests and timing them until the response body is sent.
+
+    Requests are labelled with the matched route template, not the raw path, so path
+    parameters do not create new series; unmatched requests share ``route="unmatched"``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_requests.inc(scope["method"], path, str(status[0]))
+            http_request_seconds.observe(time.perf_counter() - started, scope["method"], path)
@@ -1,6 +1,8 @@
 from typing import Dict, Any, List
 from app.core.rag_pipeline import rag_pipeline
-from transformers import pipeline
+from app.core.model_registry import model_registry
+from app.core.model_server import loader_for
+from app.core.tracing import traced
 import time
 import requests
 
@@ -33,14 +35,20 @@ class Orchestrator:
     
     def __init__(self):
         self.rag = rag_pipeline
-        print("Loading summarizer model...")
-        self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        print("Loading translator model...")
-        self.translator = pipeline("translation_en_to_fr", model="Helsinki-NLP/opus-mt-en-fr")
+        model_registry.register("summarizer", loader_for("summarizer"))
+        model_registry.register("translator", loader_for("translator"))
         self.a2a_client = A2AClient()
         self.chains = {}
-        print("Orchestrator initialized with all tools!")
+    
+    @property
+    def summarizer(self):
+        return model_registry.get("summarizer")
+    
+    @property
+    def translator(self):
+        return model_registry.get("translator")
         
+    @traced("chain.rag")
     def rag_chain(self, query: str) -> Dict[str, Any]:
         start_time = time.time()
         answer, retrieval_results, confidence = self.rag.query(query)
@@ -56,6 +64,7 @@ class Orchestrator:
             "tool": "rag"
         }
     
+    @traced("chain.summarize")
     def summarize_chain(self, text: str) -> Dict[str, Any]:
         start_time = time.time()
         
@@ -83,6 +92,7 @@ class Orchestrator:
             "tool": "summarizer"
         }
     
+    @traced("chain.translate")
     def translate_chain(self, text: str) -> Dict[str, Any]:
         start_time = time.time()
         
@@ -101,6 +111,7 @@ class Orchestrator:
             "tool": "translator"
         }
     
+    @traced("chain.sentiment")
     def sentiment_chain(self, text: str) -> Dict[str, Any]:
         start_time = time.time()
         sentiment = self.a2a_client.get_sentiment(text)
@@ -141,6 +152,7 @@ class Orchestrator:
         
         return results
     
+@traced("chain.rag_finetuned")
 def rag_chain_finetuned(self, query: str) -> Dict[str, Any]:
     """RAG with fine-tuned model"""
     from app.finetuning.trainer import finetuner
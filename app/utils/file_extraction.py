@@ -0,0 +1,85 @@
+import codecs
+import hashlib
+import os
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+TEXT_BLOCK_BYTES = 64 * 1024
+
+class UnsupportedFileType(ValueError):
+    pass
+
+class FileTooLarge(ValueError):
+    pass
+
+def file_hash(stream: BinaryIO, max_bytes: int = None) -> Tuple[str, int]:
+    """md5 of a seekable stream read in blocks; rewinds the stream afterwards."""
+    digest = hashlib.md5()
+    size = 0
+    for block in iter(lambda: stream.read(1024 * 1024), b""):
+        size += len(block)
+        if max_bytes is not None and size > max_bytes:
+            raise FileTooLarge(f"File is larger than {max_bytes} bytes")
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest(), size
+
+def iter_pages(stream: BinaryIO, filename: str) -> Iterator[Tuple[Optional[int], str]]:
+    """Yield ``(page_number, text)`` one page at a time; plain text has no page numbers."""
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == ".pdf":
+        return _iter_pdf_pages(stream)
+    if extension == ".docx":
+        return _iter_docx_pages(stream)
+    if extension in (".txt", ".md"):
+        return _iter_text_blocks(stream)
+    raise UnsupportedFileType(f"Unsupported file type: {extension or filename}")
+
+def _iter_pdf_pages(stream: BinaryIO) -> Iterator[Tuple[int, str]]:
+    from pypdf import PdfReader
+    # PdfReader only parses the xref up front; page content is read from the stream on demand
+    reader = PdfReader(stream)
+    if reader.is_encrypted:
+        raise ValueError("Encrypted PDFs are not supported")
+    for number, page in enumerate(reader.pages, 1):
+        yield number, page.extract_text() or ""
+
+def _iter_docx_pages(stream: BinaryIO) -> Iterator[Tuple[int, str]]:
+    from docx import Document
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = Document(stream)
+    page_number = 1
+    lines = []
+    for element in document.element.body.iterchildren():
+        tag = element.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            # DOCX has no fixed pages; explicit and last-rendered page breaks are the closest thing
+            if element.xpath('.//w:br[@w:type="page"] | .//w:lastRenderedPageBreak') and lines:
+                yield page_number, "\n".join(lines)
+                page_number += 1
+                lines = []
+            lines.append(Paragraph(element, document).text)
+        elif tag == "tbl":
+            for row in Table(element, document).rows:
+                lines.append(" | ".join(cell.text for cell in row.cells))
+    if lines:
+        yield page_number, "\n".join(lines)
+
+def _iter_text_blocks(stream: BinaryIO) -> Iterator[Tuple[None, str]]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    for block in iter(lambda: stream.read(TEXT_BLOCK_BYTES), b""):
+        pending += decoder.decode(block)
+        # end blocks on a line boundary unless a single line keeps growing
+        cut = pending.rfind("\n") + 1
+        if cut == 0:
+            if len(pending) < TEXT_BLOCK_BYTES * 16:
+                continue
+            cut = len(pending)
+        yield None, pending[:cut]
+        pending = pending[cut:]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield None, pending
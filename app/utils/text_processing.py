@@ -17,17 +17,20 @@ class TextProcessor:
             separators=["\n\n", "\n", ". ", " ", ""]
         )
     
-    def chunk_text(self, text: str, metadata: Dict = None) -> List[Dict]:
+    def chunk_text(self, text: str, metadata: Dict = None, document_id: str = None, start_index: int = 0,
+                   count_chunks: bool = True) -> List[Dict]:
+        """Split text into chunks; pages of one file pass a shared document_id, a running start_index
+        and ``count_chunks=False``, since a page's chunk count is not the document's total."""
         chunks = self.text_splitter.split_text(text)
         
         result = []
-        doc_id = self._generate_doc_id(text)
+        doc_id = document_id or self._generate_doc_id(text)
         
         for idx, chunk in enumerate(chunks):
             chunk_metadata = {
                 "document_id": doc_id,
-                "chunk_index": idx,
-                "total_chunks": len(chunks),
+                "chunk_index": start_index + idx,
+                **({"total_chunks": len(chunks)} if count_chunks else {}),
                 "created_at": datetime.utcnow().isoformat(),
                 **(metadata or {})
             }
@@ -47,4 +50,22 @@ class TextProcessor:
         text = " ".join(text.split())
         return text.strip()
 
-text_processor = TextProcessor()
\ No newline at end of file
+text_processor = TextProcessor()
+
+def chunk_document(document: Dict) -> List[Dict]:
+    """Clean and chunk one ``{"content", "metadata"}`` document; runs in bulk-ingest worker processes."""
+    return text_processor.chunk_text(TextProcessor.clean_text(document["content"]), document.get("metadata"))
+
+def chunk_documents(documents: List[Dict]) -> List[List[Dict]]:
+    """Chunk a slice of documents; a document that fails to chunk (or is None) comes back as None."""
+    results = []
+    for document in documents:
+        if document is None:
+            results.append(None)
+            continue
+        try:
+            results.append(chunk_document(document))
+        except Exception as e:
+            print(f"Failed to chunk document: {e}")
+            results.append(None)
+    return results
@@ -0,0 +1,33 @@
+import argparse
+import json
+from app.core.calibration import confidence_calibrator, retrieval_mode
+from app.core.collection_registry import DEFAULT_COLLECTION, collection_registry
+from app.core.rag_pipeline import rag_pipeline
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the retrieval confidence threshold from labelled queries")
+    parser.add_argument("labelled_queries", help="JSONL with query plus relevant_document_ids or answerable")
+    parser.add_argument("--top-k", type=int, default=None)
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    args = parser.parse_args()
+
+    with open(args.labelled_queries) as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+
+    with collection_registry.use(args.collection) as collection:
+        store = collection.store
+        print(f" Calibrating '{collection.name}' on {len(examples)} labelled queries "
+              f"({store.metric} similarity, {retrieval_mode()} retrieval)")
+        # the same retrieval the pipeline runs, so the fit sees the scores it will calibrate
+        params = confidence_calibrator.fit(
+            examples, store,
+            lambda query, top_k: rag_pipeline.retrieve_hits(query, top_k, collection=collection),
+            top_k=args.top_k
+        )
+
+    print(f" Threshold: {params['threshold']:.3f}")
+    print(f" F1={params['f1']:.3f} precision={params['precision']:.3f} recall={params['recall']:.3f}")
+    print(f" Saved to: {confidence_calibrator.path(store)}")
+
+if __name__ == "__main__":
+    main()
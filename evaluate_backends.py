@@ -0,0 +1,188 @@
+import argparse
+import json
+import time
+from typing import Dict, List
+import numpy as np
+from app.core.model_backends import BACKENDS
+from app.core.model_loaders import LOCAL_LOADERS
+
+EVAL_SENTENCES = [
+    "Python was created by Guido van Rossum and first released in 1991.",
+    "FAISS is a library for efficient similarity search of dense vectors.",
+    "The mitochondria is the powerhouse of the cell.",
+    "Retrieval-augmented generation grounds a language model in retrieved documents.",
+    "The Eiffel Tower is located in Paris and was completed in 1889.",
+    "Gradient descent updates parameters in the direction of the negative gradient.",
+    "A Unix socket lets processes on the same machine exchange data.",
+    "Photosynthesis converts light energy into chemical energy in plants.",
+    "Who created the Python programming language?",
+    "Where is the Eiffel Tower?",
+    "How do plants turn sunlight into energy?",
+    "What library does fast vector similarity search?",
+]
+
+EVAL_PROMPTS = [
+    "Answer the question based on the context below.\n\nContext: Python was created by Guido van Rossum "
+    "and first released in 1991.\n\nQuestion: Who created Python?\n\nAnswer:",
+    "Answer the question based on the context below.\n\nContext: The Eiffel Tower is located in Paris and "
+    "was completed in 1889.\n\nQuestion: When was the Eiffel Tower completed?\n\nAnswer:",
+    "Answer the question based on the context below.\n\nContext: FAISS is a library for efficient similarity "
+    "search of dense vectors, developed by Meta AI.\n\nQuestion: What is FAISS used for?\n\nAnswer:",
+    "Answer the question based on the context below.\n\nContext: Photosynthesis converts light energy into "
+    "chemical energy and releases oxygen.\n\nQuestion: What does photosynthesis release?\n\nAnswer:",
+]
+
+EVAL_DOCUMENTS = [
+    "Retrieval-augmented generation combines a retriever that finds relevant passages with a generator "
+    "that writes the answer. The retriever embeds the query and searches a vector index, and the top "
+    "passages are placed in the prompt. This keeps answers grounded in the knowledge base, makes it "
+    "possible to cite sources, and lets the knowledge be updated without retraining the model. The main "
+    "costs are the latency of the search and of generation, and answers can only be as good as the "
+    "retrieved context, so chunking and ranking matter as much as the choice of language model.",
+    "Dynamic quantization stores the weights of linear layers as 8-bit integers and quantizes activations "
+    "on the fly. On CPUs with fast integer instructions this often makes transformer inference two to "
+    "three times faster and shrinks the model by about four times, at the cost of a small change in the "
+    "outputs. Whether that change matters depends on the task, which is why outputs should be compared "
+    "against the full precision model on a fixed evaluation set before switching a production service.",
+]
+
+PIPELINE_OUTPUT_KEYS = {
+    "generator": "generated_text",
+    "summarizer": "summary_text",
+    "translator": "translation_text",
+}
+
+PIPELINE_KWARGS = {
+    "generator": {"max_length": 200, "do_sample": False},
+    "summarizer": {"max_length": 150, "min_length": 50, "do_sample": False},
+    "translator": {},
+}
+
+def _timed(fn, inputs: List) -> (List, List[float]):
+    outputs, latencies = [], []
+    for item in inputs:
+        start = time.perf_counter()
+        outputs.append(fn(item))
+        latencies.append(time.perf_counter() - start)
+    return outputs, latencies
+
+def _latency_stats(latencies: List[float]) -> Dict:
+    return {
+        "mean_ms": float(np.mean(latencies) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000)
+    }
+
+def _token_f1(prediction: str, reference: str) -> float:
+    predicted, expected = prediction.lower().split(), reference.lower().split()
+    common = sum(min(predicted.count(t), expected.count(t)) for t in set(predicted))
+    if not common:
+        return float(predicted == expected)
+    precision, recall = common / len(predicted), common / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+def evaluate_embedding(backend: str, sentences: List[str], baseline: np.ndarray = None) -> Dict:
+    start = time.perf_counter()
+    model = LOCAL_LOADERS["embedding"](backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    model.encode(sentences[:2], convert_to_numpy=True, show_progress_bar=False)
+    outputs, latencies = _timed(lambda s: model.encode(s, convert_to_numpy=True, show_progress_bar=False), sentences)
+    embeddings = np.asarray(outputs, dtype='float32')
+    start = time.perf_counter()
+    model.encode(sentences, convert_to_numpy=True, show_progress_bar=False)
+    batch_seconds = time.perf_counter() - start
+
+    report = {"load_seconds": load_seconds, "single": _latency_stats(latencies),
+              "batch_ms": batch_seconds * 1000, "embeddings": embeddings}
+    if baseline is not None:
+        unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        reference = baseline / np.linalg.norm(baseline, axis=1, keepdims=True)
+        cosine = np.sum(unit * reference, axis=1)
+        # does every sentence keep the same nearest neighbour as under fp32?
+        neighbours = np.argsort(-(unit @ unit.T), axis=1)[:, 1]
+        reference_neighbours = np.argsort(-(reference @ reference.T), axis=1)[:, 1]
+        report.update({
+            "mean_cosine_to_fp32": float(cosine.mean()),
+            "min_cosine_to_fp32": float(cosine.min()),
+            "neighbour_agreement": float(np.mean(neighbours == reference_neighbours))
+        })
+    return report
+
+def evaluate_pipeline(name: str, backend: str, inputs: List[str], baseline: List[str] = None) -> Dict:
+    start = time.perf_counter()
+    pipeline = LOCAL_LOADERS[name](backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    key, kwargs = PIPELINE_OUTPUT_KEYS[name], PIPELINE_KWARGS[name]
+    pipeline(inputs[0], **kwargs)
+    outputs, latencies = _timed(lambda text: pipeline(text, **kwargs)[0][key], inputs)
+
+    report = {"load_seconds": load_seconds, "single": _latency_stats(latencies), "outputs": outputs}
+    if baseline is not None:
+        report.update({
+            "exact_match_to_fp32": float(np.mean([a == b for a, b in zip(outputs, baseline)])),
+            "token_f1_to_fp32": float(np.mean([_token_f1(a, b) for a, b in zip(outputs, baseline)]))
+        })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare int8/ONNX model backends against the fp32 baseline")
+    models = ["embedding"] + list(PIPELINE_OUTPUT_KEYS)
+    parser.add_argument("--models", nargs="+", default=models, choices=models)
+    parser.add_argument("--backends", nargs="+", default=[b for b in BACKENDS if b != "torch"],
+                        choices=[b for b in BACKENDS if b != "torch"])
+    parser.add_argument("--eval-file", help="JSON with optional sentences, prompts and documents lists")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    eval_set = {"sentences": EVAL_SENTENCES, "prompts": EVAL_PROMPTS, "documents": EVAL_DOCUMENTS}
+    if args.eval_file:
+        with open(args.eval_file) as f:
+            eval_set.update(json.load(f))
+    pipeline_inputs = {
+        "generator": eval_set["prompts"],
+        "summarizer": eval_set["documents"],
+        "translator": eval_set["sentences"],
+    }
+
+    report = {}
+    for name in args.models:
+        print(f"\n {name}")
+        print("=" * 60)
+        results = {}
+        for backend in ["torch"] + args.backends:
+            try:
+                if name == "embedding":
+                    baseline = results["torch"]["embeddings"] if backend != "torch" else None
+                    result = evaluate_embedding(backend, eval_set["sentences"], baseline)
+                else:
+                    baseline = results["torch"]["outputs"] if backend != "torch" else None
+                    result = evaluate_pipeline(name, backend, pipeline_inputs[name], baseline)
+            except Exception as e:
+                print(f" {backend:6s} failed: {e}")
+                results[backend] = {"error": str(e)}
+                if backend == "torch":
+                    break
+                continue
+            results[backend] = result
+
+            line = f" {backend:6s} load {result['load_seconds']:6.1f}s  " \
+                   f"mean {result['single']['mean_ms']:8.1f}ms  p95 {result['single']['p95_ms']:8.1f}ms"
+            if "mean_cosine_to_fp32" in result:
+                line += f"  cosine {result['mean_cosine_to_fp32']:.4f} (min {result['min_cosine_to_fp32']:.4f})" \
+                        f"  nn-agree {result['neighbour_agreement']:.2f}"
+            if "token_f1_to_fp32" in result:
+                line += f"  exact {result['exact_match_to_fp32']:.2f}  token-f1 {result['token_f1_to_fp32']:.3f}"
+            print(line)
+
+        for result in results.values():
+            result.pop("embeddings", None)
+        report[name] = results
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n Report saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+from app.config import settings
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory or JSONL file into the knowledge base")
+    parser.add_argument("source", nargs="?", default=settings.DOCUMENTS_PATH,
+                        help="Directory of .txt/.md/.jsonl files, or a single .jsonl file")
+    parser.add_argument("--job-id", default=None, help="Checkpoint name (default: hash of the source path)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--processes", type=int, default=None, help="Chunking processes (default: all cores)")
+    parser.add_argument("--collection", default="default", help="Collection to ingest into (must already exist)")
+    parser.add_argument("--batch-chunks", type=int, default=None, help="Chunks embedded and indexed per batch")
+    args = parser.parse_args()
+
+    # imported here: chunking workers start from a fork server or spawn and re-import this script
+    from app.core.bulk_ingest import BulkIngestJob
+    from app.core.collection_registry import UnknownCollection, collection_registry
+
+    try:
+        with collection_registry.use(args.collection) as target:
+            read_only = target.store.read_only
+    except UnknownCollection as e:
+        print(f" {e}")
+        return
+    if read_only:
+        print(" The index is being written by another process (is the API running?); "
+              f"start the job with POST /api/v1/collections/{args.collection}/ingest/bulk instead")
+        return
+
+    job = BulkIngestJob(args.source, job_id=args.job_id, resume=not args.restart,
+                        processes=args.processes, batch_chunks=args.batch_chunks, collection=args.collection)
+    print(f" Bulk ingest {job.job_id}: {args.source} -> {args.collection} ({job.processes} chunking processes)")
+    print("=" * 60)
+    try:
+        status = job.run()
+    except KeyboardInterrupt:
+        print("\n Interrupted; rerun the same command to resume from the last checkpoint")
+        return
+
+    print("=" * 60)
+    print(f" Documents: {status['documents']} ({status['failed_documents']} failed)")
+    print(f" Chunks: {status['chunks']} ({status['chunks_added']} added, {status['duplicates']} duplicates)")
+    print(f" Throughput: {status['docs_per_second']:.1f} docs/s, {status['chunks_per_second']:.1f} chunks/s")
+    print(f" Checkpoint: {job.checkpoint_path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import requests
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import json
 
 class AIKnowledgeAssistantClient:
@@ -9,7 +9,9 @@ class AIKnowledgeAssistantClient:
         self.api_prefix = "/api/v1"
         self.session = requests.Session()
     
-    def _url(self, endpoint: str) -> str:
+    def _url(self, endpoint: str, collection: Optional[str] = None) -> str:
+        if collection:
+            endpoint = f"/collections/{collection}{endpoint}"
         return f"{self.base_url}{self.api_prefix}{endpoint}"
     
     def health_check(self) -> Dict:
@@ -17,62 +19,159 @@ class AIKnowledgeAssistantClient:
         response.raise_for_status()
         return response.json()
     
-    def upload_document(self, content: str, metadata: Optional[Dict] = None) -> Dict:
+    def upload_document(self, content: str, metadata: Optional[Dict] = None, collection: Optional[str] = None) -> Dict:
         payload = {
             "content": content,
             "metadata": metadata or {}
         }
         
         response = self.session.post(
-            self._url("/documents"),
+            self._url("/documents", collection),
             json=payload
         )
         response.raise_for_status()
         return response.json()
     
-    def upload_file(self, file_path: str) -> Dict:
+    def upsert_document(self, document_id: str, content: str, metadata: Optional[Dict] = None,
+                        collection: Optional[str] = None) -> Dict:
+        payload = {
+            "content": content,
+            "metadata": metadata or {}
+        }
+        
+        response = self.session.put(
+            self._url(f"/documents/{document_id}", collection),
+            json=payload
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def delete_document(self, document_id: str, collection: Optional[str] = None) -> Dict:
+        response = self.session.delete(self._url(f"/documents/{document_id}", collection))
+        response.raise_for_status()
+        return response.json()
+    
+    def upload_file(self, file_path: str, collection: Optional[str] = None) -> Dict:
         with open(file_path, 'rb') as f:
             files = {'file': f}
             response = self.session.post(
-                self._url("/documents/file"),
+                self._url("/documents/file", collection),
                 files=files
             )
         response.raise_for_status()
         return response.json()
     
-    def query(self, query: str, top_k: int = 5) -> Dict:
+    def query(self, query: str, top_k: int = 5, collection: Optional[str] = None) -> Dict:
         params = {
             "q": query,
             "top_k": top_k
         }
         
         response = self.session.get(
-            self._url("/query"),
+            self._url("/query", collection),
             params=params
         )
         response.raise_for_status()
         return response.json()
     
-    def query_post(self, query: str, top_k: int = 5) -> Dict:
+    def query_stream(self, query: str, top_k: int = 5, collection: Optional[str] = None) -> Iterator[Dict]:
+        """Yield server-sent events: one "retrieval", then "token" events, then "done"."""
+        params = {
+            "q": query,
+            "top_k": top_k
+        }
+        
+        with self.session.get(self._url("/query/stream", collection), params=params, stream=True) as response:
+            response.raise_for_status()
+            event = {}
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    if event:
+                        yield event
+                        event = {}
+                elif line.startswith("event:"):
+                    event["event"] = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    event["data"] = json.loads(line[len("data:"):].strip())
+    
+    def query_post(self, query: str, top_k: int = 5, filters: Optional[Dict] = None,
+                   collection: Optional[str] = None) -> Dict:
         payload = {
             "query": query,
             "top_k": top_k
         }
+        if filters:
+            payload["filters"] = filters
+        
+        response = self.session.post(
+            self._url("/query", collection),
+            json=payload
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def query_batch(self, queries: List[str], top_k: int = 5, collection: Optional[str] = None) -> Dict:
+        payload = {
+            "queries": queries,
+            "top_k": top_k
+        }
         
         response = self.session.post(
-            self._url("/query"),
+            self._url("/query/batch", collection),
             json=payload
         )
         response.raise_for_status()
         return response.json()
     
-    def get_stats(self) -> Dict:
-        response = self.session.get(self._url("/stats"))
+    def start_bulk_ingest(self, source: str, job_id: Optional[str] = None, resume: bool = True) -> Dict:
+        payload = {
+            "source": source,
+            "job_id": job_id,
+            "resume": resume
+        }
+        
+        response = self.session.post(self._url("/ingest/bulk"), json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    def get_bulk_ingest(self, job_id: str) -> Dict:
+        response = self.session.get(self._url(f"/ingest/bulk/{job_id}"))
+        response.raise_for_status()
+        return response.json()
+    
+    def cancel_bulk_ingest(self, job_id: str) -> Dict:
+        response = self.session.delete(self._url(f"/ingest/bulk/{job_id}"))
+        response.raise_for_status()
+        return response.json()
+    
+    def get_stats(self, collection: Optional[str] = None) -> Dict:
+        response = self.session.get(self._url("/stats", collection))
         response.raise_for_status()
         return response.json()
     
-    def clear_documents(self) -> Dict:
-        response = self.session.delete(self._url("/documents"))
+    def clear_documents(self, collection: Optional[str] = None) -> Dict:
+        response = self.session.delete(self._url("/documents", collection))
+        response.raise_for_status()
+        return response.json()
+    
+    def list_collections(self) -> List[Dict]:
+        response = self.session.get(self._url("/collections"))
+        response.raise_for_status()
+        return response.json()
+    
+    def create_collection(self, name: str, index_type: Optional[str] = None, metric: Optional[str] = None) -> Dict:
+        payload = {
+            "name": name,
+            "index_type": index_type,
+            "metric": metric
+        }
+        
+        response = self.session.post(self._url("/collections"), json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    def drop_collection(self, name: str) -> Dict:
+        response = self.session.delete(self._url(f"/collections/{name}"))
         response.raise_for_status()
         return response.json()
     
@@ -108,4 +207,10 @@ if __name__ == "__main__":
     
     print("\nQuerying...")
     result = client.query("Who created Python?")
-    client.pretty_print_query_result(result)
\ No newline at end of file
+    client.pretty_print_query_result(result)
+    
+    print("\nStreaming...")
+    for event in client.query_stream("Who created Python?"):
+        if event["event"] == "token":
+            print(event["data"]["text"], end="", flush=True)
+    print()
\ No newline at end of file
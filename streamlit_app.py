@@ -2,16 +2,34 @@ import streamlit as st
 import requests
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
+# read-only use of the metrics database: MetricsDB starts its writer thread only
+# when something is logged, and the dashboard never logs
 from app.monitoring.metrics import metrics_db
-from app.orchestrator.chains import orchestrator
-from app.core.vector_store import vector_store
+from app.monitoring.drift_monitor import drift_monitor
 import yaml
 
 st.set_page_config(page_title="AI Orchestrator Dashboard", layout="wide", page_icon="🤖")
 
 API_URL = "http://localhost:8000/api/v1"
+# seconds; model commands (generation, summarization) get longer than plain reads
+API_TIMEOUT = 30
+MODEL_TIMEOUT = 300
+
+# the index and models belong to the API process; the dashboard only talks to it over HTTP
+def api_get(path: str):
+    try:
+        response = requests.get(f"{API_URL}{path}", timeout=API_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return None
+
+def mcp_execute(command: str, args: dict) -> dict:
+    response = requests.post(f"{API_URL}/mcp/execute", json={"command": command, "args": args}, timeout=MODEL_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["result"]
 
 st.title(" AI Orchestrator & Monitoring Platform")
 st.markdown("---")
@@ -24,11 +42,11 @@ with tabs[0]:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Documents in DB", vector_store.get_stats()["total_vectors"])
+        health = api_get("/health")
+        st.metric("Documents in DB", health["documents_count"] if health else "API unavailable")
     
     with col2:
-        metrics = metrics_db.get_metrics(limit=1000)
-        st.metric("Total Queries", len(metrics))
+        st.metric("Total Queries", metrics_db.get_total_count())
     
     with col3:
         avg_latencies = metrics_db.get_avg_latency_by_tool()
@@ -49,119 +67,139 @@ with tabs[1]:
     
     if st.button(" Upload Document"):
         if doc_text:
-            response = requests.post(
-                f"{API_URL}/documents",
-                json={"content": doc_text, "metadata": {"topic": doc_topic}}
-            )
-            if response.status_code == 200:
-                st.success(f" Document uploaded! {response.json()['chunks_created']} chunks created")
-            else:
-                st.error(f" Error: {response.text}")
+            try:
+                response = requests.post(
+                    f"{API_URL}/documents",
+                    json={"content": doc_text, "metadata": {"topic": doc_topic}},
+                    timeout=MODEL_TIMEOUT
+                )
+                if response.status_code == 200:
+                    st.success(f" Document uploaded! {response.json()['chunks_created']} chunks created")
+                else:
+                    st.error(f" Error: {response.text}")
+            except requests.RequestException as e:
+                st.error(f" Error: {e}")
     
     st.markdown("---")
     st.subheader("Orchestrated Query")
     
     query = st.text_input("Enter your query")
     
-    col1, col2, col3,col4 = st.columns(4)
+    col1, col2, col3 = st.columns(3)
     use_rag = col1.checkbox(" RAG", value=True)
     use_summarize = col2.checkbox(" Summarize")
     use_translate = col3.checkbox(" Translate")
-    use_finetuned = col4.checkbox(" Fine-tuned")
-
     
     if st.button(" Execute Orchestration"):
         if query:
-            tools = []
-            if use_rag:
-                tools.append("rag")
-            if use_summarize:
-                tools.append("summarize")
-            if use_translate:
-                tools.append("translate")
-            if use_finetuned:
-                tools.append("finetuned")
-
-            
+            # summarize and translate work on the RAG answer, as in the orchestrator
             with st.spinner("Processing..."):
-                results = orchestrator.orchestrate(query, tools)
+                try:
+                    results = {}
+                    if use_rag:
+                        results["rag"] = mcp_execute("query-docs", {"query": query})
+                        answer = results["rag"]["answer"]
+                        if use_summarize:
+                            results["summarize"] = mcp_execute("summarize", {"text": answer})
+                        if use_translate:
+                            results["translate"] = mcp_execute("translate", {"text": answer})
+                except requests.RequestException as e:
+                    st.error(f" Error: {e}")
+                    results = {}
                 
+                # the API logs each command to the metrics database
                 for tool, result in results.items():
                     st.markdown(f"### {tool.upper()} Result")
                     if tool == "rag":
                         st.write(f"**Answer:** {result['answer']}")
                         st.write(f"**Confidence:** {result['confidence']:.2%}")
                         st.write(f"**Latency:** {result['latency']:.2f}s")
-                        
-                        metrics_db.log_metric(
-                            tool="rag",
-                            latency=result['latency'],
-                            query=query,
-                            result=result['answer'],
-                            confidence=result['confidence']
-                        )
                     
                     elif tool == "summarize":
                         st.write(f"**Summary:** {result['summary']}")
                         st.write(f"**Latency:** {result['latency']:.2f}s")
-                        
-                        metrics_db.log_metric(
-                            tool="summarizer",
-                            latency=result['latency'],
-                            query=query,
-                            result=result['summary']
-                        )
                     
                     elif tool == "translate":
                         st.write(f"**Translation:** {result['translation']}")
                         st.write(f"**Latency:** {result['latency']:.2f}s")
-                        
-                        metrics_db.log_metric(
-                            tool="translator",
-                            latency=result['latency'],
-                            query=query,
-                            result=result['translation']
-                        )
                     
                     st.markdown("---")
 
 with tabs[2]:
     st.header(" Monitoring Dashboard")
     
-    metrics = metrics_db.get_metrics(limit=100)
+    # every chart reads pre-aggregated rollups, so page loads do not grow with history
+    totals = metrics_db.get_rollups("all")
     
-    if metrics:
-        df = pd.DataFrame([
-            {
-                "timestamp": m.timestamp,
-                "tool": m.tool,
-                "latency": m.latency,
-                "confidence": m.confidence
-            }
-            for m in metrics
-        ])
+    if totals:
+        totals_df = pd.DataFrame(totals)
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Latency by Tool")
-            fig = px.box(df, x="tool", y="latency", color="tool")
+            latency_df = totals_df.melt(id_vars="tool", value_vars=["p50_latency", "p95_latency", "p99_latency"],
+                                        var_name="percentile", value_name="latency")
+            fig = px.bar(latency_df, x="tool", y="latency", color="percentile", barmode="group")
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             st.subheader("Query Distribution")
-            tool_counts = df['tool'].value_counts()
-            fig = px.pie(values=tool_counts.values, names=tool_counts.index)
+            fig = px.pie(totals_df, values="count", names="tool")
             st.plotly_chart(fig, use_container_width=True)
         
-        st.subheader("Latency Over Time")
-        fig = px.line(df, x="timestamp", y="latency", color="tool")
-        st.plotly_chart(fig, use_container_width=True)
+        window = st.selectbox("Window", ["Last hour", "Last 24 hours", "Last 30 days"])
+        bucket, span = {
+            "Last hour": ("minute", timedelta(hours=1)),
+            "Last 24 hours": ("minute", timedelta(days=1)),
+            "Last 30 days": ("hour", timedelta(days=30))
+        }[window]
+        rollups = metrics_db.get_rollups(bucket, since=datetime.utcnow() - span)
+        if rollups:
+            df = pd.DataFrame(rollups)
+            
+            st.subheader("Latency Over Time (p95)")
+            fig = px.line(df, x="bucket_start", y="p95_latency", color="tool")
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader("Queries Over Time")
+            fig = px.bar(df, x="bucket_start", y="count", color="tool")
+            st.plotly_chart(fig, use_container_width=True)
         
         st.subheader("Recent Metrics")
-        st.dataframe(df.head(20), use_container_width=True)
+        st.dataframe(pd.DataFrame([
+            {
+                "timestamp": m.timestamp,
+                "tool": m.tool,
+                "latency": m.latency,
+                "confidence": m.confidence
+            }
+            for m in metrics_db.get_metrics(limit=20)
+        ]), use_container_width=True)
     else:
         st.info("No metrics available yet. Run some queries to see monitoring data!")
+    
+    st.subheader("Stage Latency (last 24 hours)")
+    # from request traces, stored apart from the per-tool metrics above
+    stages = metrics_db.get_stage_latencies(since=datetime.utcnow() - timedelta(days=1))
+    if stages:
+        fig = px.bar(pd.DataFrame(stages), x="stage", y=["avg_latency", "max_latency"], barmode="group")
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No traced requests yet.")
+    
+    st.subheader("Drift")
+    # written by the API's scheduled drift check; the dashboard only reads stored reports
+    latest = drift_monitor.get_latest()
+    if latest:
+        st.dataframe(pd.DataFrame(latest)[[
+            "feature", "psi", "ks", "drifted", "mean", "reference_mean", "p50", "p90", "p99", "window_count"
+        ]], use_container_width=True)
+        reports = drift_monitor.get_reports(since=datetime.utcnow() - timedelta(days=7))
+        fig = px.line(pd.DataFrame(reports), x="timestamp", y="psi", color="feature")
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No drift checks yet; they start once enough queries have been answered.")
 
 with tabs[3]:
     st.header(" MCP Server")
@@ -191,16 +229,20 @@ with tabs[3]:
     
     if st.button("Execute MCP Command"):
         if arg_value:
-            response = requests.post(
-                f"{API_URL}/mcp/execute",
-                json={"command": command, "args": args}
-            )
-            if response.status_code == 200:
-                result = response.json()
-                st.success(" Command executed successfully!")
-                st.json(result)
-            else:
-                st.error(f" Error: {response.text}")
+            try:
+                response = requests.post(
+                    f"{API_URL}/mcp/execute",
+                    json={"command": command, "args": args},
+                    timeout=MODEL_TIMEOUT
+                )
+                if response.status_code == 200:
+                    result = response.json()
+                    st.success(" Command executed successfully!")
+                    st.json(result)
+                else:
+                    st.error(f" Error: {response.text}")
+            except requests.RequestException as e:
+                st.error(f" Error: {e}")
 
 with tabs[4]:
     st.header(" Prompt Registry")
@@ -222,16 +264,24 @@ with tabs[5]:
     st.subheader("System Configuration")
     
     st.write("**Vector Database Stats:**")
-    stats = vector_store.get_stats()
-    st.json(stats)
+    stats = api_get("/stats")
+    if stats is not None:
+        st.json(stats)
+    else:
+        st.warning(f"API not reachable at {API_URL}")
     
     st.markdown("---")
     
     if st.button(" Clear All Documents"):
-        vector_store.clear_index()
-        st.success("All documents cleared!")
+        try:
+            response = requests.delete(f"{API_URL}/documents", timeout=API_TIMEOUT)
+            if response.status_code == 200:
+                st.success("All documents cleared!")
+            else:
+                st.error(f" Error: {response.text}")
+        except requests.RequestException as e:
+            st.error(f" Error: {e}")
     
     if st.button(" Clear Metrics"):
-        metrics_db.session.query(metrics_db.session.query(metrics_db.Metric).delete())
-        metrics_db.session.commit()
+        metrics_db.clear()
         st.success("All metrics cleared!")
\ No newline at end of file
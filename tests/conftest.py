@@ -0,0 +1,101 @@
+import hashlib
+import os
+import sys
+import tempfile
+import numpy as np
+import pytest
+
+# settings are read when app.config is first imported, and several modules open
+# their stores at import time, so point everything at a scratch directory first
+_ROOT = tempfile.mkdtemp(prefix="rag-tests-")
+os.environ.setdefault("VECTOR_DB_PATH", os.path.join(_ROOT, "vector_db"))
+os.environ.setdefault("DOCUMENTS_PATH", os.path.join(_ROOT, "documents"))
+os.environ.setdefault("EMBEDDING_DIMENSION", "16")
+os.environ.setdefault("WAL_FSYNC", "false")
+os.environ.setdefault("QUERY_BATCHING", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# MetricsDB's default database is relative to the working directory
+os.chdir(_ROOT)
+
+from app.config import settings
+from app.core.model_registry import model_registry
+
+class FakeEncoder:
+    """Deterministic stand-in for the sentence-transformers model: one random vector per text."""
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(settings.EMBEDDING_DIMENSION).astype("float32")
+
+    def encode(self, texts, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.array([self._vector(text) for text in texts], dtype="float32").reshape(
+            len(texts), settings.EMBEDDING_DIMENSION
+        )
+
+class FakeTokenizer:
+    """Whitespace stand-in for the generator's tokenizer: one token per word."""
+
+    def __call__(self, text: str, add_special_tokens: bool = True, **kwargs):
+        return {"input_ids": text.split() + (["</s>"] if add_special_tokens else [])}
+
+    def decode(self, input_ids, skip_special_tokens: bool = False) -> str:
+        return " ".join(token for token in input_ids if not (skip_special_tokens and token == "</s>"))
+
+import app.core.embeddings  # registers the real loader, which the fake replaces
+import app.core.context_builder
+model_registry.register("embedding", FakeEncoder)
+model_registry.register("generator_tokenizer", FakeTokenizer)
+
+@pytest.fixture
+def store(tmp_path):
+    from app.core.vector_store import VectorStore
+    opened = VectorStore(index_path=str(tmp_path / "index"))
+    yield opened
+    opened.close()
+
+@pytest.fixture
+def reopen(tmp_path):
+    """Open (another) store on the ``store`` fixture's directory; closed at teardown."""
+    from app.core.vector_store import VectorStore
+    opened = []
+
+    def open_store():
+        opened.append(VectorStore(index_path=str(tmp_path / "index")))
+        return opened[-1]
+
+    yield open_store
+    for store in opened:
+        store.close()
+
+@pytest.fixture
+def metrics_db(tmp_path):
+    from app.monitoring.metrics import MetricsDB
+    opened = MetricsDB(db_path=str(tmp_path / "metrics.db"))
+    yield opened
+    opened.close()
+
+@pytest.fixture
+def insert_raw_metrics(metrics_db):
+    """Write ``(timestamp, tool, latency)`` rows as an older version would have: raw table only, no rollups."""
+    from app.monitoring.metrics import Metric
+
+    def insert(rows):
+        with metrics_db.engine.begin() as connection:
+            connection.execute(Metric.__table__.insert(), [
+                {"timestamp": timestamp, "tool": tool, "latency": latency, "query": "q", "result": "r", "tokens_used": 0}
+                for timestamp, tool, latency in rows
+            ])
+
+    return insert
+
+@pytest.fixture
+def exporter(monkeypatch):
+    """Enable tracing with a private exporter that tests flush themselves instead of a background thread."""
+    from app.core import tracing
+    private = tracing.TraceExporter()
+    monkeypatch.setattr(private, "_ensure_worker", lambda: None)
+    monkeypatch.setattr(tracing, "trace_exporter", private)
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    return private
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from app.config import settings
+from app.core.answer_cache import AnswerCache, normalize_query
+from app.core.collection_registry import Collection
+from app.core.rag_pipeline import GENERATION_ERROR_PREFIX, rag_pipeline
+
+@pytest.fixture
+def cache():
+    return AnswerCache(max_entries=2, semantic_entries=2, ttl=60, similarity=0.95)
+
+def vector(*values):
+    return np.array(values, dtype="float32")
+
+def remember(cache, query, embedding, value, version=1, top_k=5):
+    """Look up then store, as the pipeline does; a put only counts for the version looked up."""
+    assert cache.get_exact(query, top_k, version) is None
+    cache.put(query, embedding, top_k, value, version)
+
+def test_normalize_query():
+    assert normalize_query("  What IS   faiss?? ") == "what is faiss"
+
+def test_exact_hits_are_scoped_by_top_k_and_filter(cache):
+    remember(cache, "What is FAISS?", vector(1, 0), "answer")
+    assert cache.get_exact("what is faiss", 5, 1) == "answer"
+    assert cache.get_exact("what is faiss", 3, 1) is None
+    assert cache.get_exact("what is faiss", 5, 1, filter_key="topic=a") is None
+
+def test_semantic_hits_need_similar_embeddings(cache):
+    remember(cache, "what is faiss", vector(1, 0), "answer")
+    assert cache.get_similar(vector(10, 0.5), 5, 1) == "answer"
+    assert cache.get_similar(vector(1, 1), 5, 1) is None
+    assert cache.get_similar(vector(1, 0), 5, 1, filter_key="topic=a") is None
+    stats = cache.get_stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 2)
+
+def test_new_corpus_version_drops_entries(cache):
+    remember(cache, "q", vector(1, 0), "old")
+    assert cache.get_exact("q", 5, 2) is None
+    assert cache.get_stats()["invalidations"] == 1
+    # an answer computed before the corpus changed is not stored, and old versions are not served
+    cache.put("q", vector(1, 0), 5, "stale", version=1)
+    assert cache.get_exact("q", 5, 2) is None
+    assert cache.get_exact("q", 5, 1) is None
+
+def test_entries_expire(cache, monkeypatch):
+    import time
+    remember(cache, "q", vector(1, 0), "answer")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get_exact("q", 5, 1) is None
+    assert cache.get_similar(vector(1, 0), 5, 1) is None
+    assert cache.get_stats()["expirations"] == 2
+
+def test_least_recently_used_entries_are_evicted(cache):
+    remember(cache, "a", vector(1, 0), "A")
+    remember(cache, "b", vector(0, 1), "B")
+    assert cache.get_exact("a", 5, 1) == "A"
+    remember(cache, "c", vector(1, 1), "C")
+    assert cache.get_exact("b", 5, 1) is None
+    assert cache.get_exact("a", 5, 1) == "A"
+    assert cache.get_stats()["exact_entries"] == 2
+    assert cache.get_stats()["semantic_entries"] == 2
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Queries the pipeline generated answers for; the generator itself is replaced."""
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RERANK_ENABLED", False)
+    queries = []
+
+    def generate(query, context_docs):
+        queries.append(query)
+        return f"answer {len(queries)}"
+
+    monkeypatch.setattr(rag_pipeline, "generate_answer", generate)
+    return queries
+
+def test_pipeline_reuses_answers_until_the_corpus_changes(generated, store):
+    store.add_documents(["faiss is a vector search library"], [{"document_id": "a"}])
+    collection = Collection("cached", store, AnswerCache())
+
+    first = rag_pipeline.query("What is faiss?", 3, collection=collection)
+    assert rag_pipeline.query("what is FAISS", 3, collection=collection) == first
+    assert generated == ["What is faiss?"]
+    assert rag_pipeline.query("What is faiss?", 3, {"document_id": "b"}, collection=collection)[0] == "answer 2"
+
+    store.add_documents(["faiss was written at meta"], [{"document_id": "b"}])
+    assert rag_pipeline.query("What is faiss?", 3, collection=collection)[0] == "answer 3"
+    assert collection.answer_cache.get_stats()["exact_hits"] == 1
+
+def test_generation_errors_are_not_cached(generated, store, monkeypatch):
+    store.add_documents(["faiss is a vector search library"], [{"document_id": "a"}])
+    collection = Collection("cached", store, AnswerCache())
+    monkeypatch.setattr(rag_pipeline, "generate_answer", lambda query, docs: f"{GENERATION_ERROR_PREFIX}: out of memory")
+    rag_pipeline.query("What is faiss?", 3, collection=collection)
+    assert collection.answer_cache.get_stats()["exact_entries"] == 0
@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.core.batching import MicroBatcher
+
+@pytest.fixture
+def batches():
+    return []
+
+@pytest.fixture
+def batcher(batches):
+    gate = threading.Event()
+
+    def double(items):
+        gate.wait(5)
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    opened = MicroBatcher(double, max_batch_size=4, max_wait_ms=200)
+    opened.gate = gate
+    yield opened
+    gate.set()
+    opened.close()
+
+def test_concurrent_calls_are_coalesced(batcher, batches):
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(batcher.submit, i) for i in range(8)]
+        batcher.gate.set()
+        results = [future.result() for future in futures]
+    assert results == [i * 2 for i in range(8)]
+    assert sorted(item for batch in batches for item in batch) == list(range(8))
+    assert len(batches) < 8
+    assert max(len(batch) for batch in batches) <= 4
+    assert batcher.get_stats()["items"] == 8
+
+def test_errors_reach_every_caller_of_the_batch():
+    def fail(items):
+        raise RuntimeError("model crashed")
+
+    failing = MicroBatcher(fail, max_wait_ms=50)
+    try:
+        with ThreadPoolExecutor(3) as pool:
+            futures = [pool.submit(failing.submit, i) for i in range(3)]
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result()
+    finally:
+        failing.close()
+
+def test_close_stops_the_worker(batcher):
+    batcher.gate.set()
+    assert batcher.submit(1) == 2
+    worker = batcher._worker
+    batcher.close()
+    worker.join(5)
+    assert not worker.is_alive()
+
+def test_search_batch_matches_single_searches(store):
+    texts = [f"chunk about topic {i}" for i in range(10)]
+    store.add_documents(texts, [{"document_id": str(i % 3)} for i in range(10)])
+    queries = ["topic 1", "topic 7", "unrelated"]
+    for (rows, scores), query in zip(store.search_batch(queries, 3), queries):
+        single_rows, single_scores = store.search(query, 3)
+        assert [row["id"] for row in rows] == [row["id"] for row in single_rows]
+        assert scores == pytest.approx(single_scores)
+
+    filtered = store.search_batch(queries, 5, {"document_id": "1"})
+    assert all(row["metadata"]["document_id"] == "1" for rows, _ in filtered for row in rows)
+    assert store.search_batch([], 3) == []
+
+def test_query_embeddings_are_batched(monkeypatch):
+    from app.config import settings
+    from app.core.embeddings import EmbeddingManager
+    from app.core.model_registry import model_registry
+    # a new manager registers the real loader; put the test encoder's back afterwards
+    monkeypatch.setitem(model_registry._loaders, "embedding", model_registry._loaders["embedding"])
+    monkeypatch.setattr(settings, "QUERY_BATCHING", True)
+    monkeypatch.setattr(settings, "QUERY_BATCH_WAIT_MS", 200)
+    manager = EmbeddingManager()
+    calls = []
+    original = manager.embed_texts
+    monkeypatch.setattr(manager, "embed_texts", lambda texts, **kwargs: calls.append(len(texts)) or original(texts))
+    try:
+        with ThreadPoolExecutor(6) as pool:
+            vectors = list(pool.map(manager.embed_query, [f"query {i}" for i in range(6)]))
+    finally:
+        manager._query_batcher.close()
+    assert sum(calls) == 6 and len(calls) < 6
+    assert all((vector == manager.embed_text(f"query {i}")).all() for i, vector in enumerate(vectors))
@@ -0,0 +1,62 @@
+import json
+import pytest
+
+pytest.importorskip("langchain")
+from app.core.bulk_ingest import BulkIngestJob, default_job_id, iter_documents
+from app.core.collection_registry import DEFAULT_COLLECTION, UnknownCollection, collection_registry
+from app.utils.text_processing import chunk_documents
+
+def write_jsonl(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def test_lines_that_are_not_objects_count_as_bad(tmp_path):
+    source = write_jsonl(tmp_path / "corpus.jsonl", [
+        json.dumps({"content": "first", "metadata": {"year": 2021, "draft": None}}),
+        "[1, 2]",
+        '"just a string"',
+        "{not json",
+        json.dumps({"content": "bad metadata", "metadata": ["a"]}),
+        json.dumps({"text": "second"}),
+    ])
+    documents = list(iter_documents(source))
+    assert documents[1:5] == [None] * 4
+    assert documents[0] == {"content": "first", "metadata": {"year": 2021, "source": "corpus.jsonl:1"}}
+    assert documents[5]["content"] == "second"
+    assert [chunks is None for chunks in chunk_documents(documents)] == [False, True, True, True, True, False]
+
+def test_job_ids_differ_per_collection(tmp_path):
+    source = str(tmp_path / "corpus.jsonl")
+    assert default_job_id(source) == default_job_id(source, DEFAULT_COLLECTION)
+    assert default_job_id(source, "other") != default_job_id(source)
+
+def test_unknown_collection_is_rejected(tmp_path):
+    with pytest.raises(UnknownCollection):
+        BulkIngestJob(str(tmp_path / "corpus.jsonl"), collection="missing")
+
+@pytest.fixture
+def collection():
+    collection_registry.create("bulk_target")
+    yield "bulk_target"
+    collection_registry.drop("bulk_target")
+
+def test_job_writes_to_its_collection(tmp_path, collection):
+    source = write_jsonl(tmp_path / "corpus.jsonl", [
+        json.dumps({"content": f"document number {i} about bulk ingestion"}) for i in range(5)
+    ] + ["[]"])
+    default_before = collection_registry.default.store.get_stats()["total_vectors"]
+
+    job = BulkIngestJob(source, resume=False, processes=1, collection=collection)
+    status = job.run()
+
+    assert status["status"] == "completed"
+    assert status["collection"] == collection
+    assert status["documents"] == 6
+    assert status["failed_documents"] == 1
+    with collection_registry.use(collection) as target:
+        assert target.store.get_stats()["total_vectors"] == status["chunks_added"] == 5
+    assert collection_registry.default.store.get_stats()["total_vectors"] == default_before
+
+    resumed = BulkIngestJob(source, processes=1, collection=collection)
+    assert resumed.state["position"] == 6
+    assert BulkIngestJob(source, job_id=job.job_id, processes=1).state["position"] == 0
@@ -0,0 +1,85 @@
+import json
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.config import settings
+from app.core.calibration import ConfidenceCalibrator, retrieval_mode
+from app.core.vector_store import VectorStore
+
+@pytest.fixture
+def cosine_store(tmp_path):
+    opened = VectorStore(index_path=str(tmp_path / "cosine"), metric="cosine")
+    yield opened
+    opened.close()
+
+def test_cosine_scores_are_similarities(cosine_store):
+    texts = ["alpha", "beta", "gamma"]
+    cosine_store.add_documents(texts, [{"document_id": text} for text in texts])
+    rows, scores = cosine_store.search("beta", 3)
+    assert rows[0]["text"] == "beta"
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+    assert all(-1.0 - 1e-5 <= score <= 1.0 + 1e-5 for score in scores)
+    assert scores == sorted(scores, reverse=True)
+
+    from app.core.embeddings import embedding_manager
+    similarities = cosine_store.similarities(embedding_manager.embed_query("beta"), [row["id"] for row in rows])
+    assert [similarities[row["id"]] for row in rows] == pytest.approx(scores, abs=1e-5)
+
+def test_l2_scores_are_bounded_similarities(store):
+    store.add_documents(["alpha", "beta"], [{"document_id": "a"}, {"document_id": "b"}])
+    rows, scores = store.search("alpha", 2)
+    assert scores[0] == pytest.approx(1.0)
+    assert 0.0 < scores[1] < 1.0
+
+def fake_store(tmp_path, metric="cosine"):
+    return SimpleNamespace(index_path=str(tmp_path), metric=metric)
+
+def labelled_retrieve(query, top_k):
+    score = 0.9 if query.startswith("known") else 0.2
+    return [{"metadata": {"document_id": "doc"}}], [score + np.random.default_rng(len(query)).uniform(-0.05, 0.05)]
+
+EXAMPLES = [{"query": f"known {i}", "answerable": True} for i in range(10)] + \
+           [{"query": f"unknown {i}", "answerable": False} for i in range(10)]
+
+def test_uncalibrated_scores_pass_through(tmp_path):
+    calibrator = ConfidenceCalibrator()
+    target = fake_store(tmp_path)
+    assert calibrator.calibrate(0.42, target) == 0.42
+    assert calibrator.threshold(target) == settings.CONFIDENCE_THRESHOLD
+
+def test_fit_separates_answerable_queries(tmp_path):
+    calibrator = ConfidenceCalibrator()
+    target = fake_store(tmp_path)
+    params = calibrator.fit(EXAMPLES, target, labelled_retrieve)
+    assert params["mode"] == retrieval_mode()
+    assert params["f1"] == 1.0
+    assert calibrator.calibrate(0.95, target) >= calibrator.threshold(target) > calibrator.calibrate(0.15, target)
+
+    # a fresh calibrator reads the saved fit
+    assert ConfidenceCalibrator().params(target)["a"] == pytest.approx(params["a"])
+
+def test_fit_is_only_used_for_its_metric_and_mode(tmp_path, monkeypatch):
+    calibrator = ConfidenceCalibrator()
+    calibrator.fit(EXAMPLES, fake_store(tmp_path), labelled_retrieve)
+    assert not calibrator.is_active(fake_store(tmp_path, metric="l2"))
+    monkeypatch.setattr(settings, "RERANK_ENABLED", not settings.RERANK_ENABLED)
+    assert not calibrator.is_active(fake_store(tmp_path))
+
+def test_fit_needs_both_labels(tmp_path):
+    with pytest.raises(ValueError):
+        ConfidenceCalibrator().fit(EXAMPLES[:10], fake_store(tmp_path), labelled_retrieve)
+
+def test_relevant_documents_label_examples(tmp_path):
+    examples = [{"query": f"known {i}", "relevant_document_ids": ["doc"]} for i in range(5)] + \
+               [{"query": f"unknown {i}", "relevant_document_ids": ["other"]} for i in range(5)]
+    assert ConfidenceCalibrator().fit(examples, fake_store(tmp_path), labelled_retrieve)["examples"] == 10
+
+def test_files_without_modes_are_dense_fits(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "HYBRID_SEARCH", False)
+    monkeypatch.setattr(settings, "RERANK_ENABLED", False)
+    (tmp_path / ConfidenceCalibrator.FILENAME).write_text(json.dumps(
+        {"a": 10.0, "b": -5.0, "threshold": 0.5, "metric": "cosine"}
+    ))
+    calibrator = ConfidenceCalibrator()
+    assert calibrator.calibrate(0.5, fake_store(tmp_path)) == pytest.approx(0.5)
+    assert calibrator.calibrate(0.9, fake_store(tmp_path)) > 0.95
@@ -0,0 +1,80 @@
+import pytest
+from app.config import settings
+from app.core.collection_registry import (
+    DEFAULT_COLLECTION, CollectionExists, CollectionInUse, CollectionRegistry, UnknownCollection
+)
+from app.monitoring.prometheus import metrics_registry
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    # drop the new instance's metrics collector again at teardown
+    monkeypatch.setattr(metrics_registry, "_collectors", list(metrics_registry._collectors))
+    opened = CollectionRegistry(root=str(tmp_path / "collections"))
+    yield opened
+    for name in list(opened._loaded):
+        opened._loaded.pop(name).store.close()
+
+def test_create_validates_names_and_index_types(registry):
+    config = registry.create("docs-v2", index_type="flat", metric="l2")
+    assert (config["name"], config["index_type"], config["metric"]) == ("docs-v2", "flat", "l2")
+    with pytest.raises(CollectionExists):
+        registry.create("docs-v2")
+    with pytest.raises(CollectionExists):
+        registry.create(DEFAULT_COLLECTION)
+    with pytest.raises(ValueError):
+        registry.create("../escape")
+    with pytest.raises(ValueError):
+        registry.create("other", index_type="annoy")
+    assert [c["name"] for c in registry.list_collections()] == [DEFAULT_COLLECTION, "docs-v2"]
+
+def test_manifest_survives_a_restart(registry):
+    registry.create("docs", metric="l2")
+    reopened = CollectionRegistry(root=registry.root)
+    assert reopened.exists("docs") and not reopened.is_loaded("docs")
+    assert reopened.list_collections()[1]["metric"] == "l2"
+
+def test_unknown_collection(registry):
+    with pytest.raises(UnknownCollection):
+        registry.acquire("missing")
+    with pytest.raises(UnknownCollection):
+        registry.drop("missing")
+
+def test_collections_are_isolated(registry):
+    registry.create("a")
+    registry.create("b")
+    with registry.use("a") as a:
+        a.store.add_documents(["only in a"], [{"document_id": "x"}])
+    with registry.use("b") as b:
+        assert b.store.total_vectors == 0
+        assert b.answer_cache is not a.answer_cache
+    with registry.use("a") as again:
+        assert again is a
+        assert again.store.total_vectors == 1
+
+def test_drop_refuses_collections_in_use(registry, tmp_path):
+    registry.create("busy")
+    collection = registry.acquire("busy")
+    with pytest.raises(CollectionInUse):
+        registry.drop("busy")
+    registry.release(collection)
+    registry.drop("busy")
+    assert not registry.exists("busy")
+    assert not (tmp_path / "collections" / "busy").exists()
+
+def test_least_recently_used_idle_collections_are_unloaded(registry, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_LOADED_COLLECTIONS", 2)
+    for name in ("a", "b", "c"):
+        registry.create(name)
+    held = registry.acquire("a")
+    with registry.use("b"):
+        pass
+    with registry.use("c"):
+        pass
+    # "a" is older but leased, so the idle "b" goes instead
+    assert registry.is_loaded("a") and not registry.is_loaded("b") and registry.is_loaded("c")
+    registry.release(held)
+    with registry.use("b"):
+        pass
+    assert not registry.is_loaded("a")
+    assert registry.get_stats()["unloads"] == 2
+    assert registry.is_loaded(DEFAULT_COLLECTION)
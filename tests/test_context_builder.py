@@ -0,0 +1,70 @@
+import pytest
+from app.config import settings
+from app.core.context_builder import PROMPT_TEMPLATE, context_builder, strip_overlap
+from app.models import RetrievalResult
+
+QUERY = "question"
+
+@pytest.fixture
+def budget(monkeypatch):
+    """Set how many context tokens fit beside the template and QUERY (one token per word)."""
+    template_tokens = len(PROMPT_TEMPLATE.format(context="", query="").split()) + 1
+
+    def set_budget(tokens: int):
+        monkeypatch.setattr(settings, "GENERATOR_MAX_INPUT_TOKENS", tokens + template_tokens + 1)
+
+    return set_budget
+
+def doc(text, document_id=None, chunk_index=None, score=1.0):
+    metadata = {}
+    if document_id is not None:
+        metadata["document_id"] = document_id
+    if chunk_index is not None:
+        metadata["chunk_index"] = chunk_index
+    return RetrievalResult(text=text, score=score, metadata=metadata)
+
+def test_strip_overlap():
+    assert strip_overlap("first part shared tail", "shared tail and more", 20) == (" and more", True)
+    assert strip_overlap("ends with abc", "abc starts", 20) == ("abc starts", False)
+
+def test_chunks_that_do_not_fit_are_skipped_not_truncated(budget):
+    budget(6)
+    docs = [doc("one two three"), doc("a b c d e f g h"), doc("four five six")]
+    assert context_builder.build_context(QUERY, docs) == "one two three\n\nfour five six"
+
+def test_duplicate_chunks_are_packed_once(budget):
+    budget(20)
+    docs = [doc("same words"), doc("same words"), doc("other words")]
+    assert context_builder.build_context(QUERY, docs) == "same words\n\nother words"
+
+def test_consecutive_chunks_of_a_document_are_merged(budget):
+    budget(50)
+    docs = [
+        doc("unrelated passage", "b", 0),
+        doc("the overlap region then the ending", "a", 1),
+        doc("beginning of it and the overlap region", "a", 0),
+        doc("a separate chunk", "a", 5),
+    ]
+    context = context_builder.build_context(QUERY, docs)
+    assert context.split("\n\n") == [
+        "unrelated passage",
+        "beginning of it and the overlap region then the ending",
+        "a separate chunk",
+    ]
+
+def test_oversized_first_chunk_is_truncated(budget):
+    budget(3)
+    truncated = context_builder.get_stats()["truncated"]
+    assert context_builder.build_context(QUERY, [doc("w1 w2 w3 w4 w5")]) == "w1 w2 w3"
+    assert context_builder.get_stats()["truncated"] == truncated + 1
+
+def test_token_counts_are_cached(budget):
+    hits = context_builder.get_stats()["token_cache_hits"]
+    assert context_builder.count_tokens("a text counted twice") == 4
+    assert context_builder.count_tokens("a text counted twice") == 4
+    assert context_builder.get_stats()["token_cache_hits"] == hits + 1
+
+def test_prompt_contains_question_and_context(budget):
+    budget(20)
+    prompt = context_builder.build_prompt(QUERY, [doc("faiss is a library")])
+    assert prompt == PROMPT_TEMPLATE.format(context="faiss is a library", query=QUERY)
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import pytest
+
+def texts_of(results):
+    return sorted(row["text"] for row in results[0])
+
+def test_exact_duplicate_is_not_added_twice(store):
+    assert store.add_documents(["same chunk"], [{"document_id": "a"}]) == 1
+    assert store.add_documents(["same chunk"], [{"document_id": "a"}]) == 0
+    assert store.total_vectors == 1
+
+def test_known_text_is_not_encoded_again(store, monkeypatch):
+    from app.core import vector_store
+    store.add_documents(["cached chunk"], [{"document_id": "a"}])
+    store.delete_document("a")
+    monkeypatch.setattr(vector_store.embedding_manager, "embed_texts",
+                        lambda texts, **kwargs: pytest.fail("re-encoded a cached chunk"))
+    assert store.add_documents(["cached chunk"], [{"document_id": "a"}]) == 1
+
+class TestCrossDocumentDuplicates:
+
+    def test_same_chunk_in_one_batch(self, store):
+        added = store.add_documents(["shared text", "shared text"], [{"document_id": "doc1"}, {"document_id": "doc2"}])
+        assert added == 2
+        assert texts_of(store.search("shared text", 5, {"document_id": "doc2"})) == ["shared text"]
+
+    def test_same_chunk_in_later_batch(self, store):
+        store.add_documents(["shared text"], [{"document_id": "doc1"}])
+        assert store.add_documents(["shared text"], [{"document_id": "doc2"}]) == 1
+        assert texts_of(store.search("shared text", 5, {"document_id": "doc2"})) == ["shared text"]
+
+    def test_readding_a_document_after_another_shares_its_chunk(self, store):
+        store.add_documents(["shared text", "only a"], [{"document_id": "doc1"}, {"document_id": "doc1"}])
+        store.add_documents(["shared text"], [{"document_id": "doc2"}])
+        assert store.add_documents(["shared text", "only a"], [{"document_id": "doc1"}, {"document_id": "doc1"}]) == 0
+        assert store.total_vectors == 3
+        assert texts_of(store.search("shared text", 5, {"document_id": "doc1"})) == ["only a", "shared text"]
+
+    def test_upsert_is_a_no_op_with_a_shared_chunk(self, store):
+        store.upsert_document("doc1", ["shared text", "only a"], [{}, {}])
+        store.upsert_document("doc2", ["shared text"], [{}])
+        assert store.upsert_document("doc1", ["shared text", "only a"], [{}, {}]) == (0, 0)
+        assert store.total_vectors == 3
+
+    def test_deleting_one_copy_keeps_the_other_deduplicated(self, store):
+        store.add_documents(["shared text", "shared text"], [{"document_id": "doc1"}, {"document_id": "doc2"}])
+        assert store.delete_document("doc2") == 1
+        assert texts_of(store.search("shared text", 5, {"document_id": "doc1"})) == ["shared text"]
+        assert store.search("shared text", 5, {"document_id": "doc2"}) == ([], [])
+        assert store.add_documents(["shared text"], [{"document_id": "doc1"}]) == 0
+
+    def test_dedup_survives_reopen_and_compaction(self, store, reopen):
+        store.add_documents(["shared text"], [{"document_id": "doc1"}])
+        store.add_documents(["shared text"], [{"document_id": "doc2"}])
+        store.compact()
+        store.close()
+        reopened = reopen()
+        assert reopened.add_documents(["shared text"], [{"document_id": "doc1"}]) == 0
+        assert reopened.add_documents(["shared text"], [{"document_id": "doc2"}]) == 0
+
+def test_rows_of_an_older_store_are_backfilled(store, reopen):
+    store.add_documents(["old chunk"], [{"document_id": "doc1"}])
+    store.compact()
+    store.close()
+    # a cache from before live rows were keyed by metadata has no chunk_rows yet
+    connection = sqlite3.connect(os.path.join(store.index_path, "embedding_cache.db"))
+    connection.execute("DELETE FROM chunk_rows")
+    connection.execute("DELETE FROM embedding_cache_meta")
+    connection.commit()
+    connection.close()
+    assert reopen().add_documents(["old chunk"], [{"document_id": "doc1"}]) == 0
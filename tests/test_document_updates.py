@@ -0,0 +1,47 @@
+def texts_of(results):
+    return sorted(row["text"] for row in results[0])
+
+def test_delete_document(store):
+    store.add_documents(["first", "second"], [{"document_id": "a"}, {"document_id": "b"}])
+    assert store.delete_document("a") == 1
+    assert store.delete_document("a") == 0
+    assert store.total_vectors == 1
+    assert store.search("first", 5, {"document_id": "a"}) == ([], [])
+
+def test_deletes_survive_compaction_and_reopen(store, reopen):
+    store.add_documents(["first", "second"], [{"document_id": "a"}, {"document_id": "b"}])
+    store.compact()
+    store.delete_document("a")
+    store.close()
+    reopened = reopen()
+    assert reopened.total_vectors == 1
+    assert [row["text"] for row in reopened.search("first", 5)[0]] == ["second"]
+
+class TestUpsert:
+
+    def test_unchanged_document_is_a_no_op(self, store):
+        texts = ["one fish", "two fish"]
+        assert store.upsert_document("doc1", texts, [{"topic": "a", "created_at": "t1"}] * 2) == (2, 0)
+        # created_at is set on every ingest and does not count as a change
+        assert store.upsert_document("doc1", texts, [{"topic": "a", "created_at": "t2"}] * 2) == (0, 0)
+        assert store.total_vectors == 2
+
+    def test_changed_metadata_rewrites_rows(self, store):
+        texts = ["one fish", "two fish"]
+        store.upsert_document("doc1", texts, [{"topic": "a"}, {"topic": "a"}])
+        assert store.upsert_document("doc1", texts, [{"topic": "b"}, {"topic": "b"}]) == (2, 2)
+        assert texts_of(store.search("one fish", 5, {"topic": "b"})) == texts
+        assert store.search("one fish", 5, {"topic": "a"}) == ([], [])
+
+    def test_changed_metadata_of_compacted_rows(self, store):
+        texts = ["one fish", "two fish"]
+        store.upsert_document("doc1", texts, [{"topic": "a"}, {"topic": "a"}])
+        store.compact()
+        assert store.upsert_document("doc1", texts, [{"topic": "a"}, {"topic": "a"}]) == (0, 0)
+        assert store.upsert_document("doc1", texts, [{"topic": "b"}, {"topic": "b"}]) == (2, 2)
+        assert texts_of(store.search("one fish", 5, {"topic": "b"})) == texts
+
+    def test_only_changed_chunks_are_replaced(self, store):
+        store.upsert_document("doc1", ["keep", "drop"], [{"chunk_index": 0}, {"chunk_index": 1}])
+        assert store.upsert_document("doc1", ["keep", "new"], [{"chunk_index": 0}, {"chunk_index": 1}]) == (1, 1)
+        assert texts_of(store.search("keep", 5, {"document_id": "doc1"})) == ["keep", "new"]
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+import pytest
+from app.config import settings
+from app.monitoring import drift_monitor as drift
+from app.monitoring.drift_monitor import (
+    DriftMonitor, DriftReport, FeatureSketch, ks_statistic, population_stability_index
+)
+
+SHORT = "short query here"
+LONG = " ".join(["word"] * 60)
+
+@pytest.fixture
+def monitor(metrics_db, monkeypatch):
+    monkeypatch.setattr(drift, "metrics_db", metrics_db)
+    # checks are run by hand so no monitor thread is left behind
+    monkeypatch.setattr(DriftMonitor, "_ensure_worker", lambda self: None)
+    monkeypatch.setattr(settings, "DRIFT_REFERENCE_SIZE", 20)
+    monkeypatch.setattr(settings, "DRIFT_WINDOW_SIZE", 10)
+    monkeypatch.setattr(settings, "DRIFT_MIN_WINDOW", 5)
+    return DriftMonitor()
+
+def log(monitor, query, times):
+    for _ in range(times):
+        monitor.log_prediction(query, "an answer", 0.8)
+
+def test_sketch_adds_and_removes_values():
+    sketch = FeatureSketch([1, 2, 4])
+    for value in (1, 2, 3, 10):
+        sketch.add(value)
+    assert sketch.counts == [1, 1, 1, 1]
+    assert sketch.mean() == 4.0
+    assert sketch.quantile(0.5) == 2
+    assert sketch.quantile(1.0) == 4
+    sketch.add(10, -1)
+    assert sketch.count == 3 and sketch.mean() == 2.0
+
+def test_psi_and_ks_grow_with_the_shift():
+    reference, same, shifted = (FeatureSketch([1, 2, 3]) for _ in range(3))
+    for value in (1, 2, 3, 4):
+        reference.add(value)
+        same.add(value)
+        shifted.add(4)
+    assert population_stability_index(reference, same) == 0.0
+    assert ks_statistic(reference, same) == 0.0
+    assert population_stability_index(reference, shifted) > settings.DRIFT_PSI_THRESHOLD
+    assert ks_statistic(reference, shifted) == 0.75
+
+def test_window_is_bounded(monitor):
+    log(monitor, SHORT, 35)
+    stats = monitor.get_stats()
+    assert stats["logged"] == 35 and stats["window"] == 10
+    assert monitor.get_summary()["query_length"]["count"] == 10
+    assert stats["reference_count"] == 20
+
+def test_no_reports_until_the_reference_is_full(monitor):
+    log(monitor, SHORT, 19)
+    assert monitor.check_drift() == []
+    assert not monitor.get_stats()["reference_frozen"]
+
+def test_shifted_window_is_reported_as_drift(monitor):
+    log(monitor, SHORT, 20)
+    reports = {report["feature"]: report for report in monitor.check_drift()}
+    assert monitor.get_stats()["reference_frozen"]
+    assert not any(report["drifted"] for report in reports.values())
+
+    log(monitor, LONG, 10)
+    reports = {report["feature"]: report for report in monitor.check_drift()}
+    assert reports["query_length"]["drifted"] == 1
+    assert reports["query_length"]["mean"] == 60 and reports["query_length"]["reference_mean"] == 3
+    assert not reports["confidence"]["drifted"]
+    assert {report["feature"] for report in monitor.get_latest()} == set(drift.FEATURES)
+    assert len(monitor.get_reports(feature="query_length")) == 2
+
+def test_frozen_reference_is_shared_across_restarts(monitor):
+    log(monitor, SHORT, 20)
+    monitor.check_drift()
+    restarted = DriftMonitor()
+    assert restarted.get_stats()["reference_frozen"]
+    log(restarted, LONG, 10)
+    assert {r["feature"]: r["drifted"] for r in restarted.check_drift()}["query_length"] == 1
+
+def test_reset_reference_rebuilds_from_new_predictions(monitor):
+    log(monitor, SHORT, 20)
+    monitor.check_drift()
+    monitor.reset_reference()
+    log(monitor, LONG, 20)
+    reports = {report["feature"]: report for report in monitor.check_drift()}
+    assert reports["query_length"]["reference_mean"] == 60
+    assert not reports["query_length"]["drifted"]
+
+def test_old_reports_are_deleted(monitor, metrics_db, monkeypatch):
+    monkeypatch.setattr(settings, "DRIFT_REPORT_RETENTION_DAYS", 7)
+    with metrics_db.Session() as session:
+        session.add(DriftReport(timestamp=datetime.utcnow() - timedelta(days=8), feature="confidence"))
+        session.commit()
+    log(monitor, SHORT, 20)
+    monitor.check_drift()
+    monitor.apply_retention()
+    assert len(monitor.get_reports()) == len(drift.FEATURES)
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import pytest
+from app.core import executor
+from app.core.executor import ExecutorSaturated, StageExecutor
+from app.core.tracing import span, start_trace
+
+@pytest.fixture
+def stage():
+    opened = StageExecutor("test", max_workers=1, max_queue=1)
+    yield opened
+    opened.pool.shutdown(wait=True)
+
+def test_calls_beyond_the_queue_are_rejected(stage):
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def scenario():
+        running = asyncio.ensure_future(stage.run(blocking))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        queued = asyncio.ensure_future(stage.run(lambda: "queued"))
+        await asyncio.sleep(0)
+        assert stage.get_stats()["running"] == 1
+        assert stage.queue_depth == 1
+        with pytest.raises(ExecutorSaturated):
+            await stage.run(lambda: "rejected")
+        release.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == ("done", "queued")
+    stats = stage.get_stats()
+    assert (stats["completed"], stats["rejected"], stats["running"], stats["queued"]) == (2, 1, 0, 0)
+
+def test_errors_release_the_slot(stage):
+    def fail():
+        raise ValueError("bad input")
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await stage.run(fail)
+        return await stage.run(lambda: "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+
+def test_calls_keep_the_callers_context(stage, exporter):
+
+    def traced_work():
+        with span("inside"):
+            return threading.current_thread().name
+
+    async def scenario():
+        with start_trace("query") as trace:
+            thread_name = await stage.run(traced_work)
+        return trace, thread_name
+
+    trace, thread_name = asyncio.run(scenario())
+    assert thread_name.startswith("test-stage")
+    assert [s.name for s in trace.spans] == ["inside"]
+
+def test_saturated_stage_answers_429(exporter, monkeypatch):
+    pytest.importorskip("langchain")
+    pytest.importorskip("multipart")
+    pytest.importorskip("requests")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    saturated = StageExecutor("query", max_workers=1, max_queue=0)
+    assert saturated._slots.acquire(blocking=False)
+    monkeypatch.setitem(executor.stage_executors, "query", saturated)
+    try:
+        response = TestClient(app).get("/api/v1/query", params={"q": "hello"})
+    finally:
+        saturated.pool.shutdown()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert saturated.get_stats()["rejected"] == 1
@@ -0,0 +1,38 @@
+import io
+import pytest
+from app.utils.file_extraction import FileTooLarge, UnsupportedFileType, file_hash, iter_pages
+from app.utils import file_extraction
+
+def test_file_hash_rewinds_and_enforces_the_limit():
+    stream = io.BytesIO(b"x" * 100)
+    digest, size = file_hash(stream)
+    assert size == 100 and len(digest) == 32
+    assert stream.tell() == 0
+    with pytest.raises(FileTooLarge):
+        file_hash(io.BytesIO(b"x" * 100), max_bytes=99)
+
+def test_text_is_read_in_line_aligned_blocks(monkeypatch):
+    monkeypatch.setattr(file_extraction, "TEXT_BLOCK_BYTES", 16)
+    text = "".join(f"line {i} é\n" for i in range(20))
+    blocks = list(iter_pages(io.BytesIO(text.encode("utf-8")), "notes.txt"))
+    assert len(blocks) > 1
+    assert all(page is None and block.endswith("\n") for page, block in blocks)
+    assert "".join(block for _, block in blocks) == text
+
+def test_unsupported_extension():
+    with pytest.raises(UnsupportedFileType):
+        iter_pages(io.BytesIO(b""), "image.png")
+
+def test_pages_of_a_file_share_one_document_without_a_page_total(store, monkeypatch):
+    pytest.importorskip("langchain")
+    pytest.importorskip("multipart")
+    from app.api import routes
+    pages = [(1, "first page text"), (2, "second page text"), (3, "third page text")]
+    monkeypatch.setattr(routes, "iter_pages", lambda stream, filename: iter(pages))
+    doc_id, added, duplicates, page_count = routes._ingest_file(store, io.BytesIO(b"%PDF"), "report.pdf")
+    assert (added, duplicates, page_count) == (3, 0, 3)
+    rows = store.search("page", 5, {"document_id": doc_id})[0]
+    assert sorted((row["metadata"]["page_number"], row["metadata"]["chunk_index"]) for row in rows) == [(1, 0), (2, 1), (3, 2)]
+    # chunking is per page, so a page's chunk count must not pass for the document's
+    assert not any("total_chunks" in row["metadata"] for row in rows)
+    assert all(row["metadata"]["filename"] == "report.pdf" for row in rows)
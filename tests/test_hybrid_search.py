@@ -0,0 +1,55 @@
+import pytest
+from app.config import settings
+from app.core import fusion
+from app.core.answer_cache import AnswerCache
+from app.core.collection_registry import Collection
+from app.core.lexical_index import match_expression
+
+def test_rrf_rewards_items_ranked_by_both_retrievers():
+    ranked = fusion.reciprocal_rank_fusion([["a", "b"], ["b", "c"]], [1.0, 1.0])
+    assert ranked == ["b", "a", "c"]
+
+def test_rrf_weights():
+    assert fusion.reciprocal_rank_fusion([["a"], ["b"]], [0.2, 0.8])[0] == "b"
+    assert fusion.reciprocal_rank_fusion([["a"], ["b"]], [0.8, 0.2])[0] == "a"
+
+def test_weighted_fusion_normalizes_each_retrievers_scores():
+    # BM25 scores are on a far larger scale than similarities; normalization evens that out
+    ranked = fusion.weighted_score_fusion(
+        [["a", "b", "c"], ["b", "a", "c"]], [[0.9, 0.89, 0.1], [40.0, 1.0, 0.0]], [0.5, 0.5]
+    )
+    assert ranked == ["b", "a", "c"]
+    assert fusion.weighted_score_fusion([["a"], []], [[0.3], []], [0.5, 0.5]) == ["a"]
+
+def test_unknown_fusion_method():
+    with pytest.raises(ValueError):
+        fusion.fuse("max", [], [], [])
+
+def test_match_expression_quotes_terms():
+    assert match_expression('ERR_CONN_42 AND (timeout OR "x') == '"err_conn_42" OR "and" OR "timeout" OR "or" OR "x"'
+    assert match_expression("?!") == ""
+
+def test_lexical_search_finds_exact_identifiers(store):
+    store.add_documents(
+        ["connection refused with ERR_CONN_42", "the weather is nice", "reset the router"],
+        [{"document_id": "a"}, {"document_id": "b"}, {"document_id": "c"}]
+    )
+    rows, scores = store.lexical_search("what does ERR_CONN_42 mean", 5)
+    assert [row["text"] for row in rows] == ["connection refused with ERR_CONN_42"]
+    assert scores[0] > 0
+    store.delete_document("a")
+    assert store.lexical_search("ERR_CONN_42", 5) == ([], [])
+
+def test_hybrid_retrieval_keeps_vector_similarity_as_score(store, monkeypatch):
+    from app.core.rag_pipeline import rag_pipeline
+    monkeypatch.setattr(settings, "HYBRID_SEARCH", True)
+    monkeypatch.setattr(settings, "RERANK_ENABLED", False)
+    texts = [f"filler document number {i}" for i in range(30)] + ["error code ERR_CONN_42 means refused"]
+    store.add_documents(texts, [{"document_id": str(i)} for i in range(len(texts))])
+    collection = Collection("hybrid", store, AnswerCache())
+
+    rows, scores = rag_pipeline.retrieve_hits("ERR_CONN_42", 3, collection=collection)
+    assert "error code ERR_CONN_42 means refused" in [row["text"] for row in rows]
+    dense_rows, dense_scores = store.search("ERR_CONN_42", len(texts))
+    similarity = {row["id"]: score for row, score in zip(dense_rows, dense_scores)}
+    assert scores == pytest.approx([similarity[row["id"]] for row in rows])
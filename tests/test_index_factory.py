@@ -0,0 +1,90 @@
+import time
+import faiss
+import numpy as np
+import pytest
+from app.config import settings
+from app.core import index_factory
+from app.core.vector_store import VectorStore
+
+@pytest.mark.parametrize("index_type", index_factory.INDEX_TYPES)
+@pytest.mark.parametrize("metric", ["l2", "cosine"])
+def test_created_indexes_report_their_type_and_metric(index_type, metric, monkeypatch):
+    monkeypatch.setattr(settings, "PQ_M", 4)
+    index = index_factory.with_ids(index_factory.create_index(index_type, 16, metric))
+    assert index_factory.index_type_of(index) == index_type
+    assert index_factory.metric_of(index) == metric
+    assert index_factory.supports_remove(index) == (index_type != "hnsw")
+
+def test_unknown_type_and_metric():
+    with pytest.raises(ValueError):
+        index_factory.create_index("lsh", 16)
+    with pytest.raises(ValueError):
+        index_factory.create_index("flat", 16, "dot")
+
+def test_selectors_filter_search_results():
+    vectors = np.random.default_rng(0).standard_normal((20, 8)).astype("float32")
+    index = index_factory.with_ids(index_factory.create_index("flat", 8))
+    index.add_with_ids(vectors, np.arange(20, dtype="int64"))
+    bitmap = index_factory.id_bitmap(np.array([3, 9, 17]))
+
+    allowed = index_factory.search_parameters(index, index_factory.allow_selector(bitmap))
+    _, ids = index.search(vectors[:1], 20, params=allowed)
+    assert sorted(i for i in ids[0] if i >= 0) == [3, 9, 17]
+
+    excluded = index_factory.search_parameters(index, index_factory.tombstone_selector(bitmap))
+    _, ids = index.search(vectors[:1], 20, params=excluded)
+    assert {3, 9, 17}.isdisjoint(ids[0]) and len([i for i in ids[0] if i >= 0]) == 17
+
+def test_exact_search_merges_blocks():
+    vectors = np.random.default_rng(1).standard_normal((30, 8)).astype("float32")
+    blocks = [(np.arange(0, 10), vectors[:10]), (np.arange(10, 30), vectors[10:])]
+    flat = faiss.IndexFlatL2(8)
+    flat.add(vectors)
+    expected_distances, expected_ids = flat.search(vectors[:4], 5)
+    distances, ids = index_factory.exact_search(blocks, vectors[:4], 5)
+    assert (ids == expected_ids).all()
+    assert distances == pytest.approx(expected_distances)
+
+def wait_for_migration(store: VectorStore, index_type: str):
+    deadline = time.time() + 30
+    while (store.busy or index_factory.index_type_of(store.index) != index_type) and time.time() < deadline:
+        time.sleep(0.02)
+    assert index_factory.index_type_of(store.index) == index_type
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+def test_store_migrates_once_it_has_enough_vectors(tmp_path, monkeypatch, index_type):
+    monkeypatch.setattr(settings, "INDEX_TRAIN_MIN_VECTORS", 40)
+    monkeypatch.setattr(settings, "IVF_NLIST", 1)
+    store = VectorStore(index_path=str(tmp_path / "index"), index_type=index_type)
+    try:
+        texts = [f"document {i}" for i in range(50)]
+        store.add_documents(texts[:30], [{"document_id": str(i)} for i in range(30)])
+        assert index_factory.index_type_of(store.index) == "flat"
+        store.add_documents(texts[30:], [{"document_id": str(i)} for i in range(30, 50)])
+        wait_for_migration(store, index_type)
+
+        rows, _ = store.search("document 42", 1)
+        assert rows[0]["text"] == "document 42"
+        store.delete_document("42")
+        assert "document 42" not in [row["text"] for row in store.search("document 42", 5)[0]]
+        assert store.get_stats()["configured_index_type"] == index_type
+    finally:
+        store.close()
+
+def test_trained_index_is_checkpointed_and_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDEX_TRAIN_MIN_VECTORS", 40)
+    path = str(tmp_path / "index")
+    store = VectorStore(index_path=path, index_type="hnsw")
+    store.add_documents([f"document {i}" for i in range(50)], [{"document_id": str(i)} for i in range(50)])
+    wait_for_migration(store, "hnsw")
+    store.compact()
+    store.checkpoint_index()
+    assert store.checkpoint_end == 50
+    store.close()
+
+    reopened = VectorStore(index_path=path, index_type="hnsw")
+    try:
+        assert index_factory.index_type_of(reopened.index) == "hnsw"
+        assert reopened.search("document 7", 1)[0][0]["text"] == "document 7"
+    finally:
+        reopened.close()
@@ -0,0 +1,75 @@
+import pytest
+from app.core.metadata_filter import filter_key, matches, normalize_filters
+
+def texts_of(results):
+    return sorted(row["text"] for row in results[0])
+
+def test_normalize_filters():
+    assert normalize_filters({"a": 1, "b": ["x", "y"]}) == {"a": (1,), "b": ("x", "y")}
+    assert normalize_filters(None) == {}
+    with pytest.raises(ValueError):
+        normalize_filters({"a": []})
+    with pytest.raises(ValueError):
+        normalize_filters({"a": {"nested": 1}})
+
+def test_bools_and_ints_are_different_values():
+    assert matches({"draft": True}, normalize_filters({"draft": True}))
+    assert not matches({"draft": 1}, normalize_filters({"draft": True}))
+    assert not matches({"n": True}, normalize_filters({"n": 1}))
+    assert not matches({"n": 1.0}, normalize_filters({"n": 1}))
+    assert filter_key({"n": 1}) != filter_key({"n": True})
+
+def test_missing_field_does_not_match():
+    assert not matches({}, normalize_filters({"lang": "en"}))
+
+class TestFilters:
+
+    @pytest.fixture
+    def populated(self, store):
+        store.add_documents(
+            ["red apple", "green apple", "red car", "blue car"],
+            [
+                {"document_id": "a", "color": "red", "year": 2020, "draft": True},
+                {"document_id": "b", "color": "green", "year": 2021, "draft": False},
+                {"document_id": "c", "color": "red", "year": 2021, "draft": False},
+                {"document_id": "d", "color": "blue", "year": 2022, "draft": True},
+            ]
+        )
+        return store
+
+    @pytest.mark.parametrize("compacted", [False, True])
+    def test_equality_and_any_of(self, populated, compacted):
+        if compacted:
+            populated.compact()
+        assert texts_of(populated.search("apple", 5, {"color": "red"})) == ["red apple", "red car"]
+        assert texts_of(populated.search("apple", 5, {"color": ["green", "blue"]})) == ["blue car", "green apple"]
+        assert texts_of(populated.search("apple", 5, {"color": "red", "year": 2021})) == ["red car"]
+
+    @pytest.mark.parametrize("compacted", [False, True])
+    def test_typed_values(self, populated, compacted):
+        if compacted:
+            populated.compact()
+        assert texts_of(populated.search("car", 5, {"year": 2022})) == ["blue car"]
+        assert texts_of(populated.search("car", 5, {"draft": True})) == ["blue car", "red apple"]
+        assert populated.search("car", 5, {"year": "2022"}) == ([], [])
+        assert populated.search("car", 5, {"draft": 1}) == ([], [])
+        assert populated.search("car", 5, {"year": 2022.0}) == ([], [])
+
+    @pytest.mark.parametrize("compacted", [False, True])
+    def test_bool_filter_skips_int_values(self, store, compacted):
+        store.add_documents(["flag true", "flag one"], [{"document_id": "a", "flag": True}, {"document_id": "b", "flag": 1}])
+        if compacted:
+            store.compact()
+        assert texts_of(store.search("flag", 5, {"flag": True})) == ["flag true"]
+        assert texts_of(store.search("flag", 5, {"flag": 1})) == ["flag one"]
+
+    def test_no_match(self, populated):
+        assert populated.search("apple", 5, {"color": "purple"}) == ([], [])
+
+    def test_deleted_rows_are_filtered_out(self, populated):
+        populated.delete_document("a")
+        assert texts_of(populated.search("apple", 5, {"color": "red"})) == ["red car"]
+
+    def test_lexical_search_honours_filters(self, populated):
+        rows, _ = populated.lexical_search("apple", 5, {"color": "green"})
+        assert [row["text"] for row in rows] == ["green apple"]
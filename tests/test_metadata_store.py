@@ -0,0 +1,37 @@
+import pytest
+from app.core.metadata_store import ColumnarMetadata
+
+ROWS = [
+    ("first", {"page": 1, "lang": "en", "tags": ["a", "b"], "score": 0.5}),
+    ("second", {"page": 2, "lang": None, "tags": None, "big": 2 ** 70}),
+    ("third", {"lang": "de", "page": None, "big": -2 ** 63}),
+    ("fourth", {}),
+]
+
+@pytest.fixture
+def columns(tmp_path):
+    ColumnarMetadata.write(str(tmp_path), [text for text, _ in ROWS], [metadata for _, metadata in ROWS])
+    return ColumnarMetadata(str(tmp_path))
+
+def test_rows_round_trip(columns):
+    assert len(columns) == len(ROWS)
+    assert list(columns.iter_rows()) == ROWS
+
+def test_column_kinds(columns):
+    kinds = {name: kind for name, kind, _ in columns.columns}
+    assert kinds["page"] == "int"
+    assert kinds["lang"] == "str"
+    # ints an int64 cannot hold (or that collide with its sentinels) fall back to JSON
+    assert kinds["big"] == "json"
+
+def test_postings_skip_missing_and_null(columns):
+    assert {value: rows.tolist() for (_, value), rows in columns.postings("page").items()} == {1: [0], 2: [1]}
+    assert {value: rows.tolist() for (_, value), rows in columns.postings("lang").items()} == {"en": [0], "de": [2]}
+    assert columns.postings("big")[(int, 2 ** 70)].tolist() == [1]
+
+def test_compaction_keeps_out_of_range_ints_and_nulls(store):
+    store.add_documents(["huge", "empty"], [{"document_id": "a", "n": 2 ** 64}, {"document_id": "b", "n": None}])
+    assert store.compact()
+    rows = {row["text"]: row["metadata"] for row in store.search("huge", 5)[0]}
+    assert rows["huge"]["n"] == 2 ** 64
+    assert "n" in rows["empty"] and rows["empty"]["n"] is None
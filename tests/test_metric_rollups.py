@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+import pytest
+from app.monitoring.metrics import LATENCY_BOUNDS, histogram_quantile, latency_bin
+
+def test_latency_bins_are_monotonic():
+    bins = [latency_bin(latency) for latency in (0.0005, 0.001, 0.01, 0.1, 1.0, 10.0, 1e6)]
+    assert bins == sorted(bins)
+    assert bins[0] == 0
+    assert bins[-1] == len(LATENCY_BOUNDS) - 1
+
+def test_histogram_quantile():
+    histogram = {latency_bin(0.01): 90, latency_bin(1.0): 10}
+    assert histogram_quantile(histogram, 0.5) == pytest.approx(LATENCY_BOUNDS[latency_bin(0.01)])
+    assert histogram_quantile(histogram, 0.95) == pytest.approx(LATENCY_BOUNDS[latency_bin(1.0)])
+    assert histogram_quantile({}, 0.5) is None
+
+def test_totals_and_averages_come_from_rollups(metrics_db):
+    metrics_db.log_metric("rag", 0.2, "q1", "a", confidence=0.9)
+    metrics_db.log_metric("rag", 0.4, "q2", "a", confidence=0.5)
+    metrics_db.log_metric("summarizer", 1.0, "q3", "s")
+    assert metrics_db.flush() == 3
+
+    assert metrics_db.get_total_count() == 3
+    assert dict(metrics_db.get_avg_latency_by_tool()) == pytest.approx({"rag": 0.3, "summarizer": 1.0})
+    totals = {row["tool"]: row for row in metrics_db.get_rollups("all")}
+    assert totals["rag"]["count"] == 2
+    assert totals["rag"]["max_latency"] == pytest.approx(0.4)
+    assert totals["rag"]["avg_confidence"] == pytest.approx(0.7)
+    assert totals["summarizer"]["avg_confidence"] is None
+
+def test_rollups_merge_across_flushes(metrics_db):
+    metrics_db.log_metric("rag", 0.1, "q", "a")
+    metrics_db.flush()
+    metrics_db.log_metric("rag", 0.3, "q", "a")
+    metrics_db.flush()
+    (minute,) = metrics_db.get_rollups("minute", tool="rag")
+    assert minute["count"] == 2
+    assert minute["avg_latency"] == pytest.approx(0.2)
+    assert minute["p99_latency"] >= 0.3
+
+def test_rollup_buckets_and_since(metrics_db, insert_raw_metrics):
+    now = datetime.utcnow()
+    insert_raw_metrics([(now - timedelta(hours=3), "rag", 0.1), (now, "rag", 0.2)])
+    metrics_db._backfill_rollups()
+    assert [row["count"] for row in metrics_db.get_rollups("hour")] == [1, 1]
+    assert len(metrics_db.get_rollups("hour", since=now - timedelta(hours=1))) == 1
+    assert metrics_db.get_total_count() == 2
+    with pytest.raises(ValueError):
+        metrics_db.get_rollups("day")
+
+def test_retention_keeps_all_time_totals(metrics_db, insert_raw_metrics):
+    old = datetime.utcnow() - timedelta(days=400)
+    insert_raw_metrics([(old, "rag", 0.1), (datetime.utcnow(), "rag", 0.2)])
+    metrics_db._backfill_rollups()
+    metrics_db.apply_retention()
+
+    assert len(metrics_db.get_metrics()) == 1
+    assert len(metrics_db.get_rollups("minute")) == 1
+    assert len(metrics_db.get_rollups("hour")) == 1
+    assert metrics_db.get_total_count() == 2
+
+def test_readers_do_not_start_the_writer(metrics_db):
+    metrics_db.get_rollups("all")
+    metrics_db.get_stage_latencies()
+    assert metrics_db._writer is None
+    metrics_db.log_metric("rag", 0.1, "q", "a")
+    assert metrics_db._writer.is_alive()
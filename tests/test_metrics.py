@@ -0,0 +1,37 @@
+import time
+
+def test_full_buffer_drops_rows(metrics_db, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "METRICS_BUFFER_SIZE", 2)
+    for _ in range(3):
+        metrics_db.log_metric("rag", 0.1, "q", "a")
+    assert metrics_db.get_stats()["dropped"] == 1
+    assert metrics_db.flush() == 2
+
+def test_close_stops_the_writer_and_flushes(metrics_db):
+    metrics_db.log_metric("rag", 0.1, "q", "a")
+    writer = metrics_db._writer
+    metrics_db.close()
+    assert not writer.is_alive()
+    assert metrics_db.get_total_count() == 1
+
+def test_writer_flushes_in_the_background(metrics_db, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "METRICS_FLUSH_INTERVAL_SECONDS", 0.01)
+    metrics_db.log_metric("rag", 0.1, "q", "a")
+    deadline = time.time() + 5
+    while metrics_db.get_total_count() == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert metrics_db.get_total_count() == 1
+    assert metrics_db.get_stats()["written"] == 1
+
+def test_flush_writes_in_batches(metrics_db, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "METRICS_FLUSH_BATCH", 2)
+    monkeypatch.setattr(settings, "METRICS_FLUSH_INTERVAL_SECONDS", 60)
+    flushes = metrics_db.get_stats()["flushes"]
+    for _ in range(5):
+        metrics_db.log_metric("rag", 0.1, "q", "a")
+    metrics_db.close()
+    assert metrics_db.get_total_count() == 5
+    assert metrics_db.get_stats()["flushes"] - flushes >= 3
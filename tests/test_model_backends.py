@@ -0,0 +1,85 @@
+import sys
+import numpy as np
+import pytest
+from app.config import settings
+from app.core import model_backends
+from app.core.model_backends import OnnxEncoder, backend_for, onnx_cache_path
+from app.core.model_loaders import load_reranker
+
+def test_backend_defaults_and_per_model_overrides(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_BACKEND", "int8")
+    monkeypatch.setattr(settings, "MODEL_BACKENDS", {"generator": "onnx"})
+    assert backend_for("embedding") == "int8"
+    assert backend_for("generator") == "onnx"
+    monkeypatch.setattr(settings, "MODEL_BACKENDS", {"generator": "tensorrt"})
+    with pytest.raises(ValueError):
+        backend_for("generator")
+
+def test_onnx_cache_path_is_one_directory_per_model(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ONNX_CACHE_DIR", str(tmp_path))
+    assert onnx_cache_path("sentence-transformers/all-MiniLM-L6-v2") == \
+        str(tmp_path / "sentence-transformers--all-MiniLM-L6-v2")
+
+def test_missing_optimum_names_the_package(monkeypatch):
+    monkeypatch.setitem(sys.modules, "optimum.onnxruntime", None)
+    with pytest.raises(ImportError, match="optimum"):
+        model_backends._require_optimum()
+
+def test_reranker_has_no_onnx_backend():
+    with pytest.raises(ValueError):
+        load_reranker(backend="onnx")
+
+class FakeOutput:
+    def __init__(self, last_hidden_state):
+        self.last_hidden_state = last_hidden_state
+
+class FakeTransformer:
+    """Token states are ``[token position + 1, text length]``; padding tokens are large so pooling must mask them."""
+
+    def __call__(self, input_ids, attention_mask):
+        positions = np.arange(input_ids.shape[1], dtype="float32")[None, :, None] + 1
+        lengths = attention_mask.sum(axis=1).astype("float32")[:, None, None]
+        hidden = np.concatenate([np.broadcast_to(positions, input_ids.shape + (1,)),
+                                 np.broadcast_to(lengths, input_ids.shape + (1,))], axis=2)
+        return FakeOutput(np.where(attention_mask[..., None] > 0, hidden, 1000.0))
+
+class FakeTokenizer:
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        lengths = [min(len(text.split()), max_length) for text in texts]
+        width = max(lengths)
+        mask = np.array([[1] * n + [0] * (width - n) for n in lengths], dtype="int64")
+        return {"input_ids": mask.copy(), "attention_mask": mask}
+
+def encoder(pooling: str, normalize: bool) -> OnnxEncoder:
+    instance = OnnxEncoder.__new__(OnnxEncoder)
+    instance.config = {"pooling": pooling, "normalize": normalize, "max_seq_length": 8, "dimension": 2}
+    instance.tokenizer = FakeTokenizer()
+    instance.model = FakeTransformer()
+    return instance
+
+def test_onnx_encoder_mean_pooling_ignores_padding():
+    embeddings = encoder("mean", normalize=False).encode(["one two three", "one"], batch_size=2)
+    assert embeddings.dtype == np.float32
+    assert embeddings.tolist() == [[2.0, 3.0], [1.0, 1.0]]
+
+def test_onnx_encoder_cls_pooling_and_normalize():
+    embeddings = encoder("cls", normalize=True).encode(["one two three", "one"])
+    assert np.linalg.norm(embeddings, axis=1) == pytest.approx([1.0, 1.0])
+    assert embeddings[0] == pytest.approx(np.array([1.0, 3.0]) / np.sqrt(10))
+
+def test_onnx_encoder_batches_and_single_texts():
+    model = encoder("mean", normalize=False)
+    texts = ["a b", "a", "a b c", "a b c d", "a"]
+    batched = model.encode(texts, batch_size=2)
+    assert batched.shape == (5, 2)
+    assert batched.tolist() == model.encode(texts, batch_size=5).tolist()
+    assert model.encode("a b").tolist() == [1.5, 2.0]
+    assert model.encode([]).shape == (0, 2)
+
+def test_int8_quantization_shrinks_linear_layers():
+    torch = pytest.importorskip("torch")
+    module = torch.nn.Sequential(torch.nn.Linear(16, 16))
+    quantized = model_backends.quantize_int8(module)
+    assert "quantized" in type(quantized[0]).__module__
+    sample = torch.randn(2, 16)
+    assert torch.allclose(module(sample), quantized(sample), atol=0.1)
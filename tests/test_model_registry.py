@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.core.model_registry import ModelRegistry
+
+@pytest.fixture
+def registry():
+    return ModelRegistry()
+
+def test_models_load_on_first_use_only(registry):
+    loads = []
+    registry.register("embedding", lambda: loads.append(1) or object())
+    assert not registry.is_loaded("embedding")
+    assert loads == []
+    model = registry.get("embedding")
+    assert registry.get("embedding") is model
+    assert loads == [1]
+    assert registry.get_stats()["embedding"]["loaded"]
+
+def test_concurrent_first_calls_load_once(registry):
+    loads = []
+
+    def slow_loader():
+        loads.append(threading.current_thread().name)
+        time.sleep(0.1)
+        return object()
+
+    registry.register("generator", slow_loader)
+    with ThreadPoolExecutor(4) as pool:
+        models = list(pool.map(lambda _: registry.get("generator"), range(4)))
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+
+def test_unknown_model(registry):
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+def test_unload_reloads_on_next_use(registry):
+    registry.register("reranker", object)
+    first = registry.get("reranker")
+    registry.unload("reranker")
+    assert not registry.is_loaded("reranker")
+    assert registry.get("reranker") is not first
+
+def test_warm_up_skips_unknown_models(registry):
+    registry.register("embedding", object)
+    registry.register("generator", object)
+    registry.warm_up(["embedding", "missing"])
+    stats = registry.get_stats()
+    assert stats["embedding"]["loaded"] and not stats["generator"]["loaded"]
+    assert "missing" not in stats
+
+def test_importing_the_app_loads_no_models(tmp_path):
+    script = (
+        "import json, sys\n"
+        "import app.core.agent\n"
+        "from app.core.model_registry import model_registry\n"
+        "heavy = [name for name in ('torch', 'transformers', 'sentence_transformers') if name in sys.modules]\n"
+        "print(json.dumps({'stats': model_registry.get_stats(), 'heavy': heavy}))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "VECTOR_DB_PATH": str(tmp_path / "vector_db"), "DOCUMENTS_PATH": str(tmp_path / "documents"),
+           "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    output = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=120, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result["heavy"] == []
+    assert {"embedding", "generator", "generator_tokenizer"} <= set(result["stats"])
+    assert not any(model["loaded"] for model in result["stats"].values())
@@ -0,0 +1,56 @@
+import os
+import stat
+import threading
+import time
+import numpy as np
+import pytest
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from app.config import settings
+from app.core.model_server import ModelClient, ModelServer, ModelServerError
+
+class RecordingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, convert_to_numpy: bool = True, batch_size: int = 32, **kwargs) -> np.ndarray:
+        self.calls.append((len(texts), batch_size))
+        return np.array([[len(text), 1.0] for text in texts], dtype="float32")
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_SERVER_AUTHKEY", "")
+    server = ModelServer(str(tmp_path / "models.sock"), warmup=[])
+    encoder = RecordingEncoder()
+    server.models.register("embedding", lambda: encoder)
+    server.encoder = encoder
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(100):
+        if (tmp_path / "models.sock").exists() and (tmp_path / "models.sock.key").exists():
+            break
+        time.sleep(0.01)
+    return server
+
+def test_embed_runs_in_configured_batch_sizes(server, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 8)
+    results = server._embed_batch([["a"] * 100, ["bb", "ccc"]])
+    assert [len(result) for result in results] == [100, 2]
+    assert results[1][:, 0].tolist() == [2.0, 3.0]
+    assert server.encoder.calls == [(102, 8)]
+
+def test_client_round_trip(server):
+    client = ModelClient(server.address)
+    embeddings = client.call("embed", ["four", "sixsix"])
+    assert embeddings[:, 0].tolist() == [4.0, 6.0]
+    with pytest.raises(ModelServerError):
+        client.call("unknown")
+
+def test_socket_and_key_are_owner_only(server):
+    assert stat.S_IMODE(os.stat(server.address).st_mode) & 0o077 == 0
+    assert stat.S_IMODE(os.stat(server.address + ".key").st_mode) == 0o600
+
+def test_wrong_authkey_is_rejected(server):
+    with pytest.raises(AuthenticationError):
+        Client(server.address, family="AF_UNIX", authkey=b"wrong")
+    # the server keeps accepting after a rejected client
+    assert ModelClient(server.address).call("embed", ["ok"]).shape == (1, 2)
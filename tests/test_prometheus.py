@@ -0,0 +1,104 @@
+import json
+import os
+import pytest
+from app.config import settings
+from app.monitoring import prometheus
+from app.monitoring.prometheus import MetricsRegistry
+
+def worker():
+    """A registry with the same metrics every API worker defines."""
+    registry = MetricsRegistry()
+    registry.requests = registry.counter("test_requests_total", "Requests", ["route"])
+    registry.latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.depth = registry.gauge("test_queue_depth", "Queue depth")
+    return registry
+
+def exit_worker(registry):
+    registry.write_snapshot()
+    registry._token_lock.close()
+
+def sample(text: str, series: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+@pytest.fixture
+def multiproc(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "METRICS_SNAPSHOT_INTERVAL_SECONDS", 3600.0)
+    monkeypatch.setattr(prometheus.atexit, "register", lambda function: None)
+    return tmp_path
+
+def test_exposition_format():
+    registry = worker()
+    registry.requests.inc("/query")
+    registry.requests.inc("/query", amount=2)
+    registry.latency.observe(0.05)
+    registry.latency.observe(0.5)
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert sample(text, 'test_requests_total{route="/query"}') == 3
+    assert sample(text, 'test_latency_seconds_bucket{le="0.1"}') == 1
+    assert sample(text, 'test_latency_seconds_bucket{le="+Inf"}') == 2
+    assert sample(text, "test_latency_seconds_count") == 2
+    assert sample(text, "test_latency_seconds_sum") == pytest.approx(0.55)
+
+def test_histograms_cannot_be_set():
+    with pytest.raises(TypeError):
+        worker().latency.set(1.0)
+
+def test_workers_are_merged(multiproc):
+    first, second = worker(), worker()
+    first.start()
+    second.start()
+    first.requests.inc("/query", amount=2)
+    first.depth.set(3)
+    first.write_snapshot()
+    second.requests.inc("/query")
+    second.depth.set(4)
+    text = second.render()
+    assert sample(text, 'test_requests_total{route="/query"}') == 3
+    assert sample(text, "test_queue_depth") == 7
+
+def test_exited_workers_are_folded_and_removed(multiproc):
+    first, second = worker(), worker()
+    first.start()
+    second.start()
+    first.requests.inc("/query", amount=5)
+    first.latency.observe(0.5)
+    first.depth.set(3)
+    exit_worker(first)
+
+    text = second.render()
+    # counters and histograms of the exited worker still count; its gauges do not
+    assert sample(text, 'test_requests_total{route="/query"}') == 5
+    assert sample(text, "test_latency_seconds_count") == 1
+    assert sample(text, "test_queue_depth") is None
+    assert sorted(os.listdir(multiproc)) == sorted(["archive.json", "archive.lock",
+                                                     f"{second._token}.lock"])
+    # folding is idempotent
+    assert sample(second.render(), 'test_requests_total{route="/query"}') == 5
+
+def test_restarted_worker_does_not_reset_totals(multiproc):
+    first = worker()
+    first.start()
+    first.requests.inc("/query", amount=5)
+    exit_worker(first)
+    # a new worker with the same pid gets its own snapshot file
+    restarted = worker()
+    restarted.start()
+    assert restarted._token != first._token
+    restarted.requests.inc("/query")
+    restarted.write_snapshot()
+    assert sample(restarted.render(), 'test_requests_total{route="/query"}') == 6
+
+def test_snapshots_of_the_old_naming_are_folded(multiproc):
+    legacy = worker()
+    legacy.requests.inc("/query", amount=4)
+    with open(os.path.join(multiproc, "999999.json"), "w") as f:
+        json.dump(legacy.snapshot(), f)
+    current = worker()
+    current.start()
+    assert not os.path.exists(os.path.join(multiproc, "999999.json"))
+    assert sample(current.render(), 'test_requests_total{route="/query"}') == 4
@@ -0,0 +1,81 @@
+import time
+import pytest
+from app.config import settings
+from app.core.model_registry import model_registry
+from app.core.reranker import Reranker
+from app.monitoring.prometheus import metrics_registry
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words the text contains."""
+
+    def __init__(self):
+        self.batches = []
+        self.delay = 0.0
+        self.error = None
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        if self.error:
+            raise self.error
+        self.batches.append(len(pairs))
+        time.sleep(self.delay)
+        return [sum(word in text.split() for word in query.split()) for query, text in pairs]
+
+@pytest.fixture
+def cross_encoder(monkeypatch):
+    fake = FakeCrossEncoder()
+    # a new Reranker registers the real loader; keep the registry as it was
+    monkeypatch.setitem(model_registry._loaders, "reranker", model_registry._loaders.get("reranker"))
+    monkeypatch.setitem(model_registry._models, "reranker", fake)
+    monkeypatch.setattr(settings, "RERANK_BUDGET_MS", 10000.0)
+    return fake
+
+@pytest.fixture
+def reranker(cross_encoder, monkeypatch):
+    # drop the new instance's metrics collector again at teardown
+    monkeypatch.setattr(metrics_registry, "_collectors", list(metrics_registry._collectors))
+    return Reranker()
+
+def candidates(*texts):
+    rows = [{"id": i, "text": text} for i, text in enumerate(texts)]
+    return rows, [1.0 - i / 10 for i in range(len(texts))]
+
+def test_candidates_are_reordered_and_keep_first_stage_scores(reranker):
+    rows, scores = candidates("nothing relevant", "faiss index", "faiss ivf index types")
+    ranked, ranked_scores = reranker.rerank("faiss ivf index", rows, scores, 2)
+    assert [row["id"] for row in ranked] == [2, 1]
+    assert ranked_scores == [scores[2], scores[1]]
+
+def test_scores_are_cached_per_query_and_chunk(reranker, cross_encoder):
+    rows, scores = candidates("faiss index", "other text")
+    reranker.rerank("faiss", rows, scores, 2)
+    reranker.rerank("faiss", rows, scores, 2)
+    assert cross_encoder.batches == [2]
+    reranker.rerank("index", rows, scores, 2)
+    assert cross_encoder.batches == [2, 2]
+    assert reranker.get_stats()["cache_hits"] == 2
+
+def test_batch_of_queries_is_scored_together(reranker, cross_encoder, monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_BATCH_SIZE", 16)
+    hits = [candidates("faiss index", "other"), candidates("faiss index", "bm25 search")]
+    results = reranker.rerank_many(["bm25 search", "bm25 search"], hits, 1)
+    assert cross_encoder.batches == [3]
+    assert [rows[0]["text"] for rows, _ in results] == ["faiss index", "bm25 search"]
+
+def test_budget_leaves_the_rest_in_first_stage_order(reranker, cross_encoder, monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_BATCH_SIZE", 1)
+    monkeypatch.setattr(settings, "RERANK_BUDGET_MS", 50.0)
+    cross_encoder.delay = 0.03
+    rows, scores = candidates("a", "b", "c", "match", "d")
+    ranked, _ = reranker.rerank("match", rows, scores, 5)
+    scored = len(cross_encoder.batches)
+    assert 1 <= scored < 5
+    assert sorted(row["id"] for row in ranked) == [0, 1, 2, 3, 4]
+    # the unscored tail keeps its first-stage order
+    assert [row["id"] for row in ranked[scored:]] == list(range(scored, 5))
+    assert reranker.get_stats()["budget_exhausted"] == 1
+
+def test_failing_model_keeps_first_stage_order(reranker, cross_encoder):
+    cross_encoder.error = RuntimeError("out of memory")
+    rows, scores = candidates("a", "b", "c")
+    assert reranker.rerank("b", rows, scores, 2) == (rows[:2], scores[:2])
+    assert reranker.get_stats()["errors"] == 1
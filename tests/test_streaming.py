@@ -0,0 +1,88 @@
+import json
+import pytest
+from app.config import settings
+from app.core.answer_cache import AnswerCache
+from app.core.collection_registry import Collection
+from app.core.model_loaders import stream_generate
+from app.core.model_registry import model_registry
+from app.core.rag_pipeline import GENERATION_ERROR_PREFIX, NO_CONTEXT_ANSWER, rag_pipeline
+
+class FakeGenerator:
+    """Streams a fixed answer word by word; ``fail_after`` raises part way through."""
+
+    def __init__(self, answer: str = "faiss searches vectors"):
+        self.answer = answer
+        self.fail_after = None
+        self.calls = 0
+
+    def stream(self, prompt: str, **kwargs):
+        self.calls += 1
+        for i, word in enumerate(self.answer.split()):
+            if self.fail_after is not None and i == self.fail_after:
+                raise RuntimeError("generator crashed")
+            yield word if i == 0 else " " + word
+
+@pytest.fixture
+def generator(monkeypatch):
+    fake = FakeGenerator()
+    monkeypatch.setitem(model_registry._models, "generator", fake)
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RERANK_ENABLED", False)
+    return fake
+
+@pytest.fixture
+def collection(store):
+    store.add_documents(["faiss is a library for vector search"], [{"document_id": "a"}])
+    return Collection("streaming", store, AnswerCache())
+
+def test_stream_generate_uses_a_streaming_proxy():
+    assert list(stream_generate(FakeGenerator("one two three"), "prompt")) == ["one", " two", " three"]
+
+def test_generation_starts_when_the_tokens_are_read(generator, collection):
+    results, confidence, tokens = rag_pipeline.stream_query("what is faiss", 3, collection)
+    assert results[0].text == "faiss is a library for vector search"
+    assert generator.calls == 0
+    assert "".join(tokens) == "faiss searches vectors"
+    assert generator.calls == 1
+
+def test_streamed_answers_are_cached(generator, collection):
+    _, _, tokens = rag_pipeline.stream_query("what is faiss", 3, collection)
+    assert list(tokens) == ["faiss", " searches", " vectors"]
+    _, _, tokens = rag_pipeline.stream_query("What is FAISS?", 3, collection)
+    assert list(tokens) == ["faiss searches vectors"]
+    assert generator.calls == 1
+
+def test_failed_streams_end_with_an_error_and_are_not_cached(generator, collection):
+    generator.fail_after = 1
+    _, _, tokens = rag_pipeline.stream_query("what is faiss", 3, collection)
+    pieces = list(tokens)
+    assert pieces[0] == "faiss"
+    assert pieces[-1] == f"{GENERATION_ERROR_PREFIX}: generator crashed"
+    assert collection.answer_cache.get_stats()["exact_entries"] == 0
+
+def test_no_context_streams_the_fallback_answer(generator):
+    assert list(rag_pipeline.stream_answer("anything", [])) == [NO_CONTEXT_ANSWER]
+    assert generator.calls == 0
+
+def test_stream_endpoint_sends_retrieval_tokens_and_done(generator, collection, exporter, monkeypatch):
+    pytest.importorskip("langchain")
+    pytest.importorskip("multipart")
+    pytest.importorskip("requests")
+    from fastapi.testclient import TestClient
+    from app.api import routes
+    from app.main import app
+    monkeypatch.setattr(routes.collection_registry, "_default", collection)
+    monkeypatch.setattr(routes.drift_monitor, "log_prediction", lambda *args: None)
+
+    response = TestClient(app).get("/api/v1/query/stream", params={"q": "what is faiss", "top_k": 3})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+    names = [name for name, _ in events]
+    assert names[0] == "retrieval" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    assert events[0][1]["retrieval_results"][0]["text"] == "faiss is a library for vector search"
+    assert events[-1][1]["answer"].endswith("faiss searches vectors")
@@ -0,0 +1,94 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pytest
+from app.config import settings
+from app.core.tracing import propagate, span, start_trace, traced
+
+@traced("embed")
+def embed():
+    with span("embed"):
+        return "vector"
+
+def test_nested_spans_of_one_stage_are_counted_once(exporter):
+    with start_trace("query", collection="default") as trace:
+        embed()
+        with span("search") as search:
+            search.set_attribute("hits", 3)
+    timings = trace.timings()
+    assert set(timings) == {"embed", "search", "total"}
+    assert [s.name for s in trace.spans] == ["embed", "embed", "search"]
+    assert timings["total"] >= timings["embed"] + timings["search"]
+    assert list(exporter._queue) == [trace]
+
+def test_spans_outside_a_trace_do_nothing(exporter):
+    assert embed() == "vector"
+    with span("search") as current:
+        assert current is None
+    assert len(exporter._queue) == 0
+
+def test_propagate_carries_the_trace_into_other_threads(exporter):
+    with start_trace("query_batch") as trace, ThreadPoolExecutor(1) as pool:
+        pool.submit(propagate(embed)).result()
+        pool.submit(embed).result()
+    assert [s.name for s in trace.spans] == ["embed", "embed"]
+
+def test_disabled_tracing_yields_no_trace(exporter, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ENABLED", False)
+    with start_trace("query") as trace:
+        embed()
+    assert trace is None
+    assert len(exporter._queue) == 0
+
+def test_export_writes_otlp_and_stage_timings(exporter, metrics_db, tmp_path, monkeypatch):
+    from app.monitoring import metrics
+    monkeypatch.setattr(metrics, "metrics_db", metrics_db)
+    monkeypatch.setattr(settings, "TRACE_EXPORT_PATH", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(settings, "TRACE_RECORD_METRICS", True)
+    with start_trace("query", cached=False, top_k=5) as trace:
+        embed()
+    exporter.flush()
+
+    (line,) = (tmp_path / "traces.jsonl").read_text().splitlines()
+    spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root, *children = spans
+    assert root["traceId"] == trace.trace_id and "parentSpanId" not in root
+    assert {"key": "top_k", "value": {"intValue": "5"}} in root["attributes"]
+    assert {"key": "cached", "value": {"boolValue": False}} in root["attributes"]
+    # spans are recorded as they finish, so the inner one comes first
+    inner, outer = children
+    assert outer["parentSpanId"] == root["spanId"]
+    assert inner["parentSpanId"] == outer["spanId"]
+    stages = {row["stage"]: row["count"] for row in metrics_db.get_stage_latencies(trace="query")}
+    assert stages == {"embed": 1, "total": 1}
+    assert exporter.get_stats() == {"exported": 1, "dropped": 0, "failed": 0, "queued": 0}
+
+def test_full_queue_drops_traces(exporter, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_EXPORT_QUEUE_SIZE", 1)
+    for _ in range(2):
+        with start_trace("query"):
+            pass
+    assert exporter.get_stats()["dropped"] == 1
+
+def test_stage_timings_are_not_counted_as_requests(metrics_db):
+    metrics_db.log_metric("rag", 0.5, "q", "a")
+    metrics_db.flush()
+    metrics_db.log_stage_timings([
+        {"trace_id": "t1", "trace": "query", "stage": "embed", "latency": 0.01},
+        {"trace_id": "t1", "trace": "query", "stage": "total", "latency": 0.5},
+    ])
+
+    assert metrics_db.get_total_count() == 1
+    assert [tool for tool, _ in metrics_db.get_avg_latency_by_tool()] == ["rag"]
+    stages = {row["stage"]: row for row in metrics_db.get_stage_latencies()}
+    assert stages["embed"]["count"] == 1
+    assert stages["total"]["avg_latency"] == pytest.approx(0.5)
+    assert metrics_db.get_stage_latencies(trace="query_batch") == []
+
+def test_legacy_stage_rows_are_removed(metrics_db, insert_raw_metrics):
+    insert_raw_metrics([(datetime.utcnow(), "stage:embed", 0.01), (datetime.utcnow(), "trace:query", 0.5),
+                        (datetime.utcnow(), "rag", 0.5)])
+    metrics_db._backfill_rollups()
+    metrics_db._remove_legacy_stage_rows()
+    assert metrics_db.get_total_count() == 1
+    assert [tool for tool, _ in metrics_db.get_avg_latency_by_tool()] == ["rag"]
@@ -0,0 +1,124 @@
+import os
+import pytest
+from app.core.vector_store import ReadOnlyStore
+
+def texts_of(results):
+    return sorted(row["text"] for row in results[0])
+
+def wal_files(store):
+    return [path for _, path in store.wal.files()]
+
+def test_add_and_search(store):
+    added = store.add_documents(["the cat sat", "dogs bark loudly"], [{"document_id": "a"}, {"document_id": "b"}])
+    assert added == 2
+    rows, scores = store.search("the cat sat", 1)
+    assert rows[0]["text"] == "the cat sat"
+    assert rows[0]["metadata"]["document_id"] == "a"
+    assert len(scores) == 1
+
+def test_logged_rows_are_replayed_on_reopen(store, reopen):
+    store.add_documents(["one", "two"], [{"document_id": "a"}, {"document_id": "a"}])
+    store.close()
+    reopened = reopen()
+    assert reopened.total_vectors == 2
+    assert len(reopened.tail) == 2
+    assert texts_of(reopened.search("one", 5, {"document_id": "a"})) == ["one", "two"]
+
+def test_torn_log_record_is_truncated_by_the_writer(store, reopen):
+    store.add_documents(["kept row"], [{"document_id": "a"}])
+    store.close()
+    path = wal_files(store)[-1]
+    valid = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b"\x01partial record")
+    reopened = reopen()
+    assert reopened.total_vectors == 1
+    assert os.path.getsize(path) == valid
+
+def test_compaction_moves_rows_into_a_segment(store, reopen):
+    store.add_documents(["alpha", "beta", "gamma"], [{"document_id": "a"}, {"document_id": "b"}, {"document_id": "c"}])
+    assert store.compact()
+    assert store.tail == []
+    assert len(store.segment_store.segments) == 1
+    assert texts_of(store.search("beta", 5, {"document_id": "b"})) == ["beta"]
+    store.close()
+    reopened = reopen()
+    assert reopened.total_vectors == 3
+    assert reopened.tail == []
+
+class TestSingleWriter:
+
+    def test_second_opener_is_read_only(self, store, reopen):
+        store.add_documents(["shared"], [{"document_id": "a"}])
+        reader = reopen()
+        assert not store.read_only
+        assert reader.read_only
+        assert reader.total_vectors == 1
+        assert reader.search("shared", 1)[0][0]["text"] == "shared"
+
+    def test_reader_writes_raise(self, store, reopen):
+        reader = reopen()
+        with pytest.raises(ReadOnlyStore):
+            reader.add_documents(["x"], [{}])
+        with pytest.raises(ReadOnlyStore):
+            reader.upsert_document("a", ["x"], [{}])
+        with pytest.raises(ReadOnlyStore):
+            reader.delete_document("a")
+        with pytest.raises(ReadOnlyStore):
+            reader.clear_index()
+
+    def test_reader_leaves_log_and_orphans_alone(self, store, reopen):
+        store.add_documents(["row"], [{"document_id": "a"}])
+        store.compact()
+        store.add_documents(["tail row"], [{"document_id": "a"}])
+        path = wal_files(store)[-1]
+        with open(path, "ab") as f:
+            f.write(b"\x01record being written")
+        size = os.path.getsize(path)
+        orphan = os.path.join(store.index_path, "seg-99999999")
+        os.makedirs(orphan)
+
+        reader = reopen()
+        assert reader.total_vectors == 2
+        assert os.path.getsize(path) == size
+        assert os.path.isdir(orphan)
+
+    def test_reader_follows_the_writers_log(self, store, reopen):
+        reader = reopen()
+        store.add_documents(["later row"], [{"document_id": "a"}])
+        assert texts_of(reader.search("later row", 5)) == ["later row"]
+        store.delete_document("a")
+        assert reader.search("later row", 5) == ([], [])
+        assert reader.total_vectors == 0
+
+    def test_reader_follows_compaction(self, store, reopen):
+        store.add_documents(["read from log"], [{"document_id": "a"}])
+        reader = reopen()
+        store.add_documents(["never read from log"], [{"document_id": "b"}])
+        store.compact()
+        store.add_documents(["after compaction"], [{"document_id": "c"}])
+        assert texts_of(reader.search("row", 5)) == ["after compaction", "never read from log", "read from log"]
+        assert [row["text"] for row in reader.tail] == [row["text"] for row in store.tail]
+
+    def test_reader_reloads_after_purge(self, store, reopen, monkeypatch):
+        from app.config import settings
+        monkeypatch.setattr(settings, "TOMBSTONE_PURGE_MIN_ROWS", 1)
+        store.add_documents(["first", "second"], [{"document_id": "a"}, {"document_id": "b"}])
+        reader = reopen()
+        store.delete_document("a")
+        store.compact()
+        store.add_documents(["third"], [{"document_id": "c"}])
+        assert texts_of(reader.search("first", 5)) == ["second", "third"]
+        assert reader.total_vectors == 2
+
+    def test_reader_reloads_after_clear(self, store, reopen):
+        store.add_documents(["old row"], [{"document_id": "a"}])
+        reader = reopen()
+        assert reader.total_vectors == 1
+        store.clear_index()
+        store.add_documents(["new row"], [{"document_id": "b"}])
+        assert texts_of(reader.search("row", 5)) == ["new row"]
+
+    def test_lock_is_released_on_close(self, store, reopen):
+        store.close()
+        assert not reopen().read_only